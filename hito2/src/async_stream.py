@@ -0,0 +1,237 @@
+import asyncio
+import collections
+import sys
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 600
+
+
+class MeasurementSubscription:
+    """
+    Suscripción de un consumidor asyncio al flujo de mediciones.
+
+    Es un iterador asíncrono de registros (timestamp, nivel_dba, duracion_s).
+    La cola es una deque acotada: si el consumidor se atrasa, se descartan
+    los registros más antiguos y se cuentan en self.dropped. Solo se usa
+    desde el event loop donde se creó.
+    """
+
+    def __init__(self, stream, maxsize):
+        self.stream = stream
+        self.loop = asyncio.get_running_loop()
+        self.queue = collections.deque(maxlen=maxsize)
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def push(self, batch):
+        """Agrega el lote de un tick (en el event loop)."""
+        overflow = len(self.queue) + len(batch) - self.queue.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.queue.extend(batch)
+        self.received += len(batch)
+        self.ready.set()
+
+    def end(self):
+        """Marca el fin del flujo; la iteración termina al vaciar la cola."""
+        self.closed = True
+        self.ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.queue:
+            if self.closed:
+                raise StopAsyncIteration
+            self.ready.clear()
+            await self.ready.wait()
+        return self.queue.popleft()
+
+    def close(self):
+        """Deja de recibir mediciones."""
+        self.stream.unsubscribe(self)
+        self.end()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        self.close()
+
+
+class AsyncMeasurementStream:
+    """
+    Flujo de mediciones para servicios asyncio del mismo proceso (alertas,
+    subidas), sin pasar por las señales de Qt.
+
+    Tiene la interfaz publish()/flush()/close() de los publicadores del
+    AudioWorker. publish() solo agrega el registro al lote del tick; flush()
+    entrega el lote con un único call_soon_threadsafe por event loop y por
+    tick, sin importar cuántos valores o suscriptores haya. Ya en el loop, el
+    lote se copia a la cola acotada de cada suscriptor. Sin suscriptores,
+    publish() no hace nada.
+
+        async for timestamp, dba, dt in stream.measurements():
+            ...
+
+    Para cerrar la suscripción de forma determinista (al salir de un
+    'async for' con break), usar subscribe() como contexto asíncrono:
+
+        async with stream.subscribe() as subscription:
+            async for timestamp, dba, dt in subscription:
+                ...
+    """
+
+    def __init__(self):
+        # Suscripciones por event loop; se modifican desde los loops y se
+        # leen desde el hilo del worker
+        self.lock = threading.Lock()
+        self.loops = {}
+        self.pending = []
+
+        # Estadísticas
+        self.batches_sent = 0
+
+    def subscribe(self, maxsize=DEFAULT_QUEUE_SIZE):
+        """
+        Crea una suscripción en el event loop en curso.
+
+        :param maxsize: Registros que se guardan antes de descartar los más antiguos
+        :return: MeasurementSubscription
+        """
+        subscription = MeasurementSubscription(self, maxsize)
+        with self.lock:
+            self.loops.setdefault(subscription.loop, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Quita una suscripción (sin efecto si ya no estaba)."""
+        with self.lock:
+            subscriptions = self.loops.get(subscription.loop, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self.loops.pop(subscription.loop, None)
+
+    async def measurements(self, maxsize=DEFAULT_QUEUE_SIZE):
+        """
+        Itera las mediciones desde ahora (timestamp, nivel_dba, duracion_s).
+
+        :param maxsize: Registros que se guardan antes de descartar los más antiguos
+        """
+        async with self.subscribe(maxsize) as subscription:
+            async for record in subscription:
+                yield record
+
+    def publish(self, timestamp, dba, dt=None, *_):
+        """Agrega un registro al lote del tick actual (hilo del worker)."""
+        if self.loops:
+            self.pending.append((timestamp, dba, dt))
+
+    def flush(self):
+        """Entrega el lote del tick a cada event loop con suscriptores."""
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = []
+
+        # Las suscripciones se fijan aquí: un close() posterior no deja sin
+        # destino los lotes ya encolados (el fin llega después, en orden)
+        with self.lock:
+            loops = [(loop, list(subscriptions)) for loop, subscriptions in self.loops.items()]
+        for loop, subscriptions in loops:
+            try:
+                loop.call_soon_threadsafe(self.deliver, subscriptions, batch)
+            except RuntimeError:
+                # El loop ya se cerró sin cancelar sus suscripciones
+                with self.lock:
+                    self.loops.pop(loop, None)
+        self.batches_sent += 1
+
+    def deliver(self, subscriptions, batch):
+        """Copia el lote a las suscripciones de un loop (dentro del loop)."""
+        for subscription in subscriptions:
+            # Las que el consumidor cerró entre flush() y la entrega no reciben
+            if not subscription.closed:
+                subscription.push(batch)
+
+    def close(self):
+        """Termina todas las suscripciones (los consumidores vacían sus colas y salen)."""
+        with self.lock:
+            loops = self.loops
+            self.loops = {}
+        for loop, subscriptions in loops.items():
+            for subscription in subscriptions:
+                try:
+                    loop.call_soon_threadsafe(subscription.end)
+                except RuntimeError:
+                    pass
+
+
+async def consume(stream, args):
+    """Consumidores de ejemplo: el primero imprime cada medición."""
+
+    async def consumer(index):
+        async with stream.subscribe(args.cola) as subscription:
+            async for timestamp, dba, dt in subscription:
+                if index == 0:
+                    stamp = time.strftime("%H:%M:%S", time.localtime(timestamp))
+                    print(f"{stamp}  {dba:.1f} dBA  (descartadas: {subscription.dropped})")
+            return subscription
+
+    tasks = [asyncio.create_task(consumer(i)) for i in range(args.suscriptores)]
+    await asyncio.sleep(args.segundos)
+    stream.close()
+    subscriptions = await asyncio.gather(*tasks)
+    received = sum(s.received for s in subscriptions)
+    dropped = sum(s.dropped for s in subscriptions)
+    print(
+        f"{args.suscriptores} suscriptores: {received} mediciones recibidas, "
+        f"{dropped} descartadas, {stream.batches_sent} lotes",
+        file=sys.stderr,
+    )
+
+
+def main():
+    """Mide con el micrófono sin interfaz y entrega las mediciones a consumidores asyncio."""
+    import argparse
+
+    from PyQt6.QtCore import QCoreApplication, QThread
+    from src.audio_worker import AudioWorker
+
+    parser = argparse.ArgumentParser(description="Mediciones para consumidores asyncio")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--suscriptores", type=int, default=1)
+    parser.add_argument("--cola", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--dispositivo", type=int, default=None)
+    args = parser.parse_args()
+
+    # El worker corre en el event loop de su QThread; el hilo principal
+    # queda para asyncio (la aplicación Qt solo tiene que existir)
+    app = QCoreApplication(sys.argv)  # noqa: F841
+    stream = AsyncMeasurementStream()
+    thread = QThread()
+    worker = AudioWorker()
+    if args.dispositivo is not None:
+        worker.set_device(args.dispositivo)
+    worker.add_publisher(stream)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.error_signal.connect(lambda message: print(message, file=sys.stderr))
+    thread.start()
+    try:
+        asyncio.run(consume(stream, args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+        thread.quit()
+        thread.wait(2000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:  # soundfile es opcional: sin él se archiva en WAV sin comprimir
+    soundfile = None
+
+
+class AudioArchiver:
+    """
+    Archivo continuo del audio crudo en segmentos horarios.
+
+    write_audio() (llamado por el AudioWorker en cada tick) solo encola el
+    bloque sin bloquear; si la cola está llena el bloque se descarta y se
+    cuenta. Un hilo codificador escribe los bloques en un archivo FLAC por
+    hora (soundfile/libsndfile libera el GIL mientras codifica). Al cerrar
+    cada segmento se agrega una línea a 'segmentos.jsonl' con las muestras
+    escritas y los descartes (posición dentro del archivo y cantidad).
+
+    Sin 'soundfile' se escribe WAV PCM de 16 bits con el módulo estándar wave.
+    """
+
+    QUEUE_MAX_BLOCKS = 200
+    MAX_DROP_RECORDS = 1000
+
+    def __init__(self, output_dir, sample_rate, file_format="FLAC"):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.file_format = file_format.upper()
+
+        if soundfile is None and self.file_format != "WAV":
+            print(
+                "Advertencia: 'soundfile' no está instalado; el audio se archivará en WAV",
+                file=sys.stderr,
+            )
+            self.file_format = "WAV"
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.index_path = os.path.join(self.output_dir, "segmentos.jsonl")
+
+        self.audio_queue = queue.Queue(maxsize=self.QUEUE_MAX_BLOCKS)
+
+        # Contadores de descarte (los actualiza solo el hilo de procesamiento)
+        self.dropped_blocks = 0
+        self.dropped_samples = 0
+        self.written_samples = 0
+
+        # Muestras descartadas aún no informadas al hilo codificador
+        self._unreported_drop = 0
+
+        self.segment = None
+        self._thread = threading.Thread(target=self.encoder_loop, daemon=True)
+        self._thread.start()
+
+    def write_audio(self, block):
+        """Encola un bloque de audio crudo (no bloquea)."""
+        try:
+            # Cada bloque informa cuántas muestras se perdieron justo antes de él
+            self.audio_queue.put_nowait((time.time(), block, self._unreported_drop))
+            self._unreported_drop = 0
+        except queue.Full:
+            self.dropped_blocks += 1
+            self.dropped_samples += len(block)
+            self._unreported_drop += len(block)
+
+    def publish(self, *_):
+        """El archivo solo consume audio; se ignoran las mediciones."""
+
+    def flush(self):
+        """Nada que enviar."""
+
+    def segment_name(self, timestamp):
+        """Nombre del archivo del segmento horario que contiene timestamp."""
+        stamp = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H")
+        extension = "flac" if self.file_format == "FLAC" else "wav"
+        return f"audio_{stamp}.{extension}"
+
+    def open_segment(self, timestamp):
+        """Abre un segmento nuevo (con sufijo si ya existe uno de la misma hora)."""
+        name = self.segment_name(timestamp)
+        base, extension = os.path.splitext(name)
+        suffix = 1
+        while os.path.exists(os.path.join(self.output_dir, name)):
+            name = f"{base}_{suffix}{extension}"
+            suffix += 1
+        path = os.path.join(self.output_dir, name)
+        hour_start = datetime.fromtimestamp(timestamp).replace(
+            minute=0, second=0, microsecond=0
+        )
+
+        if self.file_format == "WAV":
+            writer = wave.open(path, "wb")
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(self.sample_rate)
+        else:
+            writer = soundfile.SoundFile(
+                path,
+                mode="w",
+                samplerate=self.sample_rate,
+                channels=1,
+                format=self.file_format,
+                subtype="PCM_24",
+            )
+
+        self.segment = {
+            "archivo": name,
+            "fin": hour_start.timestamp() + 3600.0,
+            "inicio": datetime.fromtimestamp(timestamp).isoformat(timespec="seconds"),
+            "writer": writer,
+            "muestras": 0,
+            "descartes": [],
+            "muestras_descartadas": 0,
+        }
+
+    def close_segment(self):
+        """Cierra el segmento actual y registra su resumen."""
+        segment = self.segment
+        if segment is None:
+            return
+        self.segment = None
+
+        try:
+            segment["writer"].close()
+        except Exception as e:
+            print(f"Error al cerrar segmento de audio: {e}", file=sys.stderr)
+
+        summary = {
+            "archivo": segment["archivo"],
+            "inicio": segment["inicio"],
+            "fin": datetime.now().isoformat(timespec="seconds"),
+            "muestras": segment["muestras"],
+            "muestras_descartadas": segment["muestras_descartadas"],
+            "descartes": segment["descartes"],
+        }
+        try:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"Error al escribir índice de segmentos: {e}", file=sys.stderr)
+
+    def encoder_loop(self):
+        """Hilo codificador: escribe los bloques encolados en el segmento horario."""
+        while True:
+            item = self.audio_queue.get()
+            if item is None:
+                break
+            timestamp, block, dropped_before = item
+
+            try:
+                if self.segment is not None and timestamp >= self.segment["fin"]:
+                    self.close_segment()
+                if self.segment is None:
+                    self.open_segment(timestamp)
+
+                segment = self.segment
+                if dropped_before:
+                    if len(segment["descartes"]) < self.MAX_DROP_RECORDS:
+                        segment["descartes"].append([segment["muestras"], dropped_before])
+                    segment["muestras_descartadas"] += dropped_before
+
+                if self.file_format == "WAV":
+                    pcm = np.clip(block, -1.0, 1.0) * 32767.0
+                    segment["writer"].writeframes(pcm.astype("<i2").tobytes())
+                else:
+                    segment["writer"].write(block)
+                segment["muestras"] += len(block)
+                self.written_samples += len(block)
+            except Exception as e:
+                print(f"Error al archivar audio: {e}", file=sys.stderr)
+
+        self.close_segment()
+
+    def close(self):
+        """Vacía la cola, cierra el segmento actual y detiene el hilo."""
+        self.audio_queue.put(None)
+        self._thread.join(timeout=10.0)
+        if self.dropped_blocks:
+            print(
+                f"Archivo de audio: {self.dropped_blocks} bloques descartados "
+                f"({self.dropped_samples / self.sample_rate:.1f} s)"
+            )
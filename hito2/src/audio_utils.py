@@ -1,5 +1,5 @@
 import numpy as np
-from scipy.signal import zpk2sos, bilinear_zpk
+from scipy.signal import bilinear_zpk, firwin, zpk2sos
 
 
 def create_dba_filter(fs):
@@ -90,6 +90,55 @@ def create_dba_filter(fs):
     return sos
 
 
+def create_k_weighting_filter(fs):
+    """
+    Diseña el filtro de Ponderación K (ITU-R BS.1770) digital.
+
+    La ponderación K es la cascada de un pre-filtro de estantería alta
+    (+4 dB sobre ~1.5 kHz, modela la cabeza) y un pasa-altos RLB (~38 Hz).
+    Los coeficientes se recalculan para la tasa de muestreo dada a partir de
+    los parámetros analógicos de la norma (a 48 kHz coinciden con la tabla).
+
+    :param fs: Tasa de muestreo (Sample Rate) en Hz
+    :return: Coeficientes 'sos' del filtro (Second-Order Sections)
+    """
+
+    # Etapa 1: estantería alta
+    gain_db = 3.999843853973347
+    f0 = 1681.974450955533
+    q = 0.7071752369554196
+
+    k = np.tan(np.pi * f0 / fs)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh**0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = [
+        (vh + vb * k / q + k * k) / a0,
+        2.0 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+        1.0,
+        2.0 * (k * k - 1.0) / a0,
+        (1.0 - k / q + k * k) / a0,
+    ]
+
+    # Etapa 2: pasa-altos RLB
+    f0 = 38.13547087602444
+    q = 0.5003270373238773
+
+    k = np.tan(np.pi * f0 / fs)
+    a0 = 1.0 + k / q + k * k
+    highpass = [
+        1.0,
+        -2.0,
+        1.0,
+        1.0,
+        2.0 * (k * k - 1.0) / a0,
+        (1.0 - k / q + k * k) / a0,
+    ]
+
+    return np.array([shelf, highpass])
+
+
 def db_to_linear(db):
     """
     Convierte decibeles a escala lineal.
@@ -155,3 +204,65 @@ def apply_time_weighting(current_value, previous_value, time_constant, sample_ra
     weighted_value = alpha * current_value + (1.0 - alpha) * previous_value
 
     return weighted_value
+
+
+def create_dbc_filter(fs):
+    """
+    Diseña un filtro de Ponderación C (dBC) digital usando scipy.
+
+    La ponderación C (IEC 61672-1) es casi plana entre 31.5 Hz y 8 kHz; se usa
+    para el nivel de pico LCpeak y para comparar con la ponderación A cuando
+    hay predominio de bajas frecuencias.
+
+    :param fs: Tasa de muestreo (Sample Rate) en Hz
+    :return: Coeficientes 'sos' del filtro (Second-Order Sections)
+    """
+
+    # Frecuencias características del filtro C-weighting
+    f1 = 20.6  # Hz
+    f4 = 12194.0  # Hz
+
+    w1 = 2 * np.pi * f1
+    w4 = 2 * np.pi * f4
+
+    # 2 ceros en el origen, polos dobles en f1 y f4
+    zeros_analog = [0, 0]
+    poles_analog = [-w1 + 0j, -w1 + 0j, -w4 + 0j, -w4 + 0j]
+
+    zeros_digital, poles_digital, k_digital = bilinear_zpk(
+        zeros_analog, poles_analog, 1.0, fs=fs
+    )
+
+    # Normalizar para que la ganancia en 1 kHz sea 1.0 (0 dB)
+    z_test = np.exp(1j * 2 * np.pi * 1000.0 / fs)
+    h_1khz = k_digital * np.prod(z_test - zeros_digital) / np.prod(z_test - poles_digital)
+    if np.abs(h_1khz) > 1e-10:
+        k_digital = k_digital / np.abs(h_1khz)
+
+    try:
+        sos = zpk2sos(zeros_digital, poles_digital, k_digital)
+    except Exception as e:
+        print(f"Error al crear filtro dBC: {e}")
+        sos = np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]])
+
+    return sos
+
+
+def create_true_peak_filter(oversampling=4, taps_per_phase=12):
+    """
+    Diseña el filtro interpolador polifásico para medir true-peak.
+
+    Se diseña un pasa-bajos FIR con corte en la frecuencia de Nyquist original
+    y se reparte en 'oversampling' fases. Cada fase calcula una de las
+    muestras intermedias, sin insertar ceros ni filtrar a la tasa alta.
+
+    :param oversampling: Factor de sobremuestreo (4 según ITU-R BS.1770)
+    :param taps_per_phase: Coeficientes por fase
+    :return: Matriz (taps_per_phase, oversampling) con una fase por columna
+    """
+    n_taps = oversampling * taps_per_phase
+    h = firwin(n_taps, 1.0 / oversampling, window=("kaiser", 8.0)) * oversampling
+    # h[p::L] es la fase p; se invierte para usarla como producto con una ventana
+    phases = h.reshape(taps_per_phase, oversampling)
+    return phases[::-1, :].copy()
+
@@ -1,12 +1,15 @@
 import queue
 import sys
-import threading
+import time
 
 import numpy as np
 import sounddevice as sd
-from PyQt6.QtCore import QObject, QTimer, pyqtSignal
-from scipy.signal import sosfilt, sosfilt_zi
-from src.audio_utils import create_dba_filter
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from src.latency_control import IMPULSE_PROFILE, AdaptiveLatencyController
+from src.measurement_pipeline import MeasurementPipeline
+from src.profiling import StageTimer, ThreadProfiler, format_stage_timings
+from src.spectrogram import SpectrogramAnalyzer
+from src.timeline import SampleTimeline, clock_correction_message
 
 
 class AudioWorker(QObject):
@@ -18,6 +21,14 @@ class AudioWorker(QObject):
 
     # --- Señales ---
     new_measurement_dba = pyqtSignal(float)
+    new_weighted_levels = pyqtSignal(dict)
+    new_peak_metrics = pyqtSignal(dict)
+    new_spectrum_frames = pyqtSignal(object)
+    new_loudness = pyqtSignal(dict)
+    new_input_health = pyqtSignal(dict)
+    new_timeline_status = pyqtSignal(dict)
+    new_stage_timings = pyqtSignal(dict)
+    profile_finished = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     finished = pyqtSignal()
 
@@ -31,6 +42,27 @@ class AudioWorker(QObject):
     TIME_WEIGHTING_FAST = 0.125
     TIME_WEIGHTING_SLOW = 1.0
     TIME_WEIGHTING_IMPULSE = 0.035
+    PEAK_INTERVAL_S = 60.0
+    CALLBACK_HISTORY = 2048
+    # Los huecos de audio se informan por consola agrupados cada GAP_REPORT_S
+    GAP_REPORT_S = 10.0
+
+    # Etapas de process_audio con tiempo propio (ver StageTimer) y cada
+    # cuánto se informan sus percentiles
+    PROCESS_STAGES = (
+        "cola",
+        "reloj",
+        "concatenar",
+        "taps",
+        "espectrograma",
+        "salud",
+        "nivel",
+        "picos",
+        "sonoridad",
+        "emision",
+        "publicadores",
+    )
+    STAGE_REPORT_S = 10.0
 
     # Configuración por defecto: Fast (recomendado para mediciones ambientales)
     TIME_WEIGHTING = TIME_WEIGHTING_FAST
@@ -42,15 +74,22 @@ class AudioWorker(QObject):
         self.device_id = None
         self.stream = None
 
+        # Perfil del stream (ver set_latency_mode)
+        self.block_size = self.BLOCK_SIZE
+        self.latency = "high"  # Usar latencia alta para mayor estabilidad
+        self.latency_controller = None
+
         # Cola thread-safe para comunicación entre callback y procesamiento
         self.audio_queue = queue.Queue(maxsize=self.QUEUE_MAX_SIZE)
 
-        # Lock para acceso seguro a variables compartidas
-        self.lock = threading.Lock()
-
-        # Crear el filtro y su estado
-        self.sos_filter = create_dba_filter(self.SAMPLE_RATE)
-        self.filter_state = sosfilt_zi(self.sos_filter)
+        # Filtro A, ponderación temporal, Leq A/C/Z, picos y sonoridad
+        self.pipeline = MeasurementPipeline(
+            self.SAMPLE_RATE,
+            self.CALIBRATION_OFFSET_DB,
+            self.TIME_WEIGHTING,
+            self.SILENCE_THRESHOLD_DB,
+            self.PEAK_INTERVAL_S,
+        )
 
         # Timer para procesamiento periódico (se iniciará en el thread correcto)
         self.process_timer = None
@@ -60,19 +99,236 @@ class AudioWorker(QObject):
         self.overflow_count = 0
         self.total_blocks = 0
 
-        # Variable para mantener último valor válido
-        self.last_valid_dba = None
+        # Instantes de los últimos callbacks (para medir el jitter)
+        self.callback_times = np.zeros(self.CALLBACK_HISTORY, dtype=np.float64)
+
+        # Reloj de muestras: el callback numera cada bloque con su posición
+        self.timeline = SampleTimeline(self.SAMPLE_RATE)
+        self.timeline.reset(0)
+        self.stream_position = 0
+        self.stream_anchor = None
+        self.last_adc_time = None
+        self.pending_gaps = {}
+        self.next_gap_report = 0.0
+
+        # Espectrograma opcional (ver enable_spectrogram)
+        self.spectrogram = None
+
+        # Publicadores opcionales (bus local, colector central) con interfaz publish()/flush()
+        self.publishers = []
 
-        self.weighted_rms = 0.0
+        # Consumidores opcionales de audio crudo (buffer de eventos, archivo) con write_audio()
+        self.audio_taps = []
+
+        # Tiempos por etapa de cada tick y captura de perfil bajo demanda
+        self.stage_timer = StageTimer(self.PROCESS_STAGES)
+        self.next_stage_report = 0.0
+        self.profiler = None
 
     def set_device(self, device_id):
         """Establece el dispositivo de audio a usar."""
         self.device_id = device_id
 
+    def set_latency_mode(self, mode, min_block=256, max_block=8192):
+        """
+        Elige cómo se configura el stream de audio.
+
+        - "fijo": BLOCK_SIZE con latencia alta (comportamiento por defecto).
+        - "adaptativo": parte del bloque más chico permitido y sube o baja
+          según overflows, carga de procesamiento y jitter del callback.
+        - "impulso": perfil manual de baja latencia con ponderación Impulse.
+
+        :param mode: "fijo", "adaptativo" o "impulso"
+        :param min_block: Bloque mínimo (muestras) del modo adaptativo
+        :param max_block: Bloque máximo (muestras) del modo adaptativo
+        """
+        self.latency_controller = None
+        self.pipeline.time_weighting = self.TIME_WEIGHTING
+        if mode == "adaptativo":
+            self.latency_controller = AdaptiveLatencyController(
+                self.SAMPLE_RATE, min_block, max_block
+            )
+            self.block_size, self.latency = self.latency_controller.profile
+        elif mode == "impulso":
+            self.block_size, self.latency = IMPULSE_PROFILE
+            self.pipeline.time_weighting = self.TIME_WEIGHTING_IMPULSE
+        else:
+            self.block_size, self.latency = self.BLOCK_SIZE, "high"
+        self.resize_queue()
+
+    def set_dsp_backend(self, backend):
+        """
+        Elige la implementación de la ponderación A (ver src/fused_dsp.py).
+
+        :param backend: "auto" (numba si está instalado), "numba" o "numpy"
+        """
+        self.pipeline.set_backend(backend)
+        print(f"Backend DSP: {self.pipeline.a_weighting.backend}")
+
+    def resize_queue(self):
+        """Ajusta la cola para guardar el mismo tiempo de audio con cualquier bloque."""
+        with self.audio_queue.mutex:
+            self.audio_queue.maxsize = max(
+                self.QUEUE_MAX_SIZE, self.QUEUE_MAX_SIZE * self.BLOCK_SIZE // self.block_size
+            )
+
+    def enable_spectrogram(self, frame_size=4096, workers=1):
+        """
+        Activa el cálculo del espectrograma (STFT con 75% de solapamiento).
+
+        :param frame_size: Puntos de la FFT
+        :param workers: Hilos para scipy.fft (-1 = todos los núcleos)
+        :return: El SpectrogramAnalyzer creado
+        """
+        self.spectrogram = SpectrogramAnalyzer(
+            self.SAMPLE_RATE,
+            self.CALIBRATION_OFFSET_DB,
+            frame_size=frame_size,
+            workers=workers,
+        )
+        return self.spectrogram
+
+    def add_publisher(self, publisher):
+        """Agrega un publicador de mediciones (bus local, colector, etc.)."""
+        self.publishers.append(publisher)
+
+    def add_audio_tap(self, tap):
+        """Agrega un consumidor del audio crudo de cada tick."""
+        self.audio_taps.append(tap)
+
+    def emit_measurement(self, dba_level, timestamp=None, duration_s=None):
+        """
+        Entrega la medición del tick a la UI y a los publicadores.
+        Los publicadores no bloquean: un datagrama o un append a una cola por tick.
+
+        :param dba_level: Nivel en dBA
+        :param timestamp: Tiempo de la medición (None = ahora)
+        :param duration_s: Audio real que representa la medición (sin huecos)
+        """
+        self.new_measurement_dba.emit(dba_level)
+        self.stage_timer.lap("emision")
+
+        if self.publishers:
+            if timestamp is None:
+                timestamp = time.time()
+            for publisher in self.publishers:
+                publisher.publish(timestamp, dba_level, duration_s)
+                publisher.flush()
+            self.stage_timer.lap("publicadores")
+
+    def report_timeline(self, timestamp, duration_s, coverage, gaps):
+        """
+        Informa el estado del reloj de muestras del tick y sus huecos.
+
+        Se emite antes de la medición del tick, así la UI conoce su tiempo.
+        Los huecos se entregan a los publicadores que implementan record_gap().
+
+        :param timestamp: Tiempo (reloj de muestras) del final del tick
+        :param duration_s: Audio real del tick (segundos)
+        :param coverage: Porcentaje del tick con audio
+        :param gaps: Lista de huecos detectados (ver SampleTimeline.add_block)
+        """
+        self.new_timeline_status.emit(
+            {
+                "timestamp": timestamp,
+                "duracion_s": duration_s,
+                "cobertura": coverage,
+                "cobertura_total": self.timeline.coverage,
+                "huecos": gaps,
+            }
+        )
+        for gap in gaps:
+            pending = self.pending_gaps.setdefault(gap["motivo"], [0, 0.0])
+            pending[0] += 1
+            pending[1] += gap["duracion_s"]
+            for publisher in self.publishers:
+                if hasattr(publisher, "record_gap"):
+                    publisher.record_gap(gap["inicio"], gap["fin"], gap["motivo"])
+        if self.pending_gaps and timestamp >= self.next_gap_report:
+            self.report_gaps(timestamp)
+        self.stage_timer.lap("emision")
+
+    def report_gaps(self, timestamp):
+        """
+        Informa por consola los huecos acumulados (una línea por motivo) y
+        no vuelve a hacerlo hasta GAP_REPORT_S después.
+
+        :param timestamp: Tiempo (reloj de muestras) del tick actual
+        """
+        for reason, (count, seconds) in self.pending_gaps.items():
+            print(
+                f"Huecos de audio ({reason}): {count} en los últimos "
+                f"{self.GAP_REPORT_S:.0f} s, {seconds * 1000:.0f} ms en total",
+                file=sys.stderr,
+            )
+        self.pending_gaps = {}
+        self.next_gap_report = timestamp + self.GAP_REPORT_S
+
+    def resync_timeline(self, wall_time, sample):
+        """
+        Ancla el reloj de muestras o corrige su deriva (ver
+        SampleTimeline.resync) e informa la corrección por consola.
+        """
+        correction = self.timeline.resync(wall_time, sample)
+        if correction is not None:
+            print(clock_correction_message(correction), file=sys.stderr)
+
+    def report_stage_timings(self, now):
+        """
+        Cierra el tick en el StageTimer y, cada STAGE_REPORT_S, emite los
+        percentiles por etapa (ver StageTimer.percentiles).
+
+        :param now: Tiempo actual (time.perf_counter)
+        """
+        self.stage_timer.stop()
+        if now >= self.next_stage_report:
+            self.next_stage_report = now + self.STAGE_REPORT_S
+            self.new_stage_timings.emit(self.stage_timer.percentiles())
+
+    @pyqtSlot(str, float, str)
+    def start_profile(self, mode, duration_s, base_path):
+        """
+        Captura durante duration_s el perfil del hilo del worker, sin detener
+        la medición (ver ThreadProfiler). Debe invocarse con una señal
+        encolada para que corra en el hilo del worker; en modo "cprofile" se
+        perfilan los ticks de process_audio.
+
+        :param mode: "muestreo" o "cprofile"
+        :param duration_s: Duración de la captura
+        :param base_path: Ruta de los archivos sin extensión
+        """
+        if self.profiler is not None:
+            print("Advertencia: Ya hay una captura de perfil en curso")
+            return
+        try:
+            self.profiler = ThreadProfiler(mode, duration_s, base_path)
+            self.profiler.start()
+        except Exception as e:
+            self.profiler = None
+            print(f"No se pudo iniciar el perfilado: {e}", file=sys.stderr)
+            self.profile_finished.emit("")
+            return
+        QTimer.singleShot(int(duration_s * 1000), self.finish_profile)
+        print(f"Perfilando el worker ({mode}) durante {duration_s:g} s...")
+
+    def finish_profile(self):
+        """Termina la captura de perfil en curso y escribe sus archivos."""
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return
+        try:
+            path = profiler.finish(format_stage_timings(self.stage_timer.percentiles()))
+            print(f"Perfil del worker guardado en '{path}'")
+        except Exception as e:
+            print(f"Error al guardar el perfil: {e}", file=sys.stderr)
+            path = ""
+        self.profile_finished.emit(path)
+
     def stop(self):
         """Detiene el worker y libera recursos."""
         print("Deteniendo worker de audio...")
         self._running = False
+        self.finish_profile()
 
         # Detener timer si existe
         if self.process_timer and self.process_timer.isActive():
@@ -108,11 +364,14 @@ class AudioWorker(QObject):
         if not self._running:
             return
 
+        self.callback_times[self.total_blocks % self.CALLBACK_HISTORY] = time.perf_counter()
         self.total_blocks += 1
 
         # Reportar problemas (sin spam)
+        overflow = False
         if status:
             if status.input_overflow:
+                overflow = True
                 self.overflow_count += 1
                 # Solo reportar cada 100 overflows
                 if self.overflow_count % 100 == 0:
@@ -121,14 +380,28 @@ class AudioWorker(QObject):
                         file=sys.stderr,
                     )
 
+        # Avanzar el reloj de muestras; si hubo overflow y el dispositivo
+        # informa el tiempo ADC, lo perdido se estima desde ese tiempo
+        adc_time = getattr(time_info, "inputBufferAdcTime", 0.0)
+        if overflow and adc_time and self.last_adc_time is not None:
+            lost = int(round((adc_time - self.last_adc_time) * self.SAMPLE_RATE)) - frames
+            if lost > 0:
+                self.stream_position += lost
+        self.last_adc_time = adc_time or None
+        start_sample = self.stream_position
+        self.stream_position += frames
+        # Hora del final del último bloque, para anclar el reloj de muestras
+        self.stream_anchor = (time.time(), self.stream_position)
+
         # Intentar poner datos en la cola SIN BLOQUEAR
         try:
             # Copiar solo el canal mono
             audio_data = indata[:, 0].copy()
-            self.audio_queue.put_nowait(audio_data)
+            self.audio_queue.put_nowait((start_sample, audio_data, overflow))
         except queue.Full:
             # Si la cola está llena, descartar este bloque
             # Es mejor perder un bloque que bloquear el callback
+            # (el hueco se detecta por la posición del bloque siguiente)
             pass
 
     def process_audio(self):
@@ -139,98 +412,82 @@ class AudioWorker(QObject):
         if not self._running:
             return
 
+        tick_start = time.perf_counter()
+        self.stage_timer.start()
+
         # Procesar todos los bloques disponibles en la cola
-        blocks_processed = 0
+        samples_processed = 0
         accumulated_chunks = []
 
         # Extraer múltiples bloques si están disponibles
-        while blocks_processed < 10:  # Procesar hasta 10 bloques por vez
+        # (hasta el equivalente a 10 bloques de BLOCK_SIZE por vez)
+        while samples_processed < 10 * self.BLOCK_SIZE:
             try:
-                audio_data = self.audio_queue.get_nowait()
-                accumulated_chunks.append(audio_data)
-                blocks_processed += 1
+                block = self.audio_queue.get_nowait()
+                accumulated_chunks.append(block)
+                samples_processed += len(block[1])
             except queue.Empty:
                 break
 
         if len(accumulated_chunks) == 0:
             # No hay datos para procesar
             return
+        self.stage_timer.lap("cola")
 
         try:
-            # Concatenar todos los bloques
-            audio_chunk = np.concatenate(accumulated_chunks)
-
-            # Aplicar el filtro dBA con thread-safety
-            with self.lock:
-                filtered_chunk, self.filter_state = sosfilt(
-                    self.sos_filter, audio_chunk, zi=self.filter_state
-                )
-
-            # Detectar clipping (sobrecarga digital)
-            if np.max(np.abs(filtered_chunk)) > 0.99:
-                print(
-                    "⚠️  ADVERTENCIA: Clipping detectado! Reducir ganancia del micrófono",
-                    file=sys.stderr,
+            # Ubicar los bloques en el reloj de muestras y detectar huecos
+            if self.stream_anchor is not None:
+                self.resync_timeline(*self.stream_anchor)
+            first_sample = self.timeline.next_sample
+            gaps = []
+            for start_sample, audio_data, overflow in accumulated_chunks:
+                gap = self.timeline.add_block(
+                    start_sample,
+                    len(audio_data),
+                    "overflow" if overflow else "descarte",
+                    mark=overflow,
                 )
+                if gap is not None:
+                    gaps.append(gap)
+            self.stage_timer.lap("reloj")
 
-            # Calcular RMS instantáneo del bloque actual
-            rms_instantaneous = np.sqrt(np.mean(filtered_chunk**2))
-
-            # Calcular alpha basado en el tiempo real procesado
-            chunk_duration = len(audio_chunk) / self.SAMPLE_RATE
-
-            # Fórmula: alpha = 1 - exp(-T/tau)
-            # donde T = duración del chunk, tau = constante de tiempo
-            alpha = 1.0 - np.exp(-chunk_duration / self.TIME_WEIGHTING)
-
-            # Aplicar filtro exponencial (como un sonómetro real)
-            # weighted_rms = alpha * rms_instant + (1 - alpha) * weighted_rms_anterior
-            self.weighted_rms = (
-                alpha * rms_instantaneous + (1.0 - alpha) * self.weighted_rms
+            # Concatenar todos los bloques
+            audio_chunk = np.concatenate([block[1] for block in accumulated_chunks])
+            self.stage_timer.lap("concatenar")
+
+            timestamp = self.timeline.time_at(self.timeline.next_sample)
+            duration_s = len(audio_chunk) / self.SAMPLE_RATE
+            span = self.timeline.next_sample - first_sample
+            self.report_timeline(
+                timestamp,
+                duration_s,
+                100.0 * len(audio_chunk) / span if span > 0 else 100.0,
+                gaps,
             )
 
-            # Usar el valor ponderado para el cálculo de dB
-            rms = self.weighted_rms
-
-            # Evitar log de cero
-            if rms < 1e-10:
-                rms = 1e-10
-
-            # Convertir RMS ponderado a dBFS
-            db_val = 20 * np.log10(rms)
-
-            # Validar resultado
-            if not np.isfinite(db_val):
-                # Reiniciar filtro si hay valores inválidos
-                print("Valor inválido detectado, reiniciando filtro", file=sys.stderr)
-                with self.lock:
-                    self.filter_state = sosfilt_zi(self.sos_filter)
-                # Usar último valor válido si existe, sino retornar
-                if self.last_valid_dba is not None:
-                    self.new_measurement_dba.emit(self.last_valid_dba)
-                return
-
-            # Aplicar offset de calibración
-            dba_level = db_val + self.CALIBRATION_OFFSET_DB
-
-            # Detectar silencio real (micrófono muteado o sin señal)
-            if db_val < self.SILENCE_THRESHOLD_DB:
-                # Emitir un valor muy bajo para indicar silencio/mute
-                dba_level = self.CALIBRATION_OFFSET_DB + self.SILENCE_THRESHOLD_DB
-                # Asegurar que no sea menor a 0
-                dba_level = max(dba_level, 0.0)
-                self.new_measurement_dba.emit(dba_level)
-                return
-
-            # Clamp solo el límite superior, permitir valores bajos reales
-            # Rango típico: cualquier valor bajo hasta 130 dBA
-            dba_level = min(dba_level, 130.0)
-
-            # Guardar como último valor válido
-            self.last_valid_dba = dba_level
+            # Entregar el audio crudo (sin ponderar) a los consumidores
+            for tap in self.audio_taps:
+                tap.write_audio(audio_chunk)
+            self.stage_timer.lap("taps")
+
+            # Espectrograma: todos los frames completos del tick en una sola FFT
+            if self.spectrogram is not None:
+                frames = self.spectrogram.process(audio_chunk)
+                if len(frames):
+                    self.new_spectrum_frames.emit(frames.copy())
+                self.stage_timer.lap("espectrograma")
+
+            # Filtro A, Leq A/C/Z, picos, sonoridad y nivel ponderado del tick
+            result = self.pipeline.process(audio_chunk, self.stage_timer)
+            self.new_weighted_levels.emit(result["ponderaciones"])
+            self.new_peak_metrics.emit(result["picos"])
+            self.new_loudness.emit(result["sonoridad"])
+            self.new_input_health.emit(result["salud"])
+            self.stage_timer.lap("emision")
 
             # Emitir señal de forma segura
-            self.new_measurement_dba.emit(dba_level)
+            if result["nivel_dba"] is not None:
+                self.emit_measurement(result["nivel_dba"], timestamp, duration_s)
 
         except Exception as e:
             print(f"Error procesando audio: {e}", file=sys.stderr)
@@ -238,6 +495,59 @@ class AudioWorker(QObject):
 
             traceback.print_exc()
 
+        now = time.perf_counter()
+        self.report_stage_timings(now)
+        if self.latency_controller is not None:
+            self.latency_controller.add_processing_time(now - tick_start)
+            profile = self.latency_controller.observe(
+                now, self.overflow_count, self.callback_times
+            )
+            if profile is not None:
+                self.reconfigure_stream(*profile)
+
+    def open_stream(self):
+        """Crea e inicia el stream con el perfil actual (bloque y latencia)."""
+        self.stream = sd.InputStream(
+            samplerate=self.SAMPLE_RATE,
+            blocksize=self.block_size,
+            device=self.device_id,
+            channels=1,
+            dtype="float32",
+            latency=self.latency,
+            callback=self.audio_callback,
+        )
+        self.stream.start()
+
+    def reconfigure_stream(self, block_size, latency):
+        """
+        Reabre el stream con otro tamaño de bloque y latencia.
+        El estado de los filtros se conserva; solo se pierde el audio del reinicio.
+
+        :param block_size: Tamaño de bloque en muestras
+        :param latency: Latencia de PortAudio ("low", "high" o segundos)
+        """
+        try:
+            stopped_at = time.perf_counter()
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+            self.block_size = block_size
+            self.latency = latency
+            self.resize_queue()
+            # El audio no capturado durante el reinicio queda como hueco
+            self.stream_position += int(
+                (time.perf_counter() - stopped_at) * self.SAMPLE_RATE
+            )
+            self.last_adc_time = None
+            self.open_stream()
+        except Exception as e:
+            self.stream = None
+            error_msg = f"No se pudo reconfigurar el stream de audio: {e}"
+            print(error_msg, file=sys.stderr)
+            self._running = False
+            self.error_signal.emit(error_msg)
+            self.finished.emit()
+
     def start_processing_timer(self):
         """
         Inicia el timer de procesamiento.
@@ -246,12 +556,23 @@ class AudioWorker(QObject):
         if self.timer_started:
             return
 
+        self.stage_timer.reset()
+        self.next_stage_report = time.perf_counter() + self.STAGE_REPORT_S
+
         self.process_timer = QTimer()
-        self.process_timer.timeout.connect(self.process_audio)
+        self.process_timer.timeout.connect(self.process_tick)
         self.process_timer.start(self.UPDATE_INTERVAL_MS)
         self.timer_started = True
         print(f"Timer de procesamiento iniciado ({self.UPDATE_INTERVAL_MS}ms)")
 
+    def process_tick(self):
+        """Tick del timer: process_audio(), dentro de la captura de perfil si hay una."""
+        profiler = self.profiler
+        if profiler is None:
+            self.process_audio()
+        else:
+            profiler.call(self.process_audio)
+
     def run(self):
         """
         Inicializa y arranca el stream de audio.
@@ -290,8 +611,7 @@ class AudioWorker(QObject):
 
         try:
             # Reiniciar estado
-            with self.lock:
-                self.filter_state = sosfilt_zi(self.sos_filter)
+            self.pipeline.reset()
 
             # Limpiar cola
             while not self.audio_queue.empty():
@@ -303,32 +623,30 @@ class AudioWorker(QObject):
             self.overflow_count = 0
             self.total_blocks = 0
 
-            # Reiniciar ponderación temporal
-            self.weighted_rms = 0.0
-
-            # Crear stream con configuración optimizada
-            self.stream = sd.InputStream(
-                samplerate=self.SAMPLE_RATE,
-                blocksize=self.BLOCK_SIZE,
-                device=self.device_id,
-                channels=1,
-                dtype="float32",
-                latency="high",  # Usar latencia alta para mayor estabilidad
-                callback=self.audio_callback,
-            )
+            if self.spectrogram is not None:
+                self.spectrogram.reset()
+
+            self.callback_times[:] = 0.0
+            self.timeline.reset(0)
+            self.stream_position = 0
+            self.stream_anchor = None
+            self.last_adc_time = None
+            self.pending_gaps = {}
+            self.next_gap_report = 0.0
 
             # Marcar como running ANTES de iniciar el stream
             self._running = True
 
-            # Iniciar el stream
-            self.stream.start()
+            # Crear e iniciar el stream con el perfil actual
+            self.open_stream()
 
             print("Stream de audio iniciado correctamente.")
             print(
-                f"Configuración: {self.SAMPLE_RATE} Hz, block={self.BLOCK_SIZE} samples"
+                f"Configuración: {self.SAMPLE_RATE} Hz, block={self.block_size} samples, "
+                f"latencia={self.latency}"
             )
             print(
-                f"Latencia del bloque: {self.BLOCK_SIZE / self.SAMPLE_RATE * 1000:.1f} ms"
+                f"Latencia del bloque: {self.block_size / self.SAMPLE_RATE * 1000:.1f} ms"
             )
 
             # Iniciar el timer de procesamiento
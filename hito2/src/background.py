@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from src.rollups import IntervalAggregate
+
+# Diferencias (dB) entre el nivel medido y el fondo: desde NO_CORRECTION_DB no
+# se corrige; bajo MIN_DIFFERENCE_DB la medición no es válida (la fuente no se
+# distingue del fondo); entre ambas se resta la energía del fondo
+NO_CORRECTION_DB = 10.0
+MIN_DIFFERENCE_DB = 3.0
+
+INDICATORS = ("leq", "l90")
+
+
+def correct_levels(levels, background_db, min_difference_db=MIN_DIFFERENCE_DB):
+    """
+    Corrige niveles por ruido de fondo restando energía (vectorizado).
+
+    :param levels: Nivel o array de niveles medidos en dBA
+    :param background_db: Nivel de fondo en dBA
+    :param min_difference_db: Diferencia mínima para que la corrección sea válida
+    :return: Array de niveles corregidos (NaN donde la diferencia es menor a
+             min_difference_db)
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    difference = levels - background_db
+    with np.errstate(invalid="ignore", divide="ignore"):
+        subtracted = 10.0 * np.log10(
+            10.0 ** (levels / 10.0) - 10.0 ** (background_db / 10.0)
+        )
+    corrected = np.where(difference >= NO_CORRECTION_DB, levels, subtracted)
+    return np.where(difference >= min_difference_db, corrected, np.nan)
+
+
+class BackgroundNoiseMeter:
+    """
+    Medición del ruido de fondo (fuente apagada) y corrección de los niveles.
+
+    Tiene la interfaz publish()/flush()/close() de los publicadores del
+    AudioWorker. Mientras hay una captura en curso (start_capture()), las
+    mediciones se acumulan en un IntervalAggregate (energía e histograma), así
+    que Leq y L90 del fondo salen sin guardar la serie. Al terminar, la
+    referencia se guarda en el archivo JSON y queda como fondo vigente, también
+    después de reiniciar. Fuera de la captura se corrigen el último nivel y el
+    Leq acumulado desde la referencia; el estado queda en self.status.
+    """
+
+    def __init__(self, reference_path, indicator="leq", sample_seconds=0.1):
+        """
+        :param reference_path: Archivo JSON de la referencia de fondo
+        :param indicator: Nivel de fondo usado para corregir: "leq" o "l90"
+        :param sample_seconds: Duración de una medición sin dt
+        """
+        if indicator not in INDICATORS:
+            raise ValueError(f"Indicador de fondo desconocido: {indicator}")
+        self.reference_path = reference_path
+        self.indicator = indicator
+        self.sample_seconds = sample_seconds
+
+        self.capture = None
+        self.capture_seconds = 0.0
+        self.reference = None
+        self.energy = 0.0
+        self.duration = 0.0
+        self.status = None
+        self.load_reference()
+
+    @property
+    def background_db(self):
+        """Nivel de fondo vigente según el indicador (None sin referencia)."""
+        if self.reference is None:
+            return None
+        return self.reference[self.indicator]
+
+    def start_capture(self, duration_s):
+        """
+        Comienza a medir el fondo durante duration_s segundos de audio.
+
+        La captura empieza con la medición siguiente (el intervalo se fija ahí).
+        """
+        self.capture_seconds = float(duration_s)
+        self.capture = "pendiente"
+
+    def cancel_capture(self):
+        """Descarta la captura en curso; la referencia anterior se conserva."""
+        self.capture = None
+        self.update_status(None)
+
+    def publish(self, timestamp, dba, dt=None, *_):
+        """Recibe una medición del flujo (interfaz de publicador)."""
+        self.update(timestamp, dba, dt)
+
+    def flush(self):
+        """Nada que enviar."""
+
+    def close(self):
+        """Nada que liberar: la referencia se guarda al terminar cada captura."""
+
+    def update(self, timestamp, level, dt=None):
+        """
+        Incorpora una medición a la captura o la corrige con el fondo vigente.
+
+        :param timestamp: Tiempo de la medición (segundos epoch)
+        :param level: Nivel en dBA
+        :param dt: Duración representada (por defecto, sample_seconds)
+        """
+        weight = self.sample_seconds if dt is None else dt
+        capture = self.capture
+        if capture == "pendiente":
+            capture = IntervalAggregate(
+                "fondo", timestamp, timestamp + self.capture_seconds
+            )
+            self.capture = capture
+        if capture is not None:
+            capture.add(level, weight)
+            if capture.duration >= self.capture_seconds:
+                self.finish_capture(capture)
+            self.update_status(level)
+            return
+
+        if self.reference is not None:
+            self.energy += weight * 10.0 ** (level / 10.0)
+            self.duration += weight
+        self.update_status(level)
+
+    def finish_capture(self, capture):
+        """Fija la referencia de fondo con la captura terminada y la guarda."""
+        self.capture = None
+        self.reference = {
+            "leq": round(float(capture.leq), 1),
+            "l90": capture.ln(90),
+            "lmax": round(capture.lmax, 1),
+            "lmin": round(capture.lmin, 1),
+            "duracion_s": round(capture.duration, 1),
+            "inicio": datetime.fromtimestamp(capture.start).isoformat(timespec="seconds"),
+        }
+        # El Leq corregido se acumula desde la nueva referencia
+        self.energy = 0.0
+        self.duration = 0.0
+        self.save_reference()
+
+    def update_status(self, level):
+        """Actualiza el estado para la interfaz."""
+        capture = self.capture if isinstance(self.capture, IntervalAggregate) else None
+        status = {
+            "midiendo": self.capture is not None,
+            "progreso": (
+                min(capture.duration / self.capture_seconds, 1.0) if capture else 0.0
+            ),
+            "fondo": self.reference,
+            "indicador": self.indicator,
+            "nivel": level,
+            "nivel_corregido": None,
+            "leq_corregido": None,
+        }
+        background = self.background_db
+        if background is not None and level is not None and capture is None:
+            status["nivel_corregido"] = float(correct_levels(level, background))
+            if self.duration > 0:
+                leq = 10.0 * np.log10(self.energy / self.duration)
+                status["leq_corregido"] = float(correct_levels(leq, background))
+        self.status = status
+
+    def save_reference(self):
+        """Guarda la referencia de fondo vigente."""
+        tmp_path = self.reference_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.reference, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.reference_path)
+        except Exception as e:
+            print(f"Error al guardar la referencia de fondo: {e}", file=sys.stderr)
+
+    def load_reference(self):
+        """Recupera la última referencia de fondo guardada."""
+        try:
+            with open(self.reference_path, "r", encoding="utf-8") as f:
+                self.reference = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Advertencia: No se pudo leer la referencia de fondo: {e}")
+            return
+        self.update_status(None)
+
+
+def main():
+    """Corrige por ruido de fondo los niveles de un log CSV o de una base SQLite."""
+    # Aquí y no arriba: session_report importa compliance, que importa este módulo
+    from src.session_report import load_csv_session, load_sqlite_session, local_datetime
+
+    parser = argparse.ArgumentParser(
+        description="Corrección por ruido de fondo de una sesión guardada"
+    )
+    parser.add_argument("archivo", help="Log CSV o base SQLite")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--fondo", type=float, help="Nivel de fondo en dBA")
+    source.add_argument("--referencia", help="Archivo JSON de la referencia de fondo")
+    parser.add_argument("--indicador", choices=INDICATORS, default="leq")
+    parser.add_argument("--tipo-local", default=None, help="Filtrar por tipo de local")
+    parser.add_argument("--salida", help="CSV con los niveles medidos y corregidos")
+    args = parser.parse_args()
+
+    if args.referencia:
+        with open(args.referencia, "r", encoding="utf-8") as f:
+            background = json.load(f)[args.indicador]
+    else:
+        background = args.fondo
+
+    started = time.perf_counter()
+    if args.archivo.lower().endswith((".db", ".sqlite")):
+        session = load_sqlite_session(args.archivo, args.tipo_local)
+    else:
+        session = load_csv_session(args.archivo, args.tipo_local)
+    corrected = correct_levels(session.levels, background)
+
+    valid = ~np.isnan(corrected)
+    durations = session.durations
+    measured_leq = 10.0 * np.log10(
+        np.dot(durations, 10.0 ** (session.levels / 10.0)) / durations.sum()
+    )
+    print(f"Fondo: {background:.1f} dB(A)")
+    print(f"Leq medido: {measured_leq:.1f} dB(A)")
+    if valid.any():
+        corrected_leq = 10.0 * np.log10(
+            np.dot(durations[valid], 10.0 ** (corrected[valid] / 10.0))
+            / durations[valid].sum()
+        )
+        print(f"Leq corregido (mediciones válidas): {corrected_leq:.1f} dB(A)")
+    difference = session.levels - background
+    total = durations.sum()
+    print(
+        f"Sin corrección (>= {NO_CORRECTION_DB:.0f} dB): "
+        f"{100.0 * durations[difference >= NO_CORRECTION_DB].sum() / total:.1f}% · "
+        f"corregidas: {100.0 * durations[valid & (difference < NO_CORRECTION_DB)].sum() / total:.1f}% · "
+        f"no válidas (< {MIN_DIFFERENCE_DB:.0f} dB): "
+        f"{100.0 * durations[~valid].sum() / total:.1f}%"
+    )
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write("timestamp,nivel_dba,nivel_corregido\n")
+            for seconds, level, value in zip(
+                session.seconds.tolist(), session.levels.tolist(), corrected.tolist()
+            ):
+                timestamp = local_datetime(seconds).strftime("%Y-%m-%d %H:%M:%S")
+                value = "" if value != value else f"{value:.1f}"
+                f.write(f"{timestamp},{level:.1f},{value}\n")
+        print(f"Niveles corregidos en '{args.salida}'")
+    print(f"Tiempo: {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
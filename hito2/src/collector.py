@@ -0,0 +1,517 @@
+import asyncio
+import collections
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+COLLECTOR_MAGIC = b"VUMC"
+COLLECTOR_VERSION = 1
+DEFAULT_PORT = 50421
+
+# Prefijo de longitud para delimitar frames en la conexión TCP persistente
+FRAME_LENGTH = struct.Struct("<I")
+
+# Cabecera del frame de subida: magic, versión, len(medidor), len(local), n_registros
+UPLINK_HEADER = struct.Struct("<4sBBBI")
+
+# Registro en el cable: timestamp (float64) + nivel dBA (float32), igual que el bus
+WIRE_DTYPE = np.dtype([("timestamp", "<f8"), ("nivel_dba", "<f4")])
+
+# Registro almacenado en las particiones horarias
+STORE_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("nivel_dba", "<f4"),
+        ("medidor", "<u2"),
+        ("local", "<u2"),
+    ]
+)
+
+# Máximo de registros por frame (la cabecera usa uint32, pero se limita el tamaño)
+MAX_RECORDS_PER_FRAME = 4096
+
+
+def encode_uplink_frame(meter_id, venue, records):
+    """
+    Codifica un lote de registros de un medidor, con su prefijo de longitud.
+
+    :param meter_id: Identificador del medidor (texto corto)
+    :param venue: Nombre del local donde está instalado
+    :param records: Array estructurado WIRE_DTYPE o lista de (timestamp, dba)
+    :return: bytes listos para enviar por el socket
+    """
+    meter_bytes = meter_id.encode("utf-8")[:255]
+    venue_bytes = venue.encode("utf-8")[:255]
+    data = np.asarray(records, dtype=WIRE_DTYPE).tobytes()
+    count = len(data) // WIRE_DTYPE.itemsize
+
+    payload = (
+        UPLINK_HEADER.pack(
+            COLLECTOR_MAGIC,
+            COLLECTOR_VERSION,
+            len(meter_bytes),
+            len(venue_bytes),
+            count,
+        )
+        + meter_bytes
+        + venue_bytes
+        + data
+    )
+    return FRAME_LENGTH.pack(len(payload)) + payload
+
+
+def decode_uplink_payload(payload):
+    """
+    Decodifica el contenido de un frame de subida (sin el prefijo de longitud).
+
+    :param payload: bytes del frame
+    :return: (medidor, local, bytes de registros, n_registros) o None si es inválido
+    """
+    if len(payload) < UPLINK_HEADER.size:
+        return None
+
+    magic, version, meter_len, venue_len, count = UPLINK_HEADER.unpack_from(payload)
+    if magic != COLLECTOR_MAGIC or version != COLLECTOR_VERSION:
+        return None
+
+    offset = UPLINK_HEADER.size
+    meter_id = payload[offset : offset + meter_len].decode("utf-8", "replace")
+    offset += meter_len
+    venue = payload[offset : offset + venue_len].decode("utf-8", "replace")
+    offset += venue_len
+
+    records = payload[offset : offset + count * WIRE_DTYPE.itemsize]
+    if len(records) != count * WIRE_DTYPE.itemsize:
+        return None
+
+    return meter_id, venue, records, count
+
+
+class VenueRollups:
+    """
+    Agregados por local y por minuto, actualizados a medida que llegan datos.
+
+    Cada celda guarda la suma de energía (para el Leq), el máximo, el mínimo y
+    la cantidad de muestras. Los minutos ya cerrados se escriben a un CSV y se
+    eliminan de memoria.
+    """
+
+    def __init__(self, csv_path, grace_minutes=2):
+        self.csv_path = csv_path
+        self.grace_minutes = grace_minutes
+        # (local, minuto) -> [energía, lmax, lmin, n]
+        self.open_minutes = {}
+
+        if not os.path.exists(self.csv_path):
+            with open(self.csv_path, "w", encoding="utf-8") as f:
+                f.write("minuto,local,leq,lmax,lmin,n_muestras\n")
+
+    def update(self, venue_idx, timestamps, levels):
+        """
+        Incorpora un lote de mediciones (vectorizado).
+
+        :param venue_idx: Array con el índice de local de cada medición
+        :param timestamps: Array de timestamps (segundos epoch)
+        :param levels: Array de niveles en dBA
+        """
+        minutes = (timestamps // 60).astype(np.int64)
+        keys = (venue_idx.astype(np.int64) << 32) | minutes
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        levels = levels[order].astype(np.float64)
+        energy = 10.0 ** (levels / 10.0)
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        energy_sums = np.add.reduceat(energy, starts)
+        maxima = np.maximum.reduceat(levels, starts)
+        minima = np.minimum.reduceat(levels, starts)
+        counts = np.diff(np.r_[starts, len(keys)])
+
+        for key, e, lmax, lmin, n in zip(
+            keys[starts].tolist(),
+            energy_sums.tolist(),
+            maxima.tolist(),
+            minima.tolist(),
+            counts.tolist(),
+        ):
+            cell = self.open_minutes.get(key)
+            if cell is None:
+                self.open_minutes[key] = [e, lmax, lmin, n]
+            else:
+                cell[0] += e
+                cell[1] = max(cell[1], lmax)
+                cell[2] = min(cell[2], lmin)
+                cell[3] += n
+
+    def close_finished(self, venue_names, now=None):
+        """
+        Escribe al CSV los minutos que ya no pueden recibir más datos.
+
+        :param venue_names: Lista de nombres de local (índice -> nombre)
+        :param now: Tiempo actual en segundos epoch (por defecto, time.time())
+        :return: Cantidad de minutos cerrados
+        """
+        if now is None:
+            now = time.time()
+        limit = int(now // 60) - self.grace_minutes
+
+        closed = sorted(
+            key for key in self.open_minutes if (key & 0xFFFFFFFF) <= limit
+        )
+        if not closed:
+            return 0
+
+        lines = []
+        for key in closed:
+            energy, lmax, lmin, n = self.open_minutes.pop(key)
+            minute = key & 0xFFFFFFFF
+            stamp = datetime.fromtimestamp(minute * 60, timezone.utc).strftime(
+                "%Y-%m-%dT%H:%M:00Z"
+            )
+            leq = 10.0 * np.log10(energy / n)
+            lines.append(
+                f"{stamp},{venue_names[key >> 32]},{leq:.1f},{lmax:.1f},{lmin:.1f},{n}\n"
+            )
+
+        with open(self.csv_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+        return len(closed)
+
+
+class CollectorServer:
+    """
+    Servicio central que recibe lotes de mediciones de muchos medidores.
+
+    Cada medidor mantiene una conexión TCP persistente y envía frames con
+    prefijo de longitud. Los frames recibidos se acumulan en memoria y se
+    procesan en bloque cada flush_interval segundos: se escriben en
+    particiones horarias (un archivo binario por hora) y se actualizan los
+    agregados por local con operaciones vectorizadas.
+    """
+
+    def __init__(self, data_dir, host="0.0.0.0", port=DEFAULT_PORT, flush_interval=1.0):
+        self.data_dir = data_dir
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.index_path = os.path.join(self.data_dir, "indice.json")
+        self.meter_names, self.venue_names = self.load_index()
+        self.meter_ids = {name: i for i, name in enumerate(self.meter_names)}
+        self.venue_ids = {name: i for i, name in enumerate(self.venue_names)}
+
+        self.rollups = VenueRollups(os.path.join(self.data_dir, "rollups_minuto.csv"))
+
+        # Lotes pendientes: (bytes de registros, n, índice medidor, índice local)
+        self.pending = []
+
+        # Estadísticas
+        self.connections = 0
+        self.frames_received = 0
+        self.records_received = 0
+        self.invalid_frames = 0
+
+    def load_index(self):
+        """Carga los nombres de medidores y locales ya conocidos."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            return index.get("medidores", []), index.get("locales", [])
+        except FileNotFoundError:
+            return [], []
+        except Exception as e:
+            print(f"Advertencia: No se pudo leer '{self.index_path}': {e}")
+            return [], []
+
+    def save_index(self):
+        """Guarda los nombres de medidores y locales (índice -> nombre)."""
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"medidores": self.meter_names, "locales": self.venue_names},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+    def lookup(self, table, names, name):
+        """Devuelve el índice de un nombre, registrándolo si es nuevo."""
+        idx = table.get(name)
+        if idx is None:
+            idx = len(names)
+            names.append(name)
+            table[name] = idx
+            self.save_index()
+        return idx
+
+    def ingest(self, payload):
+        """Registra un frame recibido (el trabajo pesado se hace en flush)."""
+        decoded = decode_uplink_payload(payload)
+        if decoded is None:
+            self.invalid_frames += 1
+            return
+
+        meter_id, venue, records, count = decoded
+        meter_idx = self.lookup(self.meter_ids, self.meter_names, meter_id)
+        venue_idx = self.lookup(self.venue_ids, self.venue_names, venue)
+
+        self.pending.append((records, count, meter_idx, venue_idx))
+        self.frames_received += 1
+        self.records_received += count
+
+    def flush(self):
+        """Escribe los lotes pendientes en las particiones y actualiza los agregados."""
+        if not self.pending:
+            self.rollups.close_finished(self.venue_names)
+            return
+
+        batches = self.pending
+        self.pending = []
+
+        wire = np.frombuffer(b"".join(b[0] for b in batches), dtype=WIRE_DTYPE)
+        counts = np.fromiter((b[1] for b in batches), dtype=np.int64, count=len(batches))
+
+        rows = np.empty(len(wire), dtype=STORE_DTYPE)
+        rows["timestamp"] = wire["timestamp"]
+        rows["nivel_dba"] = wire["nivel_dba"]
+        rows["medidor"] = np.repeat(
+            np.fromiter((b[2] for b in batches), dtype=np.uint16, count=len(batches)),
+            counts,
+        )
+        rows["local"] = np.repeat(
+            np.fromiter((b[3] for b in batches), dtype=np.uint16, count=len(batches)),
+            counts,
+        )
+
+        # Partición horaria: un archivo por hora UTC
+        hours = (rows["timestamp"] // 3600).astype(np.int64)
+        order = np.argsort(hours, kind="stable")
+        rows = rows[order]
+        hours = hours[order]
+        bounds = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            with open(self.partition_path(int(hours[start])), "ab") as f:
+                rows[start:end].tofile(f)
+
+        self.rollups.update(rows["local"], rows["timestamp"], rows["nivel_dba"])
+        self.rollups.close_finished(self.venue_names)
+
+    def partition_path(self, hour):
+        """Ruta del archivo de la partición horaria (hora desde epoch, UTC)."""
+        stamp = datetime.fromtimestamp(hour * 3600, timezone.utc)
+        day_dir = os.path.join(self.data_dir, stamp.strftime("%Y-%m-%d"))
+        os.makedirs(day_dir, exist_ok=True)
+        return os.path.join(day_dir, stamp.strftime("%H") + ".bin")
+
+    async def handle_connection(self, reader, writer):
+        """Atiende una conexión persistente de un medidor."""
+        self.connections += 1
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_LENGTH.size)
+                (length,) = FRAME_LENGTH.unpack(header)
+                payload = await reader.readexactly(length)
+                self.ingest(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Error en conexión {peer}: {e}", file=sys.stderr)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def flush_loop(self):
+        """Procesa los lotes pendientes periódicamente e imprime estadísticas."""
+        last_report = time.monotonic()
+        last_records = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error al escribir particiones: {e}", file=sys.stderr)
+
+            now = time.monotonic()
+            if now - last_report >= 10.0:
+                rate = (self.records_received - last_records) / (now - last_report)
+                print(
+                    f"Conexiones: {self.connections}, registros/s: {rate:.0f}, "
+                    f"frames inválidos: {self.invalid_frames}"
+                )
+                last_report = now
+                last_records = self.records_received
+
+    async def serve(self):
+        """Inicia el servidor y el ciclo de escritura."""
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, backlog=2048
+        )
+        print(f"Colector escuchando en {self.host}:{self.port}, datos en {self.data_dir}")
+        flush_task = asyncio.create_task(self.flush_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flush_task.cancel()
+            self.flush()
+
+
+def read_partition(path):
+    """
+    Lee una partición horaria como array estructurado (memory-mapped).
+
+    :param path: Ruta del archivo .bin
+    :return: np.memmap con STORE_DTYPE
+    """
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=STORE_DTYPE)
+    return np.memmap(path, dtype=STORE_DTYPE, mode="r")
+
+
+class CollectorClient:
+    """
+    Cliente del colector para un medidor.
+
+    Tiene la misma interfaz publish()/flush() que MeasurementPublisher, así que
+    se puede conectar directamente al AudioWorker. publish() solo agrega a una
+    cola acotada; un hilo en segundo plano envía los lotes cada batch_interval
+    segundos por una única conexión TCP que se reutiliza. Si el colector no
+    está disponible, se reintenta y los registros más antiguos se descartan
+    (y se cuentan) cuando la cola se llena.
+    """
+
+    def __init__(
+        self,
+        host,
+        port=DEFAULT_PORT,
+        meter_id=None,
+        venue="",
+        batch_interval=1.0,
+        max_pending=36000,
+    ):
+        self.address = (host, port)
+        self.meter_id = meter_id or socket.gethostname()
+        self.venue = venue
+        self.batch_interval = batch_interval
+
+        self.pending = collections.deque(maxlen=max_pending)
+        # publish() corre en el hilo de la interfaz y send_pending() en el del
+        # cliente: el lock evita que un append en la cola llena descarte (sin
+        # contarlos) registros devueltos por un envío fallido
+        self.lock = threading.Lock()
+        self.sock = None
+
+        self.records_sent = 0
+        self.records_dropped = 0
+        self.reconnects = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def publish(self, timestamp, dba, *_):
+        """Agrega un registro a la cola de envío (no espera a la red)."""
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.records_dropped += 1
+            self.pending.append((timestamp, dba))
+
+    def flush(self):
+        """El envío lo hace el hilo del cliente; se mantiene por compatibilidad."""
+
+    def connect(self):
+        """Abre la conexión persistente con el colector."""
+        sock = socket.create_connection(self.address, timeout=5.0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+
+    def disconnect(self):
+        """Cierra la conexión actual."""
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def send_pending(self):
+        """Envía todo lo acumulado. Si falla, los registros vuelven a la cola."""
+        if not self.pending:
+            return
+
+        records = []
+        with self.lock:
+            while self.pending and len(records) < MAX_RECORDS_PER_FRAME:
+                records.append(self.pending.popleft())
+
+        try:
+            if self.sock is None:
+                self.connect()
+                self.reconnects += 1
+            self.sock.sendall(encode_uplink_frame(self.meter_id, self.venue, records))
+            self.records_sent += len(records)
+        except OSError as e:
+            print(f"No se pudo enviar al colector: {e}", file=sys.stderr)
+            self.disconnect()
+            # Devolver a la cola; si no caben, los más nuevos tienen prioridad
+            # y los más antiguos del lote se descartan (y se cuentan)
+            with self.lock:
+                room = self.pending.maxlen - len(self.pending)
+                if room < len(records):
+                    self.records_dropped += len(records) - room
+                    records = records[len(records) - room :]
+                self.pending.extendleft(reversed(records))
+            raise
+
+    def run(self):
+        """Ciclo del hilo de envío."""
+        backoff = self.batch_interval
+        while not self._stop.wait(backoff):
+            try:
+                while self.pending:
+                    self.send_pending()
+                backoff = self.batch_interval
+            except OSError:
+                backoff = min(backoff * 2, 30.0)
+
+    def close(self):
+        """Detiene el hilo, intentando enviar lo pendiente."""
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        try:
+            while self.pending:
+                self.send_pending()
+        except OSError:
+            pass
+        self.disconnect()
+
+
+def main():
+    """Inicia el servicio colector."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Colector central de mediciones")
+    parser.add_argument("--datos", default="datos_colector", help="Directorio de datos")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="Intervalo de escritura (s)")
+    args = parser.parse_args()
+
+    server = CollectorServer(args.datos, args.host, args.puerto, args.intervalo)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("Colector detenido.")
+
+
+if __name__ == "__main__":
+    main()
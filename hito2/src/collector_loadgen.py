@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+from src.collector import DEFAULT_PORT, WIRE_DTYPE, encode_uplink_frame
+
+
+async def simulate_meter(host, port, meter_id, venue, rate_hz, batch_interval, stats, end_time):
+    """
+    Simula un medidor: una conexión persistente que envía un lote por intervalo.
+
+    :param rate_hz: Mediciones por segundo del medidor simulado
+    :param batch_interval: Segundos entre lotes
+    :param stats: Diccionario compartido de estadísticas
+    :param end_time: Instante (time.monotonic) en que termina la simulación
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    per_batch = max(1, int(round(rate_hz * batch_interval)))
+    base_level = random.uniform(70.0, 100.0)
+    records = np.empty(per_batch, dtype=WIRE_DTYPE)
+
+    # Desfase aleatorio para no enviar todos los medidores a la vez
+    await asyncio.sleep(random.uniform(0.0, batch_interval))
+
+    try:
+        while time.monotonic() < end_time:
+            now = time.time()
+            records["timestamp"] = now - np.arange(per_batch)[::-1] / rate_hz
+            records["nivel_dba"] = base_level + np.random.normal(0.0, 3.0, per_batch)
+            writer.write(encode_uplink_frame(meter_id, venue, records))
+            await writer.drain()
+            stats["registros"] += per_batch
+            stats["frames"] += 1
+            await asyncio.sleep(batch_interval)
+    finally:
+        writer.close()
+
+
+async def run_load(args):
+    """Lanza todos los medidores simulados y reporta la tasa enviada."""
+    stats = {"registros": 0, "frames": 0}
+    end_time = time.monotonic() + args.duracion
+    venues = [f"Local {i:03d}" for i in range(args.locales)]
+
+    tasks = [
+        asyncio.create_task(
+            simulate_meter(
+                args.host,
+                args.puerto,
+                f"medidor-{i:04d}",
+                venues[i % len(venues)],
+                args.tasa,
+                args.lote,
+                stats,
+                end_time,
+            )
+        )
+        for i in range(args.medidores)
+    ]
+
+    start = time.monotonic()
+    last = 0
+    while any(not t.done() for t in tasks):
+        await asyncio.sleep(5.0)
+        elapsed = time.monotonic() - start
+        sent = stats["registros"]
+        print(f"[{elapsed:5.0f} s] registros/s: {(sent - last) / 5.0:.0f}")
+        last = sent
+
+    errors = [t.exception() for t in tasks if t.exception() is not None]
+    elapsed = time.monotonic() - start
+    print(
+        f"Total: {stats['registros']} registros en {stats['frames']} frames, "
+        f"{stats['registros'] / elapsed:.0f} registros/s promedio"
+    )
+    if errors:
+        print(f"{len(errors)} medidores con error, por ejemplo: {errors[0]}")
+
+
+def main():
+    """Generador de carga para evaluar el colector."""
+    parser = argparse.ArgumentParser(description="Generador de carga del colector")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--medidores", type=int, default=1000)
+    parser.add_argument("--locales", type=int, default=100)
+    parser.add_argument("--tasa", type=float, default=10.0, help="Mediciones por segundo")
+    parser.add_argument("--lote", type=float, default=1.0, help="Segundos entre lotes")
+    parser.add_argument("--duracion", type=float, default=60.0, help="Duración (s)")
+    args = parser.parse_args()
+
+    asyncio.run(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from src.background import correct_levels
+
+# Límites del D.S. 38/2011 (MMA) en dB(A) por zona y período
+DS38_LIMITS = {
+    "I": {"diurno": 55, "nocturno": 45},
+    "II": {"diurno": 60, "nocturno": 45},
+    "III": {"diurno": 65, "nocturno": 50},
+    "IV": {"diurno": 70, "nocturno": 70},
+}
+
+DEFAULT_SCHEDULE = {"inicio_diurno": "07:00", "inicio_nocturno": "21:00"}
+
+PERIODS = ("diurno", "nocturno")
+
+
+def parse_hhmm(text):
+    """
+    Convierte una hora "HH:MM" a segundos desde medianoche.
+
+    :param text: Hora en formato "HH:MM"
+    :return: Segundos desde medianoche
+    """
+    hours, minutes = text.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def epoch_to_local_seconds(timestamps):
+    """
+    Convierte timestamps epoch a segundos "locales" (epoch + desfase horario),
+    de forma vectorizada. El desfase se consulta una vez por hora distinta,
+    no por fila, así que los cambios de horario quedan bien resueltos.
+
+    :param timestamps: Array de timestamps (segundos epoch)
+    :return: Array de segundos locales (float64)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if timestamps.size == 0:
+        return timestamps
+    hours = np.floor(timestamps / 3600.0).astype(np.int64)
+    first_hour = int(hours.min())
+    n_hours = int(hours.max()) - first_hour + 1
+    offsets = np.fromiter(
+        (time.localtime((first_hour + h) * 3600).tm_gmtoff for h in range(n_hours)),
+        dtype=np.float64,
+        count=n_hours,
+    )
+    return timestamps + offsets[hours - first_hour]
+
+
+def period_buckets(local_seconds, day_start, night_start):
+    """
+    Asigna cada medición a su período (vectorizado).
+
+    El período nocturno cruza la medianoche: las mediciones entre las 00:00 y
+    el inicio diurno pertenecen a la noche que comenzó el día anterior.
+
+    :param local_seconds: Array de segundos locales (epoch + desfase)
+    :param day_start: Inicio del período diurno (segundos desde medianoche)
+    :param night_start: Inicio del período nocturno (segundos desde medianoche)
+    :return: (día del período en días desde epoch, es_nocturno bool)
+    """
+    days = np.floor(local_seconds / 86400.0).astype(np.int64)
+    seconds_of_day = local_seconds - days * 86400.0
+    is_night = (seconds_of_day < day_start) | (seconds_of_day >= night_start)
+    period_day = days - (seconds_of_day < day_start)
+    return period_day, is_night
+
+
+def evaluate_periods(
+    local_seconds,
+    levels,
+    limits,
+    schedule=None,
+    weights=None,
+    maxima=None,
+    row_seconds=None,
+    background_db=None,
+):
+    """
+    Evalúa el cumplimiento por período (diurno/nocturno) de una serie completa.
+
+    Todo el cálculo es vectorizado: asignación de período, Leq por período
+    (promedio energético), Lmax y tiempo sobre el límite. Las filas pueden ser
+    mediciones individuales o agregados por minuto (con su Leq, cantidad de
+    muestras y Lmax); como los horarios son en minutos exactos, el resultado
+    por período es el mismo.
+
+    Con un nivel de fondo, el Leq de cada período se corrige por ruido de
+    fondo (ver background.correct_levels) y el cumplimiento se decide con el
+    nivel corregido; si la diferencia con el fondo es menor a 3 dB el período
+    no es válido ("cumple" None).
+
+    :param local_seconds: Array de segundos locales (ver epoch_to_local_seconds)
+    :param levels: Array de niveles (o Leq por fila) en dBA
+    :param limits: dict {"diurno": dB, "nocturno": dB} de la zona
+    :param schedule: dict con "inicio_diurno" y "inicio_nocturno" ("HH:MM")
+    :param weights: Muestras representadas por cada fila (por defecto, 1)
+    :param maxima: Lmax de cada fila (por defecto, el mismo nivel)
+    :param row_seconds: Duración de cada fila (por defecto, la mediana del paso)
+    :param background_db: Nivel de fondo en dBA (None = sin corrección)
+    :return: Lista de dicts por período, ordenada cronológicamente
+    """
+    schedule = schedule or DEFAULT_SCHEDULE
+    local_seconds = np.asarray(local_seconds, dtype=np.float64)
+    levels = np.asarray(levels, dtype=np.float64)
+    if local_seconds.size == 0:
+        return []
+
+    if row_seconds is None:
+        steps = np.diff(local_seconds[:100001])
+        steps = steps[steps > 0]
+        row_seconds = float(np.median(steps)) if steps.size else 0.0
+
+    period_day, is_night = period_buckets(
+        local_seconds,
+        parse_hhmm(schedule.get("inicio_diurno", DEFAULT_SCHEDULE["inicio_diurno"])),
+        parse_hhmm(schedule.get("inicio_nocturno", DEFAULT_SCHEDULE["inicio_nocturno"])),
+    )
+    limit_per_row = np.where(is_night, limits["nocturno"], limits["diurno"])
+
+    # Índice de período compacto (días * 2 + nocturno): permite usar bincount
+    # directamente, sin ordenar ni np.unique
+    keys = period_day * 2 + is_night
+    first_key = int(keys.min())
+    idx = keys - first_key
+    n_keys = int(idx.max()) + 1
+
+    energy_weights = 10.0 ** (levels / 10.0)
+    if weights is not None:
+        energy_weights *= weights
+    counts = np.bincount(idx, weights=weights, minlength=n_keys)
+    energy = np.bincount(idx, weights=energy_weights, minlength=n_keys)
+    above = np.bincount(idx, weights=levels > limit_per_row, minlength=n_keys)
+    lmax = np.full(n_keys, -np.inf)
+    np.maximum.at(lmax, idx, levels if maxima is None else maxima)
+
+    present = np.flatnonzero(counts > 0)
+    leq = 10.0 * np.log10(energy[present] / counts[present])
+    corrected = leq if background_db is None else correct_levels(leq, background_db)
+    results = []
+    for i, k in enumerate(present.tolist()):
+        key = k + first_key
+        period = PERIODS[key % 2]
+        limit = limits[period]
+        day = datetime.fromtimestamp((key // 2) * 86400, timezone.utc).date()
+        valid = not np.isnan(corrected[i])
+        results.append(
+            {
+                "fecha": day.isoformat(),
+                "periodo": period,
+                "leq": round(float(leq[i]), 1),
+                "leq_corregido": round(float(corrected[i]), 1) if valid else None,
+                "lmax": round(float(lmax[k]), 1),
+                "limite": limit,
+                "excedencia_db": round(float(corrected[i]) - limit, 1) if valid else None,
+                "cumple": bool(corrected[i] <= limit) if valid else None,
+                "n": int(counts[k]),
+                "minutos_sobre_limite": round(float(above[k]) * row_seconds / 60.0, 1),
+            }
+        )
+    return results
+
+
+def zone_limits(config, zone):
+    """
+    Límites de una zona, tomados de 'zonas_ds38' en la configuración o, si no
+    están definidos allí, de la tabla del D.S. 38.
+
+    :param config: Configuración cargada de 'config_zonas.json'
+    :param zone: Nombre de la zona ("I", "II", "III", "IV" u otra definida)
+    :return: dict {"diurno": dB, "nocturno": dB}
+    """
+    zones = dict(DS38_LIMITS)
+    zones.update(config.get("zonas_ds38", {}) or {})
+    if zone not in zones:
+        raise KeyError(f"Zona desconocida: {zone}")
+    return zones[zone]
+
+
+class ComplianceEvaluator:
+    """
+    Evaluación de cumplimiento D.S. 38 en tiempo real.
+
+    Tiene la interfaz publish()/flush()/close() de los publicadores del
+    AudioWorker. Por cada medición se acumula energía en el período en curso
+    (diurno o nocturno) y se actualiza el Leq del período; el cambio de
+    período se detecta comparando con un instante precalculado, sin consultar
+    la hora local en cada muestra. Si hay una referencia de fondo vigente, el
+    Leq del período y el nivel instantáneo se corrigen por ruido de fondo y
+    las excedencias se deciden con los niveles corregidos. El estado se expone
+    en self.status.
+    """
+
+    def __init__(self, limits, schedule=None, zone="", sample_seconds=0.1, background=None):
+        """
+        :param limits: dict {"diurno": dB, "nocturno": dB}
+        :param schedule: Horarios {"inicio_diurno", "inicio_nocturno"} ("HH:MM")
+        :param zone: Nombre de la zona
+        :param sample_seconds: Duración de una medición sin dt
+        :param background: Medición de fondo (BackgroundNoiseMeter) cuyo nivel
+                           vigente corrige los niveles (None = sin corrección)
+        """
+        self.zone = zone
+        self.sample_seconds = sample_seconds
+        self.background = background
+        self.limits = limits
+        schedule = schedule or DEFAULT_SCHEDULE
+        self.day_start = parse_hhmm(
+            schedule.get("inicio_diurno", DEFAULT_SCHEDULE["inicio_diurno"])
+        )
+        self.night_start = parse_hhmm(
+            schedule.get("inicio_nocturno", DEFAULT_SCHEDULE["inicio_nocturno"])
+        )
+
+        self.period = None
+        self.period_end = float("-inf")
+        self.energy = 0.0
+        self.seconds = 0.0
+        self.status = None
+
+    def set_zone(self, zone, limits):
+        """Cambia la zona; el Leq del período en curso se conserva."""
+        self.zone = zone
+        self.limits = limits
+
+    def publish(self, timestamp, dba, dt=None, *_):
+        """Recibe una medición del flujo (interfaz de publicador)."""
+        self.update(timestamp, dba, dt)
+
+    def flush(self):
+        """Nada que enviar."""
+
+    def close(self):
+        """Nada que liberar."""
+
+    def start_period(self, timestamp):
+        """Determina el período que contiene timestamp y cuándo termina."""
+        local = float(epoch_to_local_seconds([timestamp])[0])
+        offset = local - timestamp
+        day = np.floor(local / 86400.0) * 86400.0
+        seconds_of_day = local - day
+
+        if seconds_of_day < self.day_start:
+            period, end_local = "nocturno", day + self.day_start
+        elif seconds_of_day < self.night_start:
+            period, end_local = "diurno", day + self.night_start
+        else:
+            period, end_local = "nocturno", day + 86400.0 + self.day_start
+
+        self.period = period
+        self.period_end = end_local - offset
+        self.energy = 0.0
+        self.seconds = 0.0
+
+    def update(self, timestamp, level, dt=None):
+        """
+        Incorpora una medición y actualiza el estado de cumplimiento.
+
+        :param timestamp: Tiempo de la medición (segundos epoch)
+        :param level: Nivel en dBA
+        :param dt: Duración representada (por defecto, sample_seconds)
+        """
+        if timestamp >= self.period_end:
+            self.start_period(timestamp)
+
+        weight = self.sample_seconds if dt is None else dt
+        self.energy += weight * 10.0 ** (level / 10.0)
+        self.seconds += weight
+        leq = 10.0 * np.log10(self.energy / self.seconds)
+        limit = self.limits[self.period]
+
+        # Sin referencia de fondo los niveles se evalúan tal cual; con ella,
+        # None si la diferencia con el fondo no alcanza para corregir
+        background = None if self.background is None else self.background.background_db
+        corrected_leq, corrected_level = float(leq), float(level)
+        if background is not None:
+            corrected_leq, corrected_level = correct_levels([leq, level], background).tolist()
+        valid_leq = corrected_leq == corrected_leq
+        valid_level = corrected_level == corrected_level
+
+        self.status = {
+            "zona": self.zone,
+            "periodo": self.period,
+            "leq": float(leq),
+            "fondo": background,
+            "leq_corregido": corrected_leq if valid_leq else None,
+            "limite": limit,
+            "excede": valid_leq and corrected_leq > limit,
+            "excede_instantaneo": valid_level and corrected_level > limit,
+        }
+
+
+def load_measurements_sqlite(db_path, start=None, end=None, tipo_local=None):
+    """
+    Carga timestamps y niveles crudos de la base SQLite (ver measurement_store.py).
+
+    :return: (timestamps epoch, niveles) como arrays float64
+    """
+    sql = "SELECT timestamp, nivel_dba FROM mediciones WHERE 1=1"
+    params = []
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        params.append(end)
+    if tipo_local is not None:
+        sql += " AND tipo_local = ?"
+        params.append(tipo_local)
+    sql += " ORDER BY timestamp"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    return data[:, 0], data[:, 1]
+
+
+def load_minute_rollups_sqlite(db_path, start=None, end=None, tipo_local=None):
+    """
+    Carga los agregados por minuto de la base SQLite (tabla rollup_minuto).
+
+    Un mes son ~43 000 filas por tipo de local, en lugar de ~26 millones de
+    mediciones a 10 Hz, así que re-evaluar con otra zona toma milisegundos.
+
+    :return: (inicio del minuto epoch, Leq, n, Lmax) como arrays float64
+    """
+    sql = "SELECT minuto, SUM(energia), SUM(n), MAX(lmax) FROM rollup_minuto WHERE 1=1"
+    params = []
+    if start is not None:
+        sql += " AND minuto >= ?"
+        params.append(int(start // 60))
+    if end is not None:
+        sql += " AND minuto < ?"
+        params.append(int(-(-end // 60)))
+    if tipo_local is not None:
+        sql += " AND tipo_local = ?"
+        params.append(tipo_local)
+    sql += " GROUP BY minuto ORDER BY minuto"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    data = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    leq = 10.0 * np.log10(data[:, 1] / data[:, 2])
+    return data[:, 0] * 60.0, leq, data[:, 2], data[:, 3]
+
+
+def main():
+    """Re-evalúa mediciones almacenadas con una configuración de zonas."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluación D.S. 38 de mediciones almacenadas")
+    parser.add_argument("db", help="Base SQLite creada por el registro histórico")
+    parser.add_argument("--config", default="config_zonas.json")
+    parser.add_argument("--zona", required=True)
+    parser.add_argument("--desde", help="Fecha inicial AAAA-MM-DD")
+    parser.add_argument("--hasta", help="Fecha final AAAA-MM-DD (exclusiva)")
+    parser.add_argument("--local", help="Filtrar por tipo de local")
+    parser.add_argument("--fondo", type=float, help="Nivel de fondo en dBA para corregir el Leq")
+    parser.add_argument(
+        "--crudo",
+        action="store_true",
+        help="Usar las mediciones individuales en lugar de los agregados por minuto",
+    )
+    args = parser.parse_args()
+
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+
+    start = datetime.fromisoformat(args.desde).timestamp() if args.desde else None
+    end = datetime.fromisoformat(args.hasta).timestamp() if args.hasta else None
+    limits = zone_limits(config, args.zona)
+
+    t0 = time.perf_counter()
+    if args.crudo:
+        timestamps, levels = load_measurements_sqlite(args.db, start, end, args.local)
+        weights = maxima = row_seconds = None
+    else:
+        timestamps, levels, weights, maxima = load_minute_rollups_sqlite(
+            args.db, start, end, args.local
+        )
+        row_seconds = 60.0
+    t1 = time.perf_counter()
+    results = evaluate_periods(
+        epoch_to_local_seconds(timestamps),
+        levels,
+        limits,
+        config.get("horarios"),
+        weights=weights,
+        maxima=maxima,
+        row_seconds=row_seconds,
+        background_db=args.fondo,
+    )
+    t2 = time.perf_counter()
+
+    def fmt(value):
+        return "" if value is None else value
+
+    print(
+        "fecha,periodo,leq,leq_corregido,lmax,limite,excedencia_db,cumple,minutos_sobre_limite"
+    )
+    for r in results:
+        cumple = "no valido" if r["cumple"] is None else "si" if r["cumple"] else "no"
+        print(
+            f"{r['fecha']},{r['periodo']},{r['leq']},{fmt(r['leq_corregido'])},{r['lmax']},"
+            f"{r['limite']},{fmt(r['excedencia_db'])},{cumple},{r['minutos_sobre_limite']}"
+        )
+    print(
+        f"{len(levels)} filas: lectura {t1 - t0:.2f} s, evaluación {t2 - t1:.2f} s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import multiprocessing
+import queue
+import sys
+import time
+
+import numpy as np
+from src.audio_worker import AudioWorker
+from src.input_health import HEALTH_COUNTERS, HEALTH_FLAGS, HEALTH_VALUES
+from src.measurement_pipeline import MeasurementPipeline
+from src.shared_ring import SharedRing
+from src.timeline import SampleTimeline, clock_correction_message
+
+# Registro compacto de medición que el proceso DSP devuelve por tick
+PEAK_FIELDS = (
+    "lcpeak",
+    "lafmax",
+    "lasmax",
+    "true_peak",
+    "lcpeak_intervalo",
+    "lafmax_intervalo",
+    "lasmax_intervalo",
+    "true_peak_intervalo",
+)
+LOUDNESS_FIELDS = ("momentary", "short_term", "integrated")
+WEIGHTING_FIELDS = ("laeq", "lceq", "lzeq")
+FRAME_DTYPE = np.dtype(
+    [("timestamp", "<f8"), ("nivel_dba", "<f4")]
+    + [(name, "<f4") for name in WEIGHTING_FIELDS + PEAK_FIELDS + LOUDNESS_FIELDS]
+    + [(name, "?") for name in HEALTH_FLAGS]
+    + [(name, "<u8") for name in HEALTH_COUNTERS]
+    + [(name, "<f4") for name in HEALTH_VALUES]
+    + [("muestras", "<u4"), ("inicio_muestra", "<i8")]
+)
+
+# Contadores en la cabecera del buffer de audio (los escribe el callback)
+HEADER_OVERFLOWS = 1
+HEADER_BLOCKS = 2
+
+AUDIO_RING_SECONDS = 30
+FRAME_RING_SIZE = 1024
+
+
+def dsp_process_main(settings, audio_ring_name, frame_ring_name, stop_event, error_queue):
+    """
+    Proceso de captura y DSP.
+
+    El callback de PortAudio copia el audio al buffer compartido de audio; el
+    hilo principal del proceso lo lee cada intervalo, calcula las mediciones
+    con MeasurementPipeline y escribe un registro FRAME_DTYPE en el buffer
+    compartido de mediciones. Nada de esto comparte el GIL con la interfaz.
+
+    Cada registro lleva la posición (en muestras del stream) del primer
+    sample del tick y su tiempo según el reloj de muestras, así el proceso
+    principal detecta huecos igual que con la captura en el mismo proceso.
+
+    :param settings: dict con la configuración de captura y medición
+    :param audio_ring_name: Nombre del SharedRing de audio
+    :param frame_ring_name: Nombre del SharedRing de mediciones
+    :param stop_event: multiprocessing.Event para detener el proceso
+    :param error_queue: multiprocessing.Queue para informar errores
+    """
+    import sounddevice as sd
+
+    audio_ring = SharedRing(settings["capacidad_audio"], np.float32, audio_ring_name)
+    frame_ring = SharedRing(FRAME_RING_SIZE, FRAME_DTYPE, frame_ring_name)
+
+    pipeline = MeasurementPipeline(
+        settings["sample_rate"],
+        settings["calibracion_db"],
+        settings["ponderacion_temporal"],
+        settings["umbral_silencio_db"],
+        settings["intervalo_picos_s"],
+        settings["backend_dsp"],
+    )
+
+    timeline = SampleTimeline(settings["sample_rate"])
+    # Hora del final del último bloque escrito (para anclar el reloj de muestras)
+    clock = [None]
+
+    def callback(indata, frames, time_info, status):
+        clock[0] = (time.time(), audio_ring.position + frames)
+        audio_ring.header[HEADER_BLOCKS] += 1
+        if status and status.input_overflow:
+            audio_ring.header[HEADER_OVERFLOWS] += 1
+        audio_ring.write(indata[:, 0])
+
+    stream = None
+    try:
+        stream = sd.InputStream(
+            samplerate=settings["sample_rate"],
+            blocksize=settings["block_size"],
+            device=settings["device_id"],
+            channels=1,
+            dtype="float32",
+            latency=settings["latencia"],
+            callback=callback,
+        )
+        stream.start()
+
+        position = 0
+        frame = np.zeros(1, dtype=FRAME_DTYPE)
+        while not stop_event.wait(settings["intervalo_s"]):
+            position, audio_chunk, lost = audio_ring.read(position)
+            if lost:
+                print(f"Proceso DSP: {lost} muestras perdidas por rezago", file=sys.stderr)
+            if len(audio_chunk) == 0:
+                continue
+
+            correction = timeline.resync(*clock[0])
+            if correction is not None:
+                print(f"Proceso DSP: {clock_correction_message(correction)}", file=sys.stderr)
+            result = pipeline.process(audio_chunk)
+            frame["timestamp"] = timeline.time_at(position)
+            frame["nivel_dba"] = np.nan if result["nivel_dba"] is None else result["nivel_dba"]
+            for name in WEIGHTING_FIELDS:
+                frame[name] = result["ponderaciones"][name]
+            for name in PEAK_FIELDS:
+                frame[name] = result["picos"][name]
+            for name in LOUDNESS_FIELDS:
+                value = result["sonoridad"][name]
+                frame[name] = np.nan if value is None else value
+            for name in HEALTH_FLAGS + HEALTH_COUNTERS + HEALTH_VALUES:
+                value = result["salud"][name]
+                frame[name] = np.nan if value is None else value
+            frame["muestras"] = len(audio_chunk)
+            frame["inicio_muestra"] = position - len(audio_chunk)
+            frame_ring.write(frame)
+    except Exception as e:
+        error_queue.put(f"Error en el proceso DSP: {e}")
+    finally:
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            except Exception as e:
+                print(f"Error al detener stream: {e}", file=sys.stderr)
+        audio_ring.close()
+        frame_ring.close()
+
+
+class ProcessAudioWorker(AudioWorker):
+    """
+    AudioWorker con la captura y el DSP en un proceso aparte.
+
+    La interfaz (señales, publicadores, consumidores de audio, espectrograma)
+    es la misma que la de AudioWorker. El timer de este lado solo copia desde
+    memoria compartida los registros de medición y el audio crudo nuevo, y
+    los entrega; si la interfaz se bloquea, el proceso DSP sigue capturando
+    sin overflows y los registros se entregan al volver.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.process = None
+        self.audio_ring = None
+        self.frame_ring = None
+        self.audio_position = 0
+        self.frame_position = 0
+        self.lagged_samples = 0
+
+        context = multiprocessing.get_context("spawn")
+        self.context = context
+        self.stop_event = context.Event()
+        self.error_queue = context.Queue()
+
+    def set_latency_mode(self, mode, min_block=256, max_block=8192):
+        """El proceso DSP no compite con la interfaz: el modo adaptativo usa el perfil fijo."""
+        if mode == "adaptativo":
+            mode = "fijo"
+        super().set_latency_mode(mode, min_block, max_block)
+
+    def process_settings(self):
+        """Configuración que recibe el proceso DSP."""
+        return {
+            "sample_rate": self.SAMPLE_RATE,
+            "block_size": self.block_size,
+            "latencia": self.latency,
+            "device_id": self.device_id,
+            "calibracion_db": self.CALIBRATION_OFFSET_DB,
+            "ponderacion_temporal": self.pipeline.time_weighting,
+            "umbral_silencio_db": self.SILENCE_THRESHOLD_DB,
+            "intervalo_picos_s": self.PEAK_INTERVAL_S,
+            "backend_dsp": self.pipeline.a_weighting.backend,
+            "intervalo_s": self.UPDATE_INTERVAL_MS / 1000.0,
+            "capacidad_audio": self.SAMPLE_RATE * AUDIO_RING_SECONDS,
+        }
+
+    def run(self):
+        """Crea los buffers compartidos y arranca el proceso DSP."""
+        try:
+            settings = self.process_settings()
+            self.audio_ring = SharedRing(settings["capacidad_audio"], np.float32)
+            self.frame_ring = SharedRing(FRAME_RING_SIZE, FRAME_DTYPE)
+            self.audio_position = 0
+            self.frame_position = 0
+            self.lagged_samples = 0
+            self.timeline.reset(0)
+            self.pending_gaps = {}
+            self.next_gap_report = 0.0
+            self.stop_event.clear()
+            if self.spectrogram is not None:
+                self.spectrogram.reset()
+
+            self.process = self.context.Process(
+                target=dsp_process_main,
+                args=(
+                    settings,
+                    self.audio_ring.name,
+                    self.frame_ring.name,
+                    self.stop_event,
+                    self.error_queue,
+                ),
+                daemon=True,
+            )
+            self.process.start()
+            self._running = True
+            print(f"Proceso DSP iniciado (pid {self.process.pid})")
+
+            self.start_processing_timer()
+        except Exception as e:
+            error_msg = f"No se pudo iniciar el proceso DSP: {e}"
+            print(error_msg, file=sys.stderr)
+            self.error_signal.emit(error_msg)
+            self.finished.emit()
+
+    def process_audio(self):
+        """Entrega las mediciones y el audio nuevos del proceso DSP."""
+        if not self._running:
+            return
+
+        try:
+            error_msg = self.error_queue.get_nowait()
+        except queue.Empty:
+            error_msg = None
+        if error_msg is None and not self.process.is_alive():
+            error_msg = "El proceso DSP terminó inesperadamente"
+        if error_msg is not None:
+            print(error_msg, file=sys.stderr)
+            self.stop()
+            self.error_signal.emit(error_msg)
+            self.finished.emit()
+            return
+
+        self.stage_timer.start()
+        try:
+            overflows = int(self.audio_ring.header[HEADER_OVERFLOWS])
+            new_overflows = overflows > self.overflow_count
+            self.overflow_count = overflows
+            self.total_blocks = int(self.audio_ring.header[HEADER_BLOCKS])
+
+            # Audio crudo para los consumidores y el espectrograma
+            self.audio_position, audio_chunk, lost = self.audio_ring.read(self.audio_position)
+            self.stage_timer.lap("cola")
+            if lost:
+                self.lagged_samples += lost
+                print(
+                    f"Interfaz atrasada: {lost} muestras de audio no entregadas",
+                    file=sys.stderr,
+                )
+            if len(audio_chunk):
+                for tap in self.audio_taps:
+                    tap.write_audio(audio_chunk)
+                self.stage_timer.lap("taps")
+                if self.spectrogram is not None:
+                    frames = self.spectrogram.process(audio_chunk)
+                    if len(frames):
+                        self.new_spectrum_frames.emit(frames.copy())
+                    self.stage_timer.lap("espectrograma")
+
+            # Mediciones (todas las acumuladas si la interfaz estuvo bloqueada)
+            self.frame_position, frames, _ = self.frame_ring.read(self.frame_position)
+            self.stage_timer.lap("cola")
+            for frame in frames:
+                samples = int(frame["muestras"])
+                start_sample = int(frame["inicio_muestra"])
+                timestamp = float(frame["timestamp"])
+                # Los tiempos de los registros ya vienen corregidos por el
+                # proceso DSP: aquí el reloj solo los sigue (sin informar)
+                self.timeline.resync(timestamp, start_sample + samples)
+                first_sample = self.timeline.next_sample
+                # Los overflows nuevos se asignan al primer tick del lote
+                gap = self.timeline.add_block(
+                    start_sample,
+                    samples,
+                    "overflow" if new_overflows else "descarte",
+                    mark=new_overflows,
+                )
+                new_overflows = False
+                span = self.timeline.next_sample - first_sample
+                duration_s = samples / self.SAMPLE_RATE
+                self.report_timeline(
+                    timestamp,
+                    duration_s,
+                    100.0 * samples / span if span > 0 else 100.0,
+                    [] if gap is None else [gap],
+                )
+
+                self.new_weighted_levels.emit(
+                    {name: float(frame[name]) for name in WEIGHTING_FIELDS}
+                )
+                self.new_peak_metrics.emit({name: float(frame[name]) for name in PEAK_FIELDS})
+                self.new_loudness.emit(
+                    {
+                        name: None if np.isnan(frame[name]) else float(frame[name])
+                        for name in LOUDNESS_FIELDS
+                    }
+                )
+                health = {name: bool(frame[name]) for name in HEALTH_FLAGS}
+                health.update({name: int(frame[name]) for name in HEALTH_COUNTERS})
+                health.update(
+                    {
+                        name: None if np.isnan(frame[name]) else float(frame[name])
+                        for name in HEALTH_VALUES
+                    }
+                )
+                self.new_input_health.emit(health)
+                self.stage_timer.lap("emision")
+                if not np.isnan(frame["nivel_dba"]):
+                    self.emit_measurement(float(frame["nivel_dba"]), timestamp, duration_s)
+        except Exception as e:
+            print(f"Error procesando audio: {e}", file=sys.stderr)
+            import traceback
+
+            traceback.print_exc()
+            return
+
+        # Los tiempos del DSP quedan en el proceso aparte: aquí solo se miden
+        # la copia desde memoria compartida y la entrega
+        if len(audio_chunk) or len(frames):
+            self.report_stage_timings(time.perf_counter())
+
+    def stop(self):
+        """Detiene el proceso DSP y libera la memoria compartida."""
+        print("Deteniendo proceso DSP...")
+        self._running = False
+        self.finish_profile()
+
+        if self.process_timer and self.process_timer.isActive():
+            self.process_timer.stop()
+
+        if self.process is not None:
+            self.stop_event.set()
+            self.process.join(timeout=3.0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+            self.process = None
+
+        if self.audio_ring is not None:
+            self.overflow_count = int(self.audio_ring.header[HEADER_OVERFLOWS])
+            self.total_blocks = int(self.audio_ring.header[HEADER_BLOCKS])
+
+        for ring in (self.audio_ring, self.frame_ring):
+            if ring is not None:
+                ring.close()
+        self.audio_ring = None
+        self.frame_ring = None
+
+        print(
+            f"Estadísticas: {self.overflow_count} overflows de {self.total_blocks} bloques"
+            f" ({self.lagged_samples} muestras no entregadas a la interfaz)"
+        )
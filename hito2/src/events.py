@@ -0,0 +1,281 @@
+import json
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+from scipy.io import wavfile
+
+
+class AudioRingBuffer:
+    """
+    Buffer circular preasignado con los últimos segundos de audio crudo.
+
+    Solo el hilo de procesamiento escribe (una copia a memoria ya reservada,
+    sin asignar nada). Las posiciones son absolutas (muestras desde el
+    inicio), así que un lector en otro hilo puede saber si el tramo que pide
+    sigue disponible o ya fue sobrescrito.
+    """
+
+    def __init__(self, capacity_samples):
+        self.capacity = int(capacity_samples)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.position = 0
+
+    def write(self, block):
+        """
+        Escribe un bloque de muestras al final del buffer.
+
+        :param block: Array 1-D de muestras
+        """
+        n = len(block)
+        if n >= self.capacity:
+            block = block[-self.capacity :]
+            self.position += n - self.capacity
+            n = self.capacity
+
+        idx = self.position % self.capacity
+        first = min(n, self.capacity - idx)
+        self.buffer[idx : idx + first] = block[:first]
+        if first < n:
+            self.buffer[: n - first] = block[first:]
+        self.position += n
+
+    def read(self, start, end):
+        """
+        Copia el tramo [start, end) en posiciones absolutas.
+
+        Si parte del tramo ya fue sobrescrito, se devuelve solo lo disponible.
+
+        :param start: Posición absoluta inicial
+        :param end: Posición absoluta final (exclusiva)
+        :return: (posición real de inicio, array con las muestras)
+        """
+        end = min(end, self.position)
+        start = max(start, self.position - self.capacity, 0)
+        if end <= start:
+            return start, np.empty(0, dtype=np.float32)
+
+        first_idx = start % self.capacity
+        n = end - start
+        first = min(n, self.capacity - first_idx)
+        data = np.empty(n, dtype=np.float32)
+        data[:first] = self.buffer[first_idx : first_idx + first]
+        data[first:] = self.buffer[: n - first]
+
+        # Descartar lo que se haya sobrescrito mientras se copiaba
+        oldest = self.position - self.capacity
+        if start < oldest:
+            data = data[oldest - start :]
+            start = oldest
+        return start, data
+
+
+class ExceedanceEventRecorder:
+    """
+    Detector de excedencias con captura de audio antes y después del evento.
+
+    Se alimenta del nivel ponderado de cada tick (interfaz publish() de los
+    publicadores del AudioWorker) y del audio crudo (write_audio(), llamado
+    por el AudioWorker antes de filtrar). Un evento comienza cuando el nivel
+    supera el umbral y termina cuando baja de umbral - histéresis; los eventos
+    más cortos que la duración mínima se descartan. El audio del evento (con
+    pre- y post-trigger) se copia desde el buffer circular y se escribe a WAV
+    en un hilo aparte, junto con un registro de metadatos en 'eventos.jsonl'.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        sample_rate,
+        threshold=None,
+        hysteresis_db=2.0,
+        min_duration_s=2.0,
+        pre_trigger_s=10.0,
+        post_trigger_s=5.0,
+        max_audio_s=60.0,
+    ):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.hysteresis_db = hysteresis_db
+        self.min_duration_s = min_duration_s
+        self.pre_samples = int(pre_trigger_s * sample_rate)
+        self.post_samples = int(post_trigger_s * sample_rate)
+        self.max_audio_samples = int(max_audio_s * sample_rate)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.metadata_path = os.path.join(self.output_dir, "eventos.jsonl")
+
+        # Margen de 2 s para que el hilo escritor alcance a copiar
+        self.ring = AudioRingBuffer(
+            self.pre_samples
+            + self.max_audio_samples
+            + self.post_samples
+            + 2 * sample_rate
+        )
+
+        # Estado del detector: None, "activo" o "post" (esperando post-trigger)
+        self.state = None
+        self.event = None
+
+        self.events_recorded = 0
+        self.jobs = queue.Queue()
+        self._thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self._thread.start()
+
+    def set_threshold(self, threshold):
+        """Cambia el umbral de disparo (dBA)."""
+        self.threshold = threshold
+
+    def write_audio(self, block):
+        """Agrega audio crudo al buffer circular (llamado por el AudioWorker)."""
+        self.ring.write(block)
+
+    def publish(self, timestamp, dba, *_):
+        """Recibe el nivel del tick (interfaz de publicador)."""
+        self.update(timestamp, dba)
+
+    def flush(self):
+        """Nada que enviar: los eventos se escriben desde el hilo escritor."""
+
+    def update(self, timestamp, level):
+        """
+        Actualiza la máquina de estados del detector.
+
+        :param timestamp: Tiempo del tick (segundos epoch)
+        :param level: Nivel ponderado en dBA
+        """
+        if self.threshold is None:
+            return
+
+        position = self.ring.position
+        above = level > self.threshold
+        below_release = level < self.threshold - self.hysteresis_db
+
+        if self.state is None:
+            if above:
+                self.state = "activo"
+                self.event = {
+                    "inicio": timestamp,
+                    "fin": timestamp,
+                    "inicio_muestra": position,
+                    "fin_muestra": position,
+                    "energia": 0.0,
+                    "n": 0,
+                    "lmax": level,
+                    "umbral": self.threshold,
+                    "audio_programado": False,
+                }
+                self.accumulate(timestamp, level, position)
+            return
+
+        if self.state == "post":
+            if above:
+                # Nueva excedencia dentro del post-trigger: continúa el mismo evento
+                self.state = "activo"
+            elif position >= self.event["fin_muestra"] + self.post_samples:
+                self.finish_event()
+                return
+            else:
+                return
+
+        # Estado activo
+        if below_release:
+            self.event["fin"] = timestamp
+            self.event["fin_muestra"] = position
+            if self.event["fin"] - self.event["inicio"] < self.min_duration_s:
+                self.state = None
+                self.event = None
+            else:
+                self.state = "post"
+            return
+
+        self.accumulate(timestamp, level, position)
+
+        # Evento demasiado largo para el buffer: guardar ya el audio inicial
+        event = self.event
+        if (
+            not event["audio_programado"]
+            and position - event["inicio_muestra"] >= self.max_audio_samples
+        ):
+            self.schedule_audio(
+                event["inicio_muestra"] - self.pre_samples,
+                event["inicio_muestra"] + self.max_audio_samples,
+            )
+            event["audio_programado"] = True
+
+    def accumulate(self, timestamp, level, position):
+        """Acumula energía y Lmax del evento activo."""
+        event = self.event
+        event["energia"] += 10.0 ** (level / 10.0)
+        event["n"] += 1
+        if level > event["lmax"]:
+            event["lmax"] = level
+        event["fin"] = timestamp
+        event["fin_muestra"] = position
+
+    def schedule_audio(self, start, end):
+        """Encola la escritura del tramo de audio del evento actual."""
+        event = self.event
+        stamp = datetime.fromtimestamp(event["inicio"]).strftime("%Y%m%d_%H%M%S")
+        event["archivo_wav"] = f"evento_{stamp}.wav"
+        self.jobs.put(("audio", start, end, event["archivo_wav"]))
+
+    def finish_event(self):
+        """Cierra el evento: programa su audio (si falta) y sus metadatos."""
+        event = self.event
+        if not event["audio_programado"]:
+            self.schedule_audio(
+                event["inicio_muestra"] - self.pre_samples,
+                event["fin_muestra"] + self.post_samples,
+            )
+
+        metadata = {
+            "inicio": datetime.fromtimestamp(event["inicio"]).isoformat(timespec="milliseconds"),
+            "fin": datetime.fromtimestamp(event["fin"]).isoformat(timespec="milliseconds"),
+            "duracion_s": round(event["fin"] - event["inicio"], 2),
+            "lmax": round(event["lmax"], 1),
+            "leq": round(10.0 * np.log10(event["energia"] / event["n"]), 1),
+            "umbral": event["umbral"],
+            "archivo_wav": event.get("archivo_wav"),
+            "audio_truncado": event["audio_programado"],
+            "pre_trigger_s": self.pre_samples / self.sample_rate,
+            "post_trigger_s": self.post_samples / self.sample_rate,
+        }
+        self.jobs.put(("metadatos", metadata))
+
+        self.state = None
+        self.event = None
+        self.events_recorded += 1
+
+    def writer_loop(self):
+        """Hilo escritor: copia audio del buffer circular y escribe archivos."""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                if job[0] == "audio":
+                    _, start, end, filename = job
+                    _, data = self.ring.read(start, end)
+                    wavfile.write(
+                        os.path.join(self.output_dir, filename), self.sample_rate, data
+                    )
+                else:
+                    with open(self.metadata_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(job[1], ensure_ascii=False) + "\n")
+            except Exception as e:
+                print(f"Error al guardar evento: {e}", file=sys.stderr)
+
+    def close(self):
+        """Cierra un evento en curso y espera a que se escriban los archivos."""
+        if self.event is not None and self.state == "post":
+            self.finish_event()
+        elif self.event is not None and self.state == "activo":
+            if self.event["fin"] - self.event["inicio"] >= self.min_duration_s:
+                self.finish_event()
+        self.jobs.put(None)
+        self._thread.join(timeout=5.0)
@@ -0,0 +1,278 @@
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+from src.compliance import epoch_to_local_seconds, parse_hhmm
+
+# Jornada de referencia de LEX,8h y de las dosis (s)
+REFERENCE_SECONDS = 8 * 3600.0
+
+# Criterios de dosis: nivel de criterio para 8 h, tasa de intercambio y umbral
+# bajo el cual la exposición no se cuenta (None = se cuenta todo)
+DOSE_CRITERIA = {
+    "ds594": {"nivel_db": 85.0, "tasa_db": 3.0, "umbral_db": None},
+    "niosh": {"nivel_db": 85.0, "tasa_db": 3.0, "umbral_db": 80.0},
+    "osha": {"nivel_db": 90.0, "tasa_db": 5.0, "umbral_db": 80.0},
+}
+
+# Turno por defecto: 24 h desde el mediodía (una noche completa de trabajo)
+DEFAULT_SHIFTS = [{"nombre": "jornada", "inicio": "12:00", "fin": "12:00"}]
+
+
+def dose_criteria(config_criteria):
+    """
+    Resuelve los criterios de dosis configurados.
+
+    :param config_criteria: Lista de nombres de DOSE_CRITERIA o de dicts con
+                            "nombre", "nivel_db", "tasa_db" y "umbral_db"
+    :return: Lista de dicts con "nombre", "nivel_db", "tasa_db" y "umbral_db"
+    """
+    criteria = []
+    for item in config_criteria:
+        if isinstance(item, str):
+            if item not in DOSE_CRITERIA:
+                raise KeyError(f"Criterio de dosis desconocido: {item}")
+            criteria.append(dict(DOSE_CRITERIA[item], nombre=item))
+        else:
+            criteria.append(
+                {
+                    "nombre": item["nombre"],
+                    "nivel_db": float(item["nivel_db"]),
+                    "tasa_db": float(item.get("tasa_db", 3.0)),
+                    "umbral_db": item.get("umbral_db"),
+                }
+            )
+    return criteria
+
+
+class ExposureDoseMeter:
+    """
+    Exposición del personal al ruido por turno: LEX,8h y dosis porcentual.
+
+    Tiene la interfaz publish()/flush()/close() de los publicadores del
+    AudioWorker. Cada medición suma, en O(1), su energía A ponderada por la
+    duración (para LEX,8h y el Leq del turno) y su aporte a la dosis de cada
+    criterio, dt / T(L) con T(L) = 8 h / 2^((L - nivel) / tasa). El turno en
+    curso se determina comparando con su fin precalculado, como en
+    ComplianceEvaluator; fuera de los turnos no se acumula exposición.
+
+    El estado del turno abierto se guarda en '<archivo>.estado.json' cada
+    SAVE_INTERVAL_S y al cerrar, y se retoma al reiniciar si el turno sigue
+    vigente; los turnos terminados se agregan como una línea JSON al archivo.
+    El estado para la interfaz queda en self.status.
+    """
+
+    SAVE_INTERVAL_S = 60.0
+
+    def __init__(self, output_path, shifts=None, criteria=("ds594",), sample_seconds=0.1):
+        """
+        :param output_path: Archivo JSON lines de turnos cerrados
+        :param shifts: Lista de {"nombre", "inicio": "HH:MM", "fin": "HH:MM"}
+                       (fin <= inicio cruza la medianoche)
+        :param criteria: Criterios de dosis (ver dose_criteria)
+        :param sample_seconds: Duración de una medición sin dt
+        """
+        self.output_path = output_path
+        self.state_path = output_path + ".estado.json"
+        self.shifts = [
+            (shift["nombre"], parse_hhmm(shift["inicio"]), parse_hhmm(shift["fin"]))
+            for shift in (shifts or DEFAULT_SHIFTS)
+        ]
+        self.criteria = dose_criteria(criteria)
+        self.sample_seconds = sample_seconds
+
+        # Turno en curso (None fuera de turno) y próximo cambio (epoch)
+        self.shift = None
+        self.shift_start = None
+        self.boundary = float("-inf")
+        self.next_save = float("-inf")
+        self.reset_totals()
+        self.status = None
+        self.load_state()
+
+    def reset_totals(self):
+        """Reinicia los acumuladores del turno."""
+        self.energy = 0.0
+        self.duration = 0.0
+        self.gaps = 0.0
+        self.doses = [0.0] * len(self.criteria)
+
+    def publish(self, timestamp, dba, dt=None, *_):
+        """Recibe una medición del flujo (interfaz de publicador)."""
+        self.update(timestamp, dba, dt)
+
+    def record_gap(self, start, end, reason):
+        """Registra un tramo sin audio del turno (no aporta exposición)."""
+        if start >= self.boundary:
+            self.roll(start)
+        if self.shift is not None:
+            self.gaps += max(end - start, 0.0)
+
+    def flush(self):
+        """Nada que enviar: el estado se guarda cada SAVE_INTERVAL_S."""
+
+    def update(self, timestamp, level, dt=None):
+        """
+        Incorpora una medición al turno en curso.
+
+        :param timestamp: Tiempo de la medición (segundos epoch)
+        :param level: Nivel en dBA
+        :param dt: Duración representada (por defecto, sample_seconds)
+        """
+        if timestamp >= self.boundary:
+            self.roll(timestamp)
+        if self.shift is None:
+            return
+
+        weight = self.sample_seconds if dt is None else dt
+        self.energy += weight * 10.0 ** (level / 10.0)
+        self.duration += weight
+        for i, criterion in enumerate(self.criteria):
+            threshold = criterion["umbral_db"]
+            if threshold is None or level >= threshold:
+                self.doses[i] += weight * 2.0 ** (
+                    (level - criterion["nivel_db"]) / criterion["tasa_db"]
+                )
+        self.status = self.summary()
+
+        if timestamp >= self.next_save:
+            self.save_state()
+            self.next_save = timestamp + self.SAVE_INTERVAL_S
+
+    def find_shift(self, timestamp):
+        """
+        Turno que contiene timestamp.
+
+        :return: (nombre, inicio epoch, fin epoch), o (None, None, inicio epoch
+                 del próximo turno) fuera de turno
+        """
+        local = float(epoch_to_local_seconds([timestamp])[0])
+        offset = local - timestamp
+        today = math.floor(local / 86400.0) * 86400.0
+
+        next_start = float("inf")
+        for day in (today - 86400.0, today, today + 86400.0):
+            for name, start, end in self.shifts:
+                shift_start = day + start
+                shift_end = day + end if end > start else day + 86400.0 + end
+                if shift_start <= local < shift_end:
+                    return name, shift_start - offset, shift_end - offset
+                if shift_start > local:
+                    next_start = min(next_start, shift_start)
+        return None, None, next_start - offset
+
+    def roll(self, timestamp):
+        """Cierra el turno terminado y abre el que contiene timestamp."""
+        if self.shift is not None and (self.duration > 0 or self.gaps > 0):
+            self.emit_closed()
+        name, start, boundary = self.find_shift(timestamp)
+        self.shift = name
+        self.shift_start = start
+        self.boundary = boundary
+        self.reset_totals()
+        self.status = self.summary() if name is not None else None
+        self.save_state()
+
+    def summary(self):
+        """LEX,8h, Leq y dosis por criterio del turno en curso."""
+        doses = {}
+        for criterion, dose in zip(self.criteria, self.doses):
+            percent = 100.0 * dose / REFERENCE_SECONDS
+            if percent >= 100.0:
+                hours_to_full = 0.0
+            elif percent > 0.0:
+                # Proyección al ritmo promedio del turno hasta ahora
+                hours_to_full = (100.0 - percent) / percent * self.duration / 3600.0
+            else:
+                hours_to_full = None
+            doses[criterion["nombre"]] = {
+                "porcentaje": percent,
+                "horas_a_100": hours_to_full,
+            }
+
+        return {
+            "turno": self.shift,
+            "inicio": datetime.fromtimestamp(self.shift_start).isoformat(timespec="seconds"),
+            "horas_medidas": self.duration / 3600.0,
+            "huecos_s": self.gaps,
+            "lex_8h": (
+                10.0 * math.log10(self.energy / REFERENCE_SECONDS) if self.energy > 0 else None
+            ),
+            "leq": 10.0 * math.log10(self.energy / self.duration) if self.energy > 0 else None,
+            "dosis": doses,
+        }
+
+    def emit_closed(self):
+        """Agrega el turno cerrado al archivo de salida."""
+        record = self.summary()
+        for key in ("lex_8h", "leq"):
+            if record[key] is not None:
+                record[key] = round(record[key], 1)
+        record["horas_medidas"] = round(record["horas_medidas"], 3)
+        record["huecos_s"] = round(record["huecos_s"], 1)
+        record["dosis"] = {
+            name: round(dose["porcentaje"], 1) for name, dose in record["dosis"].items()
+        }
+        try:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"Error al escribir exposición del turno: {e}", file=sys.stderr)
+
+    def save_state(self):
+        """Guarda los acumuladores del turno abierto para continuar tras un reinicio."""
+        state = {
+            "turno": self.shift,
+            "inicio": self.shift_start,
+            "fin": self.boundary,
+            "energia": self.energy,
+            "duracion": self.duration,
+            "huecos": self.gaps,
+            "dosis": dict(zip((c["nombre"] for c in self.criteria), self.doses)),
+        }
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"Error al guardar estado de exposición: {e}", file=sys.stderr)
+
+    def load_state(self):
+        """
+        Recupera el turno guardado. Si ya terminó se cierra y escribe; si sigue
+        vigente, la exposición continúa acumulándose sobre lo guardado.
+        """
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Advertencia: No se pudo leer el estado de exposición: {e}")
+            return
+
+        if state.get("turno") is None:
+            return
+        self.shift = state["turno"]
+        self.shift_start = state["inicio"]
+        self.boundary = state["fin"]
+        self.energy = state["energia"]
+        self.duration = state["duracion"]
+        self.gaps = state.get("huecos", 0.0)
+        saved_doses = state.get("dosis", {})
+        # Un criterio agregado después del guardado parte desde cero
+        self.doses = [saved_doses.get(c["nombre"], 0.0) for c in self.criteria]
+        self.status = self.summary()
+
+        now = time.time()
+        if now >= self.boundary:
+            self.roll(now)
+
+    def close(self):
+        """Guarda el estado del turno abierto."""
+        if self.shift is not None:
+            self.save_state()
@@ -0,0 +1,182 @@
+import sys
+
+import numpy as np
+from scipy.signal import lfilter, sosfilt, sosfilt_zi
+from src.audio_utils import create_dba_filter
+
+try:
+    import numba
+except ImportError:  # numba es opcional: sin él se usa la cadena de NumPy/SciPy
+    numba = None
+
+BACKENDS = ("auto", "numba", "numpy")
+
+# Buffer vacío para el kernel cuando no se pide la señal al cuadrado
+EMPTY_OUT = np.empty(0, dtype=np.float64)
+
+
+def a_weighting_kernel(x, sos, zi, env, env_alpha, out):
+    """
+    Ponderación A, cuadrado, envolventes Fast/Slow y sus máximos en un
+    solo recorrido del bloque.
+
+    Las secciones se evalúan en forma directa II transpuesta, igual que
+    scipy.signal.sosfilt, y las envolventes como lfilter([a], [1, a - 1])
+    (env guarda el estado de lfilter, (1 - a) * envolvente anterior).
+    Los estados (zi, env) se actualizan en el lugar. Si out tiene el
+    largo del bloque, se escribe en él la señal A al cuadrado (out vacío
+    = no se guarda).
+
+    Es Python puro para poder probarlo sin numba; el backend "numba" usa
+    la versión compilada, fused_a_weighting_kernel.
+
+    :return: (suma de cuadrados, máximo Fast, máximo Slow)
+    """
+    n_sections = sos.shape[0]
+    fast_alpha = env_alpha[0]
+    slow_alpha = env_alpha[1]
+    fast_keep = -(fast_alpha - 1.0)
+    slow_keep = -(slow_alpha - 1.0)
+    fast_state = env[0]
+    slow_state = env[1]
+    fast_max = 0.0
+    slow_max = 0.0
+    sum_sq = 0.0
+    keep = out.shape[0] == x.shape[0]
+
+    for i in range(x.shape[0]):
+        y = np.float64(x[i])
+        for s in range(n_sections):
+            acc = sos[s, 0] * y + zi[s, 0]
+            zi[s, 0] = sos[s, 1] * y - sos[s, 4] * acc + zi[s, 1]
+            zi[s, 1] = sos[s, 2] * y - sos[s, 5] * acc
+            y = acc
+        sq = y * y
+        if keep:
+            out[i] = sq
+        sum_sq += sq
+        fast = fast_alpha * sq + fast_state
+        slow = slow_alpha * sq + slow_state
+        fast_state = fast_keep * fast
+        slow_state = slow_keep * slow
+        if fast > fast_max:
+            fast_max = fast
+        if slow > slow_max:
+            slow_max = slow
+
+    env[0] = fast_state
+    env[1] = slow_state
+    return sum_sq, fast_max, slow_max
+
+
+# El mismo kernel compilado (None sin numba)
+fused_a_weighting_kernel = (
+    None if numba is None else numba.njit(cache=True, nogil=True)(a_weighting_kernel)
+)
+
+
+class AWeightingStage:
+    """
+    Etapa de ponderación A del tick: filtro, energía y envolventes Fast/Slow.
+
+    Entrega la energía media del tick y los máximos de las envolventes
+    (LAFmax/LASmax) y, si se pide, la señal A al cuadrado en un buffer del
+    llamador, de donde MeterEngine saca el nivel y los Leq sin volver a
+    filtrar. Hay dos implementaciones con el mismo estado:
+
+    - "numba": un único bucle compilado sobre el bloque float32 que aplica
+      las secciones, eleva al cuadrado y sigue las envolventes y sus
+      máximos (una pasada por memoria, útil en equipos ARM),
+    - "numpy": la cadena de referencia sosfilt + cuadrado + lfilter.
+
+    "auto" usa numba si está instalado. La paridad y la velocidad de ambas
+    se comparan con: python -m src.fused_dsp_bench
+    """
+
+    TIME_CONSTANT_FAST = 0.125
+    TIME_CONSTANT_SLOW = 1.0
+
+    def __init__(self, sample_rate, backend="auto"):
+        self.sample_rate = sample_rate
+        self.sos = np.ascontiguousarray(create_dba_filter(sample_rate), dtype=np.float64)
+        self.env_alpha = np.array(
+            [
+                1.0 - np.exp(-1.0 / (tau * sample_rate))
+                for tau in (self.TIME_CONSTANT_FAST, self.TIME_CONSTANT_SLOW)
+            ]
+        )
+        self.reset()
+        self.set_backend(backend)
+
+    def reset(self):
+        """Reinicia el estado del filtro y de las envolventes."""
+        self.reset_filter()
+        self.env = np.zeros(2, dtype=np.float64)
+
+    def reset_filter(self):
+        """Reinicia solo el estado del filtro (p. ej. tras valores inválidos)."""
+        self.zi = np.ascontiguousarray(sosfilt_zi(self.sos))
+
+    def set_backend(self, backend):
+        """
+        Elige la implementación.
+
+        :param backend: "auto", "numba" o "numpy"
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend DSP desconocido: {backend}")
+        if backend == "numba" and numba is None:
+            print(
+                "Advertencia: 'numba' no está instalado; se usa el backend numpy",
+                file=sys.stderr,
+            )
+        if backend != "numpy" and numba is not None:
+            self.backend = "numba"
+            # Compilar ahora (o cargar del caché) y no en el primer tick
+            fused_a_weighting_kernel(
+                np.zeros(1, dtype=np.float32),
+                self.sos,
+                self.zi.copy(),
+                self.env.copy(),
+                self.env_alpha,
+                EMPTY_OUT,
+            )
+        else:
+            self.backend = "numpy"
+
+    def process(self, audio_chunk, out=None):
+        """
+        Procesa el audio crudo de un tick.
+
+        :param audio_chunk: Audio crudo (sin ponderar), float32 o float64
+        :param out: Buffer float64 del largo del bloque donde dejar la señal
+                    A al cuadrado (None = no se guarda)
+        :return: (energía media del tick, máximo de la envolvente Fast,
+                  máximo de la envolvente Slow), lineales sobre la señal A
+        """
+        if len(audio_chunk) == 0:
+            return 0.0, 0.0, 0.0
+        if self.backend == "numba":
+            sum_sq, fast_max, slow_max = fused_a_weighting_kernel(
+                audio_chunk,
+                self.sos,
+                self.zi,
+                self.env,
+                self.env_alpha,
+                EMPTY_OUT if out is None else out,
+            )
+            return sum_sq / len(audio_chunk), fast_max, slow_max
+        return self.process_numpy(audio_chunk, out)
+
+    def process_numpy(self, audio_chunk, out=None):
+        """Cadena de referencia: sosfilt, cuadrado y una llamada a lfilter por envolvente."""
+        filtered, self.zi = sosfilt(self.sos, audio_chunk, zi=self.zi)
+        squared = np.multiply(filtered, filtered, out=filtered if out is None else out)
+        maxima = []
+        for k, alpha in enumerate(self.env_alpha):
+            envelope, state = lfilter(
+                [alpha], [1.0, alpha - 1.0], squared, zi=self.env[k : k + 1]
+            )
+            self.env[k] = state[0]
+            maxima.append(float(envelope.max()))
+        return float(np.mean(squared)), maxima[0], maxima[1]
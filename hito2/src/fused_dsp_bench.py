@@ -0,0 +1,89 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+from src.fused_dsp import AWeightingStage, numba
+from src.synthetic_audio import SAMPLE_RATE, random_partition, synthetic_signal
+
+
+def check_parity(seconds, tolerance, verbose=True):
+    """
+    Compara el backend numba con la cadena de referencia sosfilt/lfilter,
+    incluida la señal A al cuadrado que se deja en el buffer out.
+
+    :return: Mayor error relativo encontrado
+    """
+    signal = synthetic_signal(seconds)
+    rng = np.random.default_rng(1)
+    cuts = random_partition(len(signal), rng)
+
+    reference = AWeightingStage(SAMPLE_RATE, "numpy")
+    fused = AWeightingStage(SAMPLE_RATE, "numba")
+    worst = 0.0
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        chunk = signal[start:end]
+        expected_sq = np.empty(len(chunk))
+        got_sq = np.empty(len(chunk))
+        expected = reference.process(chunk, expected_sq)
+        got = fused.process(chunk, got_sq)
+        for e, g in zip(expected, got):
+            worst = max(worst, abs(g - e) / max(abs(e), 1e-30))
+        scale = max(float(np.max(expected_sq)), 1e-30)
+        worst = max(worst, float(np.max(np.abs(got_sq - expected_sq))) / scale)
+
+    # Los estados también deben coincidir al final
+    worst = max(worst, float(np.max(np.abs(fused.zi - reference.zi))))
+    worst = max(worst, float(np.max(np.abs(fused.env - reference.env) / reference.env)))
+    if verbose:
+        print(
+            f"Paridad numba vs sosfilt: {len(cuts) - 1} bloques, error relativo máximo "
+            f"{worst:.2e} (tolerancia {tolerance:.0e})"
+        )
+    return worst
+
+
+def benchmark(backend, block_size, seconds):
+    """
+    Mide el tiempo por bloque de un backend.
+
+    :return: (microsegundos por bloque, nanosegundos por muestra)
+    """
+    signal = synthetic_signal(seconds, seed=2)
+    n_blocks = len(signal) // block_size
+    blocks = signal[: n_blocks * block_size].reshape(n_blocks, block_size)
+    stage = AWeightingStage(SAMPLE_RATE, backend)
+    stage.process(blocks[0])
+
+    start = time.perf_counter()
+    for block in blocks:
+        stage.process(block)
+    elapsed = time.perf_counter() - start
+    return elapsed / n_blocks * 1e6, elapsed / blocks.size * 1e9
+
+
+def main():
+    """Paridad y rendimiento de los backends de la ponderación A."""
+    parser = argparse.ArgumentParser(description="Paridad y benchmark del DSP fusionado")
+    parser.add_argument("--segundos", type=float, default=20.0, help="Audio por prueba (s)")
+    parser.add_argument("--tolerancia", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    backends = ["numpy"]
+    if numba is None:
+        print("Advertencia: 'numba' no está instalado; solo se mide el backend numpy")
+    else:
+        backends.append("numba")
+        if check_parity(args.segundos, args.tolerancia) > args.tolerancia:
+            print("ERROR: el backend numba no coincide con la referencia", file=sys.stderr)
+            sys.exit(1)
+
+    print(f"{'bloque':>8} {'backend':>8} {'µs/bloque':>10} {'ns/muestra':>11}")
+    for block_size in (512, 4096, 40960):
+        for backend in backends:
+            per_block, per_sample = benchmark(backend, block_size, args.segundos)
+            print(f"{block_size:>8} {backend:>8} {per_block:>10.1f} {per_sample:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
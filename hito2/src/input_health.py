@@ -0,0 +1,204 @@
+import math
+import sys
+
+import numpy as np
+
+# Banderas y contadores del estado de la entrada (también son los campos que
+# el proceso DSP copia en cada registro, ver src/dsp_process.py)
+HEALTH_FLAGS = ("recorte", "dc", "ceros", "congelado")
+HEALTH_COUNTERS = ("muestras_recortadas", "tramos_ceros", "tramos_congelados")
+HEALTH_VALUES = ("offset_dc", "piso_ruido_dbfs")
+
+HEALTH_MESSAGES = {
+    "recorte": "recorte en la entrada, reducir ganancia del micrófono",
+    "dc": "offset DC en la entrada",
+    "ceros": "tramos de ceros digitales (pérdida de señal)",
+    "congelado": "señal congelada (valores repetidos)",
+}
+
+
+class InputHealthMonitor:
+    """
+    Estado de la señal cruda de entrada, evaluado una vez por tick.
+
+    Sobre el audio sin ponderar (el filtro A atenúa las bajas frecuencias y
+    esconde el recorte que ocurre ahí) se calculan, con una pasada por
+    indicador sobre el tick:
+
+    - muestras recortadas (|x| >= CLIP_LEVEL),
+    - offset DC (media suavizada con constante DC_TAU_S),
+    - corridas de al menos RUN_MIN_S de muestras idénticas, continuando
+      entre ticks: de ceros indican pérdida de señal, si no, señal congelada,
+    - el piso de ruido: mínimo de la energía por tramos de NOISE_FRAME_S que
+      sube a lo sumo NOISE_RISE_DB_PER_S (estadística de mínimos).
+
+    Las banderas se mantienen FLAG_HOLD_S después de la última detección, y
+    los avisos por consola se agrupan cada REPORT_INTERVAL_S. Los tiempos
+    son del audio procesado (muestras / fs), no del reloj del sistema.
+    """
+
+    CLIP_LEVEL = 0.99
+    DC_TAU_S = 1.0
+    DC_LIMIT = 0.01
+    RUN_MIN_S = 0.005
+    NOISE_FRAME_S = 0.01
+    NOISE_RISE_DB_PER_S = 1.0
+    FLAG_HOLD_S = 2.0
+    REPORT_INTERVAL_S = 10.0
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.run_min = max(int(self.RUN_MIN_S * sample_rate), 2)
+        self.noise_frame = max(int(self.NOISE_FRAME_S * sample_rate), 1)
+        self.reset()
+
+    def reset(self):
+        """Reinicia contadores, banderas y estimaciones."""
+        self.stream_time = 0.0
+        self.dc = 0.0
+        self.noise_floor = None
+
+        # Corrida de muestras idénticas que llega al final del tick anterior
+        self.last_value = None
+        self.tail_run = 0
+        self.tail_counted = False
+
+        self.counters = dict.fromkeys(HEALTH_COUNTERS, 0)
+        self.last_seen = dict.fromkeys(HEALTH_FLAGS, None)
+        self.pending = dict.fromkeys(HEALTH_FLAGS, 0)
+        self.next_report = self.REPORT_INTERVAL_S
+
+    def process(self, audio_chunk):
+        """
+        Evalúa el audio crudo de un tick.
+
+        :param audio_chunk: Audio crudo (sin ponderar), 1-D
+        :return: dict con las banderas (HEALTH_FLAGS), los contadores
+                 acumulados (HEALTH_COUNTERS) y HEALTH_VALUES
+        """
+        n = len(audio_chunk)
+        if n == 0:
+            return self.status()
+        duration = n / self.sample_rate
+        self.stream_time += duration
+
+        # Recorte (el conteo solo se calcula si el máximo o el mínimo llegan al límite)
+        clipped = 0
+        if audio_chunk.max() >= self.CLIP_LEVEL or audio_chunk.min() <= -self.CLIP_LEVEL:
+            clipped = int(np.count_nonzero(np.abs(audio_chunk) >= self.CLIP_LEVEL))
+        if clipped:
+            self.counters["muestras_recortadas"] += clipped
+            self.detect("recorte", clipped)
+
+        # Offset DC (media suavizada)
+        alpha = 1.0 - math.exp(-duration / self.DC_TAU_S)
+        self.dc += alpha * (float(audio_chunk.sum(dtype=np.float64)) / n - self.dc)
+        if abs(self.dc) > self.DC_LIMIT:
+            self.detect("dc", 1)
+
+        self.update_runs(audio_chunk)
+        self.update_noise_floor(audio_chunk, duration)
+
+        if self.stream_time >= self.next_report:
+            self.report()
+        return self.status()
+
+    def update_runs(self, audio_chunk):
+        """Cuenta las corridas largas de muestras idénticas (ceros o congeladas)."""
+        n = len(audio_chunk)
+        same = audio_chunk[1:] == audio_chunk[:-1]
+        repeated = int(np.count_nonzero(same))
+        continued = self.last_value is not None and audio_chunk[0] == self.last_value
+
+        # Con audio normal casi no hay muestras repetidas: si no alcanzan para
+        # una corrida larga, solo se actualiza la corrida final
+        if repeated + 1 + self.tail_run < self.run_min:
+            if repeated == n - 1:
+                self.tail_run = n + (self.tail_run if continued else 0)
+            elif n > 1 and same[-1]:
+                self.tail_run = n - 1 - int(np.flatnonzero(~same)[-1])
+            else:
+                self.tail_run = 1
+            self.last_value = audio_chunk[-1]
+            self.tail_counted = False
+            return
+
+        # Última posición de cada corrida y su largo
+        ends = np.append(np.flatnonzero(~same), n - 1)
+        lengths = np.diff(ends, prepend=-1)
+        values = audio_chunk[ends]
+
+        # La primera corrida continúa la del tick anterior si el valor coincide
+        if continued:
+            lengths[0] += self.tail_run
+
+        long_runs = lengths >= self.run_min
+        if long_runs.any():
+            zeros = values == 0
+            counted = long_runs.copy()
+            if continued and self.tail_counted:
+                counted[0] = False
+            self.counters["tramos_ceros"] += int(np.count_nonzero(counted & zeros))
+            self.counters["tramos_congelados"] += int(np.count_nonzero(counted & ~zeros))
+            if (long_runs & zeros).any():
+                self.detect("ceros", 1)
+            if (long_runs & ~zeros).any():
+                self.detect("congelado", 1)
+
+        self.last_value = values[-1]
+        self.tail_run = int(lengths[-1])
+        self.tail_counted = bool(long_runs[-1])
+
+    def update_noise_floor(self, audio_chunk, duration):
+        """Actualiza el piso de ruido con la energía mínima de los tramos del tick."""
+        frames = len(audio_chunk) // self.noise_frame
+        if frames == 0:
+            return
+        blocks = audio_chunk[: frames * self.noise_frame].reshape(frames, self.noise_frame)
+        energies = np.einsum("ij,ij->i", blocks, blocks)
+        energy = float(energies.min())
+        if energy == 0.0:
+            # Los tramos de ceros digitales son pérdida de señal, no piso de ruido
+            energies = energies[energies > 0]
+            if len(energies) == 0:
+                return
+            energy = float(energies.min())
+        energy /= self.noise_frame
+        if self.noise_floor is None or energy < self.noise_floor:
+            self.noise_floor = energy
+        else:
+            rise = 10.0 ** (self.NOISE_RISE_DB_PER_S * duration / 10.0)
+            self.noise_floor = min(self.noise_floor * rise, energy)
+
+    def detect(self, name, count):
+        """Marca una condición detectada en el tick actual."""
+        self.last_seen[name] = self.stream_time
+        self.pending[name] += count
+
+    def report(self):
+        """Informa por consola las condiciones del último intervalo (una línea por condición)."""
+        for name in HEALTH_FLAGS:
+            if self.pending[name]:
+                detail = (
+                    f" ({self.pending[name]} muestras)" if name == "recorte" else ""
+                )
+                print(
+                    f"Advertencia: {HEALTH_MESSAGES[name]}{detail} "
+                    f"en los últimos {self.REPORT_INTERVAL_S:.0f} s",
+                    file=sys.stderr,
+                )
+                self.pending[name] = 0
+        self.next_report = self.stream_time + self.REPORT_INTERVAL_S
+
+    def status(self):
+        """Banderas (mantenidas FLAG_HOLD_S), contadores y valores actuales."""
+        status = {
+            name: seen is not None and self.stream_time - seen <= self.FLAG_HOLD_S
+            for name, seen in self.last_seen.items()
+        }
+        status.update(self.counters)
+        status["offset_dc"] = float(self.dc)
+        status["piso_ruido_dbfs"] = (
+            None if self.noise_floor is None else float(10.0 * np.log10(self.noise_floor))
+        )
+        return status
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Perfiles (tamaño de bloque, latencia de PortAudio) de menor a mayor latencia
+LATENCY_PROFILES = (
+    (256, "low"),
+    (512, "low"),
+    (1024, "low"),
+    (2048, "high"),
+    (4096, "high"),
+    (8192, "high"),
+)
+
+# Perfil manual de baja latencia para la ponderación Impulse
+IMPULSE_PROFILE = (512, "low")
+
+
+class AdaptiveLatencyController:
+    """
+    Elige el tamaño de bloque y la latencia del stream según lo observado.
+
+    Parte del perfil de menor latencia permitido y evalúa ventanas de
+    WINDOW_S segundos con tres indicadores:
+
+    - overflows nuevos del stream,
+    - carga de procesamiento (tiempo de process_audio / tiempo de la ventana),
+    - jitter del callback (desviación de los intervalos entre callbacks,
+      relativa a la duración del bloque).
+
+    Si en una ventana hay overflows o la carga o el jitter superan su límite,
+    sube un perfil; si STABLE_WINDOWS_TO_STEP_DOWN ventanas seguidas quedan
+    holgadas, baja uno. Tras un cambio se descarta la ventana siguiente,
+    que incluye el reinicio del stream.
+    """
+
+    WINDOW_S = 5.0
+    STABLE_WINDOWS_TO_STEP_DOWN = 6
+
+    MAX_LOAD = 0.5
+    LOW_LOAD = 0.2
+    MAX_JITTER = 0.5
+    LOW_JITTER = 0.25
+
+    def __init__(self, sample_rate, min_block=256, max_block=8192, profiles=LATENCY_PROFILES):
+        self.sample_rate = sample_rate
+        self.profiles = [p for p in profiles if min_block <= p[0] <= max_block]
+        if not self.profiles:
+            raise ValueError(f"Ningún perfil entre {min_block} y {max_block} muestras")
+        self.index = 0
+
+        self.window_start = None
+        self.window_overflows = None
+        self.processing_s = 0.0
+        self.stable_windows = 0
+        self.skip_window = False
+
+    @property
+    def profile(self):
+        """Perfil actual (tamaño de bloque, latencia)."""
+        return self.profiles[self.index]
+
+    def add_processing_time(self, seconds):
+        """Acumula el tiempo de procesamiento de un tick."""
+        self.processing_s += seconds
+
+    def observe(self, now, overflow_count, callback_times):
+        """
+        Evalúa la ventana en curso y decide si cambiar de perfil.
+
+        :param now: Tiempo actual (time.perf_counter)
+        :param overflow_count: Overflows acumulados del stream
+        :param callback_times: Instantes (perf_counter) de los últimos callbacks
+        :return: Nuevo perfil (tamaño de bloque, latencia) o None
+        """
+        if self.window_start is None:
+            self.start_window(now, overflow_count)
+            return None
+        elapsed = now - self.window_start
+        if elapsed < self.WINDOW_S:
+            return None
+
+        overflows = overflow_count - self.window_overflows
+        load = self.processing_s / elapsed
+        jitter = self.callback_jitter(callback_times, self.window_start)
+        self.start_window(now, overflow_count)
+
+        if self.skip_window:
+            self.skip_window = False
+            return None
+
+        if overflows > 0 or load > self.MAX_LOAD or jitter > self.MAX_JITTER:
+            self.stable_windows = 0
+            if self.index + 1 < len(self.profiles):
+                return self.step(+1, overflows, load, jitter)
+            return None
+
+        if load < self.LOW_LOAD and jitter < self.LOW_JITTER:
+            self.stable_windows += 1
+            if self.stable_windows >= self.STABLE_WINDOWS_TO_STEP_DOWN and self.index > 0:
+                self.stable_windows = 0
+                return self.step(-1, overflows, load, jitter)
+        else:
+            self.stable_windows = 0
+        return None
+
+    def start_window(self, now, overflow_count):
+        """Comienza una ventana de observación nueva."""
+        self.window_start = now
+        self.window_overflows = overflow_count
+        self.processing_s = 0.0
+
+    def callback_jitter(self, callback_times, since):
+        """Desviación estándar de los intervalos entre callbacks, en bloques."""
+        times = np.sort(callback_times[callback_times >= since])
+        if len(times) < 3:
+            return 0.0
+        block_s = self.profile[0] / self.sample_rate
+        return float(np.std(np.diff(times)) / block_s)
+
+    def step(self, direction, overflows, load, jitter):
+        """Cambia de perfil e informa el motivo."""
+        previous = self.profile
+        self.index += direction
+        self.skip_window = True
+        print(
+            f"Latencia adaptativa: bloque {previous[0]} -> {self.profile[0]} "
+            f"({self.profile[1]}); overflows={overflows}, carga={load:.2f}, "
+            f"jitter={jitter:.2f}"
+        )
+        return self.profile
@@ -0,0 +1,442 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from src.rollups import LN_PERCENTS, IntervalAggregate
+
+CSV_HEADER = b"timestamp,nivel_dba,clasificacion,tipo_local"
+
+# Bytes leídos por bloque al recorrer cada archivo
+CHUNK_BYTES = 32 * 1024 * 1024
+
+# Ancho máximo de los campos de texto variables
+LEVEL_WIDTH = 8
+VENUE_WIDTH = 96
+
+TIMESTAMP_WIDTH = 19  # "AAAA-MM-DD HH:MM:SS"
+
+
+class VenueTotals:
+    """
+    Acumulados de un tipo de local en uno o más archivos.
+
+    El nivel se agrega en un IntervalAggregate (Leq, Lmax, Lmin, Ln); el
+    tiempo por clasificación se guarda por código de byte y la energía por
+    minuto como arrays (minuto, energía, duración) que se reducen al final,
+    de modo que los minutos partidos entre archivos se combinan bien.
+    """
+
+    def __init__(self):
+        self.aggregate = IntervalAggregate("total", None, None)
+        self.class_seconds = np.zeros(256, dtype=np.float64)
+        self.minutes = []
+
+    def add(self, seconds, levels, classes, dt):
+        """
+        Agrega las filas de un bloque.
+
+        :param seconds: Segundo de cada fila (hora local, segundos desde 1970)
+        :param levels: Nivel en dBA de cada fila
+        :param classes: Código de byte de la clasificación de cada fila
+        :param dt: Duración representada por cada fila (segundos)
+        """
+        self.aggregate.add_many(levels, dt)
+        self.class_seconds += np.bincount(classes, weights=dt, minlength=256)
+
+        first = int(seconds[0])
+        last = int(seconds[-1])
+        start = first if self.aggregate.start is None else min(self.aggregate.start, first)
+        end = last if self.aggregate.end is None else max(self.aggregate.end, last)
+        self.aggregate.start, self.aggregate.end = start, end
+
+        minute_keys, inverse = np.unique(seconds // 60, return_inverse=True)
+        energy = np.bincount(inverse, weights=dt * 10.0 ** (levels / 10.0))
+        duration = np.bincount(inverse, weights=dt)
+        self.minutes.append((minute_keys, energy, duration))
+
+    def merge(self, other):
+        """Combina los acumulados de otro archivo."""
+        if other.aggregate.n == 0:
+            return
+        self.aggregate.merge(other.aggregate)
+        for attr, pick in (("start", min), ("end", max)):
+            mine = getattr(self.aggregate, attr)
+            theirs = getattr(other.aggregate, attr)
+            setattr(self.aggregate, attr, theirs if mine is None else pick(mine, theirs))
+        self.class_seconds += other.class_seconds
+        self.minutes.extend(other.minutes)
+        self.compact_minutes()
+
+    def compact_minutes(self):
+        """Reduce la lista de minutos a un único array por minuto."""
+        if len(self.minutes) <= 1:
+            return
+        keys = np.concatenate([m[0] for m in self.minutes])
+        energy = np.concatenate([m[1] for m in self.minutes])
+        duration = np.concatenate([m[2] for m in self.minutes])
+        minute_keys, inverse = np.unique(keys, return_inverse=True)
+        self.minutes = [
+            (
+                minute_keys,
+                np.bincount(inverse, weights=energy),
+                np.bincount(inverse, weights=duration),
+            )
+        ]
+
+    def minutes_above(self, limit):
+        """Minutos cuyo Leq supera el límite."""
+        self.compact_minutes()
+        if limit is None or not self.minutes:
+            return 0
+        _, energy, duration = self.minutes[0]
+        valid = duration > 0
+        minute_leq = 10.0 * np.log10(energy[valid] / duration[valid])
+        return int(np.count_nonzero(minute_leq > limit))
+
+
+def parse_timestamps(buf, starts):
+    """
+    Convierte los timestamps "AAAA-MM-DD HH:MM:SS" de cada línea a segundos.
+
+    Se leen los dígitos en posiciones fijas; las fechas se convierten con
+    datetime64. El resultado es hora local "ingenua" (sin zona horaria), que
+    basta para duraciones y para agrupar por minuto.
+
+    :param buf: Bloque como array uint8
+    :param starts: Posición de inicio de cada línea
+    :return: Array int64 con los segundos
+    """
+    digits = buf[starts[:, None] + np.arange(TIMESTAMP_WIDTH)].astype(np.int64) - 48
+
+    def field(a, b):
+        value = np.zeros(len(starts), dtype=np.int64)
+        for col in range(a, b):
+            value = value * 10 + digits[:, col]
+        return value
+
+    months = (field(0, 4) - 1970) * 12 + field(5, 7) - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    days += field(8, 10) - 1
+    return days * 86400 + field(11, 13) * 3600 + field(14, 16) * 60 + field(17, 19)
+
+
+def fixed_width_field(buf, begin, end, width):
+    """
+    Extrae un campo de texto de cada línea como array de bytes de ancho fijo.
+
+    :param buf: Bloque como array uint8
+    :param begin: Posición de inicio del campo en cada línea
+    :param end: Posición final (exclusiva) del campo en cada línea
+    :param width: Ancho máximo (lo que sobra se trunca)
+    :return: Array de dtype 'S<width>'
+    """
+    idx = begin[:, None] + np.arange(width)
+    inside = idx < end[:, None]
+    chars = buf[np.minimum(idx, len(buf) - 1)]
+    chars[~inside] = 0
+    return np.ascontiguousarray(chars).view(f"S{width}").ravel()
+
+
+def venue_runs(buf, begin, end):
+    """
+    Identifica el tipo de local de cada línea.
+
+    El tipo de local cambia muy pocas veces dentro de un log, así que se
+    comparan los bytes de cada línea con los de la anterior y solo los
+    inicios de tramo se decodifican.
+
+    :param buf: Bloque como array uint8
+    :param begin: Posición de inicio del campo en cada línea
+    :param end: Posición final (exclusiva) del campo en cada línea
+    :return: (código por línea, lista de nombres por código)
+    """
+    width = int(min(max((end - begin).max(), 1), VENUE_WIDTH))
+    raw = fixed_width_field(buf, begin, end, width)
+    matrix = raw.view(np.uint8).reshape(len(raw), width)
+
+    changed = np.ones(len(raw), dtype=bool)
+    changed[1:] = (matrix[1:] != matrix[:-1]).any(axis=1)
+    run_starts = np.flatnonzero(changed)
+    run_lengths = np.diff(np.concatenate((run_starts, [len(raw)])))
+
+    names, run_codes = np.unique(raw[run_starts], return_inverse=True)
+    codes = np.repeat(run_codes.ravel(), run_lengths)
+    return codes, [name.decode("utf-8", errors="replace").strip() for name in names]
+
+
+def parse_block(data):
+    """
+    Separa un bloque de líneas completas en columnas sin recorrerlo por fila.
+
+    :param data: bytes que terminan en salto de línea
+    :return: (inicio de línea, segundos, niveles, clasificación, código de
+             tipo de local, nombres de tipo de local) o None si no hay líneas
+             válidas
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == 10)
+    if len(newlines) == 0:
+        return None
+    starts = np.concatenate(([0], newlines[:-1] + 1))
+    ends = newlines.copy()
+    ends -= buf[np.maximum(ends - 1, 0)] == 13  # finales "\r\n"
+
+    commas = np.flatnonzero(buf == 44)
+    first = np.searchsorted(commas, starts)
+    # Las líneas válidas tienen tres comas y el timestamp de ancho fijo
+    valid = first + 2 < len(commas)
+    first = np.where(valid, first, 0)
+    valid &= commas[first] == starts + TIMESTAMP_WIDTH
+    valid &= commas[np.minimum(first + 2, len(commas) - 1)] < ends
+    if not valid.any():
+        return None
+
+    starts, ends, first = starts[valid], ends[valid], first[valid]
+    c1, c2, c3 = commas[first], commas[first + 1], commas[first + 2]
+
+    try:
+        levels = fixed_width_field(buf, c1 + 1, c2, LEVEL_WIDTH).astype(np.float64)
+    except ValueError:
+        # Algún nivel no numérico: convertir uno a uno y descartar los inválidos
+        raw = fixed_width_field(buf, c1 + 1, c2, LEVEL_WIDTH)
+        levels = np.array([_to_float(v) for v in raw])
+        ok = np.isfinite(levels)
+        starts, ends, c2, c3, levels = starts[ok], ends[ok], c2[ok], c3[ok], levels[ok]
+        if len(levels) == 0:
+            return None
+
+    seconds = parse_timestamps(buf, starts)
+    classes = np.where(c3 > c2 + 1, buf[c2 + 1], 0).astype(np.int64)
+    venue_codes, venue_names = venue_runs(buf, c3 + 1, ends)
+    return starts, seconds, levels, classes, venue_codes, venue_names
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def row_durations(seconds):
+    """
+    Duración de cada fila: cada segundo se reparte entre sus filas.
+
+    El log guarda el timestamp con resolución de 1 s y varias filas por
+    segundo, así que cada fila representa 1/(filas de ese segundo).
+
+    :param seconds: Segundos de cada fila (en orden)
+    :return: Array con la duración de cada fila
+    """
+    boundaries = np.flatnonzero(np.diff(seconds)) + 1
+    run_starts = np.concatenate(([0], boundaries))
+    run_lengths = np.diff(np.concatenate((run_starts, [len(seconds)])))
+    return np.repeat(1.0 / run_lengths, run_lengths)
+
+
+def analyze_file(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Recorre un log CSV por bloques y acumula sus totales por tipo de local.
+
+    Las filas del último segundo de cada bloque se dejan para el siguiente,
+    así la duración por fila no depende del corte entre bloques.
+
+    :param path: Ruta del CSV
+    :param chunk_bytes: Bytes por bloque
+    :return: dict {tipo de local: VenueTotals}
+    """
+    totals = {}
+    carry = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            at_end = not chunk
+            data = carry + chunk
+            if not at_end:
+                cut = data.rfind(b"\n") + 1
+                data, carry = data[:cut], data[cut:]
+            elif data and not data.endswith(b"\n"):
+                data += b"\n"
+            if data.startswith(CSV_HEADER):
+                data = data[data.find(b"\n") + 1 :]
+
+            parsed = parse_block(data) if data else None
+            if parsed is not None:
+                starts, seconds, levels, classes, venues, names = parsed
+                if not at_end:
+                    # Guardar el último segundo (puede continuar en el bloque
+                    # siguiente); si todo el bloque es un solo segundo, se guarda entero
+                    last = np.searchsorted(seconds, seconds[-1])
+                    if np.all(seconds[:-1] <= seconds[1:]):
+                        carry = data[starts[last] :] + carry
+                        seconds, levels = seconds[:last], levels[:last]
+                        classes, venues = classes[:last], venues[:last]
+                accumulate(totals, seconds, levels, classes, venues, names)
+
+            if at_end:
+                break
+    return totals
+
+
+def accumulate(totals, seconds, levels, classes, venues, names):
+    """Agrega un bloque parseado a los totales por tipo de local."""
+    if len(seconds) == 0:
+        return
+    dt = row_durations(seconds)
+    if len(names) == 1:
+        totals.setdefault(names[0], VenueTotals()).add(seconds, levels, classes, dt)
+        return
+    for code, name in enumerate(names):
+        mask = venues == code
+        if not mask.any():
+            continue
+        totals.setdefault(name, VenueTotals()).add(
+            seconds[mask], levels[mask], classes[mask], dt[mask]
+        )
+
+
+def analyze_files(paths, processes=None):
+    """
+    Analiza varios archivos en paralelo (un proceso por archivo).
+
+    :param paths: Rutas de los CSV
+    :param processes: Número de procesos (None = núcleos disponibles)
+    :return: dict {tipo de local: VenueTotals} combinado
+    """
+    totals = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(analyze_file, path): path for path in paths}
+        for future in futures:
+            try:
+                file_totals = future.result()
+            except Exception as e:
+                print(f"Error al analizar '{futures[future]}': {e}", file=sys.stderr)
+                continue
+            for name, venue in file_totals.items():
+                if name in totals:
+                    totals[name].merge(venue)
+                else:
+                    totals[name] = venue
+    return totals
+
+
+def venue_limits(tipos_locales, criterio="nivel_max"):
+    """
+    Límite (dBA) de cada tipo de local según 'tipos_locales.json'.
+
+    :param tipos_locales: Contenido de 'tipos_locales.json'
+    :param criterio: "nivel_max" (clasificación base) o "limite_d"
+    :return: dict {nombre: límite}
+    """
+    clasificaciones = tipos_locales.get("clasificaciones", {})
+    limits = {}
+    for local in tipos_locales.get("tipos_locales", []):
+        if criterio == "limite_d":
+            limits[local["nombre"]] = local.get("limite_d")
+        else:
+            base = local.get("clasificacion_base", "C")
+            limits[local["nombre"]] = clasificaciones.get(base, {}).get("nivel_max")
+    return limits
+
+
+def summarize(totals, limits):
+    """
+    Resumen por tipo de local.
+
+    :param totals: dict {tipo de local: VenueTotals}
+    :param limits: dict {tipo de local: límite en dBA}
+    :return: Lista de dicts (uno por tipo de local)
+    """
+    rows = []
+    for name in sorted(totals):
+        venue = totals[name]
+        agg = venue.aggregate
+        limit = limits.get(name)
+        classes = {
+            chr(code): round(float(venue.class_seconds[code]), 1)
+            for code in np.flatnonzero(venue.class_seconds)
+            if code
+        }
+        rows.append(
+            {
+                "tipo_local": name,
+                "leq": None if agg.leq is None else round(agg.leq, 2),
+                "lmax": agg.lmax,
+                "lmin": agg.lmin,
+                **{f"l{p}": agg.ln(p) for p in LN_PERCENTS},
+                "n": agg.n,
+                "duracion_s": round(agg.duration, 1),
+                "segundos_por_clasificacion": classes,
+                "limite": limit,
+                "excedencia_s": None if limit is None else round(agg.time_above(limit), 1),
+                "minutos_excedencia": venue.minutes_above(limit),
+            }
+        )
+    return rows
+
+
+def find_csv_files(inputs):
+    """Expande directorios (recursivamente) a sus archivos .csv."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(
+                    os.path.join(root, name) for name in files if name.lower().endswith(".csv")
+                )
+        else:
+            paths.append(item)
+    return sorted(paths)
+
+
+def main():
+    """Analiza logs CSV de mediciones e imprime el resumen por tipo de local."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Análisis masivo de logs CSV de mediciones")
+    parser.add_argument("entradas", nargs="+", help="Archivos CSV o directorios")
+    parser.add_argument("--tipos", default="tipos_locales.json", help="Archivo de tipos de local")
+    parser.add_argument("--criterio", choices=("nivel_max", "limite_d"), default="nivel_max")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    try:
+        with open(args.tipos, "r", encoding="utf-8") as f:
+            tipos_locales = json.load(f)
+    except Exception as e:
+        print(f"Advertencia: No se pudo cargar '{args.tipos}': {e}", file=sys.stderr)
+        tipos_locales = {}
+
+    paths = find_csv_files(args.entradas)
+    started = time.perf_counter()
+    totals = analyze_files(paths, args.procesos)
+    rows = summarize(totals, venue_limits(tipos_locales, args.criterio))
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print("tipo_local,leq,lmax,lmin,l10,l50,l90,horas,clasificacion_h,excedencia_min")
+        for row in rows:
+            classes = " ".join(
+                f"{k}={v / 3600.0:.1f}" for k, v in row["segundos_por_clasificacion"].items()
+            )
+            print(
+                f"{row['tipo_local']},{row['leq']},{row['lmax']:.1f},{row['lmin']:.1f},"
+                f"{row['l10']:.1f},{row['l50']:.1f},{row['l90']:.1f},"
+                f"{row['duracion_s'] / 3600.0:.1f},{classes},{row['minutos_excedencia']}"
+            )
+
+    n_rows = sum(venue.aggregate.n for venue in totals.values())
+    print(
+        f"{len(paths)} archivos, {n_rows} filas en {elapsed:.1f} s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
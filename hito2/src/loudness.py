@@ -0,0 +1,155 @@
+import numpy as np
+from scipy.signal import sosfilt, sosfilt_zi
+from src.audio_utils import create_k_weighting_filter
+
+
+class LoudnessMeter:
+    """
+    Sonoridad ITU-R BS.1770 / EBU R128 (LUFS) de un canal.
+
+    La señal se filtra con ponderación K y su energía se acumula en
+    sub-bloques de 100 ms. Con los últimos 4 sub-bloques se obtiene la
+    sonoridad momentánea (400 ms) y con los últimos 30 la de corto plazo
+    (3 s). Cada sub-bloque cierra un bloque de 400 ms con 75% de
+    solapamiento, que se agrega a un histograma de bins fijos (0.1 LU) con
+    la cantidad de bloques y la suma de sus energías. La sonoridad integrada
+    (compuerta absoluta de -70 LUFS y relativa de -10 LU) se calcula sobre
+    el histograma, así que la memoria es constante aunque la medición dure
+    toda la noche.
+
+    Los LUFS son relativos a escala completa: no se aplica la calibración.
+    """
+
+    SUBBLOCK_SECONDS = 0.1
+    MOMENTARY_SUBBLOCKS = 4
+    SHORT_TERM_SUBBLOCKS = 30
+
+    ABSOLUTE_GATE_LUFS = -70.0
+    RELATIVE_GATE_LU = -10.0
+
+    HISTOGRAM_MIN_LUFS = -70.0
+    HISTOGRAM_MAX_LUFS = 10.0
+    HISTOGRAM_STEP_LU = 0.1
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.subblock_samples = int(round(self.SUBBLOCK_SECONDS * sample_rate))
+
+        self.sos_k = create_k_weighting_filter(sample_rate)
+
+        n_bins = int(
+            round((self.HISTOGRAM_MAX_LUFS - self.HISTOGRAM_MIN_LUFS) / self.HISTOGRAM_STEP_LU)
+        )
+        self.histogram_counts = np.zeros(n_bins, dtype=np.int64)
+        self.histogram_energy = np.zeros(n_bins, dtype=np.float64)
+        # Sonoridad del centro de cada bin (para la compuerta relativa)
+        self.bin_centers = self.HISTOGRAM_MIN_LUFS + (np.arange(n_bins) + 0.5) * (
+            self.HISTOGRAM_STEP_LU
+        )
+
+        self.reset()
+
+    def reset(self):
+        """Reinicia el filtro, los sub-bloques y la sonoridad integrada."""
+        self.zi_k = sosfilt_zi(self.sos_k) * 0.0
+        self.partial_energy = 0.0
+        self.partial_samples = 0
+        self.subblocks = np.zeros(self.SHORT_TERM_SUBBLOCKS, dtype=np.float64)
+        self.subblocks_index = 0
+        self.subblocks_filled = 0
+        self.reset_integrated()
+
+    def reset_integrated(self):
+        """Reinicia solo la sonoridad integrada (histograma de bloques)."""
+        self.histogram_counts[:] = 0
+        self.histogram_energy[:] = 0.0
+
+    @staticmethod
+    def to_lufs(mean_square):
+        """Convierte energía media (ponderación K) a LUFS."""
+        return float(-0.691 + 10.0 * np.log10(max(mean_square, 1e-20)))
+
+    def process(self, raw_chunk):
+        """
+        Procesa el audio crudo de un tick.
+
+        :param raw_chunk: Audio crudo del tick (sin ponderar)
+        :return: dict con momentary, short_term e integrated en LUFS
+                 (None mientras no haya datos suficientes)
+        """
+        k_weighted, self.zi_k = sosfilt(self.sos_k, raw_chunk, zi=self.zi_k)
+        squared = k_weighted * k_weighted
+
+        # Completar el sub-bloque pendiente y cortar los sub-bloques enteros
+        first = min(len(squared), self.subblock_samples - self.partial_samples)
+        self.partial_energy += float(np.sum(squared[:first]))
+        self.partial_samples += first
+
+        closed = []
+        if self.partial_samples == self.subblock_samples:
+            closed.append(self.partial_energy)
+            rest = squared[first:]
+            n_full = len(rest) // self.subblock_samples
+            if n_full:
+                full = rest[: n_full * self.subblock_samples]
+                closed.extend(full.reshape(n_full, self.subblock_samples).sum(axis=1))
+            tail = rest[n_full * self.subblock_samples :]
+            self.partial_energy = float(np.sum(tail))
+            self.partial_samples = len(tail)
+
+        for energy in closed:
+            self.add_subblock(energy)
+
+        return self.values()
+
+    def add_subblock(self, energy):
+        """Agrega un sub-bloque de 100 ms y actualiza el histograma."""
+        self.subblocks[self.subblocks_index] = energy
+        self.subblocks_index = (self.subblocks_index + 1) % self.SHORT_TERM_SUBBLOCKS
+        self.subblocks_filled = min(self.subblocks_filled + 1, self.SHORT_TERM_SUBBLOCKS)
+
+        if self.subblocks_filled >= self.MOMENTARY_SUBBLOCKS:
+            block = self.recent_mean_square(self.MOMENTARY_SUBBLOCKS)
+            loudness = self.to_lufs(block)
+            if loudness > self.ABSOLUTE_GATE_LUFS:
+                idx = int((loudness - self.HISTOGRAM_MIN_LUFS) / self.HISTOGRAM_STEP_LU)
+                idx = min(idx, len(self.histogram_counts) - 1)
+                self.histogram_counts[idx] += 1
+                self.histogram_energy[idx] += block
+
+    def recent_mean_square(self, n_subblocks):
+        """Energía media de los últimos n sub-bloques."""
+        idx = (self.subblocks_index - np.arange(1, n_subblocks + 1)) % self.SHORT_TERM_SUBBLOCKS
+        return float(np.sum(self.subblocks[idx])) / (n_subblocks * self.subblock_samples)
+
+    def integrated(self):
+        """
+        Sonoridad integrada con compuerta absoluta y relativa.
+
+        :return: LUFS integrados, o None si ningún bloque supera la compuerta
+        """
+        total_blocks = self.histogram_counts.sum()
+        if total_blocks == 0:
+            return None
+
+        ungated = self.to_lufs(self.histogram_energy.sum() / total_blocks)
+        gate = ungated + self.RELATIVE_GATE_LU
+        selected = self.bin_centers > gate
+        blocks = self.histogram_counts[selected].sum()
+        if blocks == 0:
+            return None
+        return self.to_lufs(self.histogram_energy[selected].sum() / blocks)
+
+    def values(self):
+        """Valores actuales de sonoridad en LUFS."""
+        momentary = None
+        short_term = None
+        if self.subblocks_filled >= self.MOMENTARY_SUBBLOCKS:
+            momentary = self.to_lufs(self.recent_mean_square(self.MOMENTARY_SUBBLOCKS))
+        if self.subblocks_filled >= self.SHORT_TERM_SUBBLOCKS:
+            short_term = self.to_lufs(self.recent_mean_square(self.SHORT_TERM_SUBBLOCKS))
+        return {
+            "momentary": momentary,
+            "short_term": short_term,
+            "integrated": self.integrated(),
+        }
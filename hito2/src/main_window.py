@@ -1,9 +1,12 @@
 import json
+import os
+import signal
 import sys
+import time
 from datetime import datetime
 
 import sounddevice as sd
-from PyQt6.QtCore import Qt, QThread, pyqtSlot
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, pyqtSlot
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
     QComboBox,
@@ -15,13 +18,34 @@ from PyQt6.QtWidgets import (
     QMainWindow,
     QMessageBox,
     QPushButton,
+    QSlider,
     QVBoxLayout,
     QWidget,
 )
+from src.async_stream import AsyncMeasurementStream
+from src.audio_archive import AudioArchiver
 from src.audio_worker import AudioWorker
+from src.background import BackgroundNoiseMeter
+from src.collector import DEFAULT_PORT as COLLECTOR_PORT
+from src.collector import CollectorClient
+from src.compliance import DS38_LIMITS, ComplianceEvaluator, zone_limits
+from src.dsp_process import ProcessAudioWorker
+from src.events import ExceedanceEventRecorder
+from src.exposure import DEFAULT_SHIFTS, ExposureDoseMeter
+from src.measurement_bus import DEFAULT_GROUP, DEFAULT_PORT, MeasurementPublisher
+from src.measurement_store import MeasurementStore
+from src.profiling import format_stage_timings
+from src.replay import REPLAY_SPEEDS, create_replay_worker
+from src.rollups import RollupEngine
+from src.session_report import local_datetime
+from src.spectrogram import SpectrogramWidget
 
 
 class MainWindow(QMainWindow):
+    # Pedido de captura de perfil al worker (modo, duración, ruta base); la
+    # conexión encolada hace que la captura corra en el hilo del worker
+    profile_requested = pyqtSignal(str, float, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Monitor de Ruido Acústico")
@@ -34,11 +58,49 @@ class MainWindow(QMainWindow):
         # Variables para gestión del thread
         self.thread = None
         self.worker = None
+        # True mientras el worker reproduce una sesión grabada en vez de medir
+        self.replaying = False
 
         # Variables para logging
         self.log_file_path = ""
-        self.log_data = []
+        self.measurement_store = None
         self.current_local_type = None
+        # Tiempo (reloj de muestras) del tick en curso, informado por el worker
+        self.tick_timestamp = None
+
+        # Publicadores de mediciones: bus local (pantallas, alertas) y colector central
+        self.publishers = []
+        self.setup_measurement_bus()
+        self.setup_collector_client()
+
+        # Mediciones para servicios asyncio del mismo proceso (alertas, subidas);
+        # sin suscriptores no hace nada
+        self.async_stream = AsyncMeasurementStream()
+        self.publishers.append(self.async_stream)
+
+        # Agregados por minuto/hora/día alimentados por el flujo de mediciones
+        self.rollup_engine = None
+        self.setup_rollup_engine()
+
+        # Evaluación D.S. 38 en tiempo real según zona y horario
+        self.compliance_evaluator = None
+        self.setup_compliance_evaluator()
+
+        # Dosis de exposición del personal por turno (LEX,8h)
+        self.exposure_meter = None
+        self.setup_exposure_meter()
+
+        # Ruido de fondo (fuente apagada) y corrección de los niveles
+        self.background_meter = None
+        self.setup_background_meter()
+
+        # Detección de excedencias con captura de audio
+        self.event_recorder = None
+        self.setup_event_recorder()
+
+        # Archivo continuo del audio crudo (opcional)
+        self.audio_archiver = None
+        self.setup_audio_archiver()
 
         # Aplicar estilo global moderno
         self.setStyleSheet("""
@@ -67,6 +129,9 @@ class MainWindow(QMainWindow):
         # Crear selector de destino de registro histórico
         self.create_log_path_selector()
 
+        # Crear controles de reproducción de sesiones grabadas
+        self.create_replay_panel()
+
         # Layout horizontal para display y clasificación
         self.display_layout = QHBoxLayout()
         self.display_layout.setSpacing(15)
@@ -78,9 +143,16 @@ class MainWindow(QMainWindow):
         # Crear panel de clasificación
         self.create_classification_panel()
 
+        # Crear panel de espectrograma (opcional)
+        self.spectrogram_widget = None
+        self.create_spectrogram_panel()
+
         # Inicializar el hilo de audio
         self.setup_audio_thread()
 
+        # Captura de perfil del worker con 'kill -USR1 <pid>'
+        self.setup_profile_signal()
+
     def load_config(self):
         """Carga el archivo JSON de configuración."""
         try:
@@ -105,6 +177,221 @@ class MainWindow(QMainWindow):
             print(f"Advertencia: No se pudo cargar 'tipos_locales.json': {e}")
             self.tipos_locales = {"tipos_locales": [], "clasificaciones": {}}
 
+    def setup_measurement_bus(self):
+        """
+        Crea el publicador del bus de mediciones si está habilitado en
+        'config_zonas.json', por ejemplo:
+
+            "bus_mediciones": {"habilitado": true, "grupo": "239.255.42.99", "puerto": 50420}
+        """
+        bus_config = self.config.get("bus_mediciones", {})
+        if not bus_config.get("habilitado", False):
+            return
+
+        try:
+            publisher = MeasurementPublisher(
+                group=bus_config.get("grupo", DEFAULT_GROUP),
+                port=int(bus_config.get("puerto", DEFAULT_PORT)),
+            )
+            self.publishers.append(publisher)
+            print(
+                f"Bus de mediciones activo en {publisher.address[0]}:{publisher.address[1]}"
+            )
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar el bus de mediciones: {e}")
+
+    def setup_collector_client(self):
+        """
+        Crea el cliente del colector central si está habilitado en
+        'config_zonas.json', por ejemplo:
+
+            "colector": {"habilitado": true, "host": "10.0.0.5", "puerto": 50421,
+                         "medidor": "medidor-01", "local": "Bar Centro"}
+        """
+        collector_config = self.config.get("colector", {})
+        if not collector_config.get("habilitado", False):
+            return
+
+        try:
+            client = CollectorClient(
+                host=collector_config["host"],
+                port=int(collector_config.get("puerto", COLLECTOR_PORT)),
+                meter_id=collector_config.get("medidor"),
+                venue=collector_config.get("local", ""),
+            )
+            self.publishers.append(client)
+            print(f"Enviando mediciones al colector {client.address[0]}:{client.address[1]}")
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar el cliente del colector: {e}")
+
+    def setup_rollup_engine(self):
+        """
+        Crea la etapa de agregados si está habilitada en 'config_zonas.json':
+
+            "agregados": {"habilitado": true, "archivo": "rollups.jsonl"}
+        """
+        rollup_config = self.config.get("agregados", {})
+        if not rollup_config.get("habilitado", False):
+            return
+
+        try:
+            self.rollup_engine = RollupEngine(
+                rollup_config.get("archivo", "rollups.jsonl"),
+                sample_seconds=AudioWorker.UPDATE_INTERVAL_MS / 1000.0,
+            )
+            self.publishers.append(self.rollup_engine)
+            print(f"Agregados por intervalo en '{self.rollup_engine.output_path}'")
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar la etapa de agregados: {e}")
+            self.rollup_engine = None
+
+    def get_zone_names(self):
+        """Zonas disponibles: las del D.S. 38 más las definidas en 'zonas_ds38'."""
+        zones = list(DS38_LIMITS)
+        for zone in self.config.get("zonas_ds38", {}) or {}:
+            if zone not in zones:
+                zones.append(zone)
+        return zones
+
+    def setup_compliance_evaluator(self):
+        """Crea el evaluador D.S. 38 con la zona configurada ('zona', por defecto II)."""
+        zone = self.config.get("zona", "II")
+        try:
+            self.compliance_evaluator = ComplianceEvaluator(
+                zone_limits(self.config, zone),
+                self.config.get("horarios"),
+                zone,
+                sample_seconds=AudioWorker.UPDATE_INTERVAL_MS / 1000.0,
+            )
+            self.publishers.append(self.compliance_evaluator)
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar la evaluación D.S. 38: {e}")
+            self.compliance_evaluator = None
+
+    def setup_exposure_meter(self):
+        """
+        Crea el acumulador de exposición del personal si está habilitado en
+        'config_zonas.json', por ejemplo:
+
+            "exposicion": {"habilitado": true, "archivo": "exposicion.jsonl",
+                           "turnos": [{"nombre": "noche", "inicio": "21:00", "fin": "05:00"}],
+                           "criterios": ["ds594", "osha"]}
+
+        Los criterios pueden ser "ds594", "niosh", "osha" o dicts con "nombre",
+        "nivel_db", "tasa_db" y "umbral_db".
+        """
+        exposure_config = self.config.get("exposicion", {})
+        if not exposure_config.get("habilitado", False):
+            return
+
+        try:
+            self.exposure_meter = ExposureDoseMeter(
+                exposure_config.get("archivo", "exposicion.jsonl"),
+                shifts=exposure_config.get("turnos", DEFAULT_SHIFTS),
+                criteria=exposure_config.get("criterios", ["ds594"]),
+                sample_seconds=AudioWorker.UPDATE_INTERVAL_MS / 1000.0,
+            )
+            self.publishers.append(self.exposure_meter)
+            print(f"Exposición del personal en '{self.exposure_meter.output_path}'")
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar la dosis de exposición: {e}")
+            self.exposure_meter = None
+
+    def setup_background_meter(self):
+        """
+        Crea la medición de ruido de fondo. Se configura en 'config_zonas.json':
+
+            "fondo": {"archivo": "fondo.json", "indicador": "leq", "duracion_s": 300}
+
+        'indicador' ("leq" o "l90") es el nivel de fondo usado para corregir.
+        """
+        background_config = self.config.get("fondo", {})
+        try:
+            self.background_meter = BackgroundNoiseMeter(
+                background_config.get("archivo", "fondo.json"),
+                indicator=background_config.get("indicador", "leq"),
+                sample_seconds=AudioWorker.UPDATE_INTERVAL_MS / 1000.0,
+            )
+            self.publishers.append(self.background_meter)
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar la medición de fondo: {e}")
+            self.background_meter = None
+        # La evaluación D.S. 38 corrige con el fondo vigente
+        if self.compliance_evaluator:
+            self.compliance_evaluator.background = self.background_meter
+
+    def setup_event_recorder(self):
+        """
+        Crea el detector de excedencias si está habilitado en 'config_zonas.json':
+
+            "eventos": {"habilitado": true, "directorio": "eventos", "criterio": "nivel_max",
+                        "pre_s": 10, "post_s": 5, "duracion_min_s": 2, "histeresis_db": 2}
+
+        'criterio' puede ser "nivel_max" (clasificación base del local) o "limite_d".
+        """
+        events_config = self.config.get("eventos", {})
+        if not events_config.get("habilitado", False):
+            return
+
+        try:
+            self.event_recorder = ExceedanceEventRecorder(
+                events_config.get("directorio", "eventos"),
+                AudioWorker.SAMPLE_RATE,
+                hysteresis_db=float(events_config.get("histeresis_db", 2.0)),
+                min_duration_s=float(events_config.get("duracion_min_s", 2.0)),
+                pre_trigger_s=float(events_config.get("pre_s", 10.0)),
+                post_trigger_s=float(events_config.get("post_s", 5.0)),
+            )
+            self.publishers.append(self.event_recorder)
+            print(f"Eventos de excedencia en '{self.event_recorder.output_dir}'")
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar el detector de eventos: {e}")
+            self.event_recorder = None
+
+    def setup_audio_archiver(self):
+        """
+        Crea el archivo continuo de audio si está habilitado en 'config_zonas.json':
+
+            "archivo_audio": {"habilitado": true, "directorio": "archivo_audio", "formato": "FLAC"}
+        """
+        archive_config = self.config.get("archivo_audio", {})
+        if not archive_config.get("habilitado", False):
+            return
+
+        try:
+            self.audio_archiver = AudioArchiver(
+                archive_config.get("directorio", "archivo_audio"),
+                AudioWorker.SAMPLE_RATE,
+                archive_config.get("formato", "FLAC"),
+            )
+            self.publishers.append(self.audio_archiver)
+            print(f"Archivando audio en '{self.audio_archiver.output_dir}'")
+        except Exception as e:
+            print(f"Advertencia: No se pudo iniciar el archivo de audio: {e}")
+            self.audio_archiver = None
+
+    def get_local_type_limit(self, criterio="nivel_max"):
+        """
+        Límite (dBA) del tipo de local actual.
+
+        :param criterio: "nivel_max" (clasificación base) o "limite_d"
+        """
+        if not self.current_local_type:
+            return None
+        if criterio == "limite_d":
+            return self.current_local_type.get("limite_d")
+        clasificacion_base = self.current_local_type.get("clasificacion_base", "C")
+        clasificaciones = self.tipos_locales.get("clasificaciones", {})
+        return clasificaciones.get(clasificacion_base, {}).get("nivel_max")
+
+    def apply_local_type_limits(self):
+        """Propaga el límite del tipo de local actual a las etapas que lo usan."""
+        if self.rollup_engine:
+            self.rollup_engine.set_threshold(self.get_local_type_limit())
+        if self.event_recorder:
+            criterio = self.config.get("eventos", {}).get("criterio", "nivel_max")
+            self.event_recorder.set_threshold(self.get_local_type_limit(criterio))
+
     def create_device_selector(self):
         """Crea el selector de dispositivos de audio."""
         # Grupo contenedor con estilo moderno
@@ -230,6 +517,30 @@ class MainWindow(QMainWindow):
         apply_button.clicked.connect(self.change_audio_device)
         device_layout.addWidget(apply_button)
 
+        # Botón para capturar un perfil del worker sin detener la medición
+        # (el tooltip muestra los tiempos por etapa del procesamiento)
+        self.profile_button = QPushButton("Perfilar")
+        self.profile_button.setStyleSheet("""
+            QPushButton {
+                padding: 8px 16px;
+                border: 1px solid #ddd;
+                border-radius: 5px;
+                background-color: white;
+                font-size: 13px;
+                font-weight: 500;
+                color: #555;
+            }
+            QPushButton:hover {
+                background-color: #f8f8f8;
+                border: 1px solid #bbb;
+            }
+            QPushButton:disabled {
+                color: #aaa;
+            }
+        """)
+        self.profile_button.clicked.connect(self.start_profile)
+        device_layout.addWidget(self.profile_button)
+
         device_group.setLayout(device_layout)
         self.main_layout.addWidget(device_group)
 
@@ -320,6 +631,43 @@ class MainWindow(QMainWindow):
 
         local_layout.addWidget(self.local_type_combo, 1)
 
+        # Selector de zona D.S. 38
+        zone_label = QLabel("Zona D.S. 38:")
+        zone_label.setStyleSheet(local_label.styleSheet())
+        local_layout.addWidget(zone_label)
+
+        self.zone_combo = QComboBox()
+        self.zone_combo.setStyleSheet(self.local_type_combo.styleSheet())
+        for zone in self.get_zone_names():
+            self.zone_combo.addItem(f"Zona {zone}", zone)
+        if self.compliance_evaluator:
+            self.zone_combo.setCurrentIndex(
+                max(self.zone_combo.findData(self.compliance_evaluator.zone), 0)
+            )
+        self.zone_combo.currentIndexChanged.connect(self.on_zone_changed)
+        local_layout.addWidget(self.zone_combo)
+
+        # Medición del ruido de fondo (con la fuente apagada)
+        self.background_button = QPushButton("Medir Fondo")
+        self.background_button.setStyleSheet("""
+            QPushButton {
+                padding: 8px 16px;
+                border: 1px solid #ddd;
+                border-radius: 5px;
+                background-color: white;
+                font-size: 13px;
+                font-weight: 500;
+                color: #555;
+            }
+            QPushButton:hover {
+                background-color: #f8f8f8;
+                border: 1px solid #bbb;
+            }
+        """)
+        self.background_button.setEnabled(self.background_meter is not None)
+        self.background_button.clicked.connect(self.toggle_background_capture)
+        local_layout.addWidget(self.background_button)
+
         local_group.setLayout(local_layout)
         self.main_layout.addWidget(local_group)
 
@@ -327,6 +675,7 @@ class MainWindow(QMainWindow):
         if self.local_type_combo.count() > 0:
             self.current_local_type = self.local_type_combo.itemData(0)
             print(f"Tipo de local inicial: {self.current_local_type['nombre']}")
+            self.apply_local_type_limits()
 
     def create_log_path_selector(self):
         """Crea el selector de ruta para el log."""
@@ -411,6 +760,101 @@ class MainWindow(QMainWindow):
         log_group.setLayout(log_layout)
         self.main_layout.addWidget(log_group)
 
+    def create_replay_panel(self):
+        """Crea los controles para reproducir un log o un archivo de audio grabado."""
+        replay_group = QGroupBox("Reproducción de Sesión")
+        replay_group.setStyleSheet("""
+            QGroupBox {
+                background-color: white;
+                border: 1px solid #ddd;
+                border-radius: 8px;
+                margin-top: 12px;
+                padding: 20px 15px 15px 15px;
+                font-size: 14px;
+                font-weight: 600;
+                color: #333;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                subcontrol-position: top left;
+                left: 15px;
+                top: 8px;
+                padding: 0 5px;
+                background-color: white;
+            }
+        """)
+
+        replay_layout = QHBoxLayout()
+        replay_layout.setSpacing(12)
+
+        # Botón para abrir un log (CSV/SQLite) o un archivo de audio
+        open_button = QPushButton("Abrir...")
+        open_button.setStyleSheet("""
+            QPushButton {
+                padding: 8px 16px;
+                border: 1px solid #ddd;
+                border-radius: 5px;
+                background-color: white;
+                font-size: 13px;
+                font-weight: 500;
+                color: #555;
+            }
+            QPushButton:hover {
+                background-color: #f8f8f8;
+                border: 1px solid #bbb;
+            }
+        """)
+        open_button.clicked.connect(self.start_replay)
+        replay_layout.addWidget(open_button)
+
+        # Velocidad de reproducción
+        self.replay_speed_combo = QComboBox()
+        for speed in REPLAY_SPEEDS:
+            self.replay_speed_combo.addItem(f"{speed}x", speed)
+        self.replay_speed_combo.currentIndexChanged.connect(self.on_replay_speed_changed)
+        replay_layout.addWidget(self.replay_speed_combo)
+
+        # Posición dentro de la sesión (se busca al soltar el control)
+        self.replay_slider = QSlider(Qt.Orientation.Horizontal)
+        self.replay_slider.setRange(0, 1000)
+        self.replay_slider.setEnabled(False)
+        self.replay_slider.sliderReleased.connect(self.on_replay_slider_released)
+        replay_layout.addWidget(self.replay_slider, 1)
+
+        self.replay_position_label = QLabel("En vivo")
+        self.replay_position_label.setStyleSheet("""
+            font-size: 13px;
+            font-weight: normal;
+            color: #555;
+        """)
+        replay_layout.addWidget(self.replay_position_label)
+
+        # Botón para volver a la medición en vivo
+        self.live_button = QPushButton("En vivo")
+        self.live_button.setStyleSheet("""
+            QPushButton {
+                padding: 8px 20px;
+                border: none;
+                border-radius: 5px;
+                background-color: #4A90E2;
+                color: white;
+                font-size: 13px;
+                font-weight: 600;
+            }
+            QPushButton:hover {
+                background-color: #357ABD;
+            }
+            QPushButton:disabled {
+                background-color: #B0C4DE;
+            }
+        """)
+        self.live_button.setEnabled(False)
+        self.live_button.clicked.connect(self.stop_replay)
+        replay_layout.addWidget(self.live_button)
+
+        replay_group.setLayout(replay_layout)
+        self.main_layout.addWidget(replay_group)
+
     def create_dba_display(self):
         """Crea la tarjeta del medidor de dBA."""
         # Grupo contenedor con estilo de tarjeta moderna
@@ -458,6 +902,46 @@ class MainWindow(QMainWindow):
 
         dba_layout.addWidget(self.dba_label)
 
+        # Leq A, C y Z del tick (LCeq - LAeq indica predominio de bajas frecuencias)
+        self.weighted_label = QLabel("")
+        self.weighted_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.weighted_label.setStyleSheet("""
+            font-size: 18px;
+            font-weight: 400;
+            color: #666;
+        """)
+        dba_layout.addWidget(self.weighted_label)
+
+        # Métricas de pico y máximos del intervalo
+        self.peak_label = QLabel("")
+        self.peak_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.peak_label.setStyleSheet("""
+            font-size: 18px;
+            font-weight: 400;
+            color: #666;
+        """)
+        dba_layout.addWidget(self.peak_label)
+
+        # Sonoridad BS.1770 en LUFS
+        self.loudness_label = QLabel("")
+        self.loudness_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.loudness_label.setStyleSheet("""
+            font-size: 18px;
+            font-weight: 400;
+            color: #666;
+        """)
+        dba_layout.addWidget(self.loudness_label)
+
+        # Estado de la señal de entrada (recorte, DC, ceros, señal congelada)
+        self.input_health_label = QLabel("")
+        self.input_health_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.input_health_label.setStyleSheet("""
+            font-size: 16px;
+            font-weight: 400;
+            color: #666;
+        """)
+        dba_layout.addWidget(self.input_health_label)
+
         # Agregar stretch abajo para centrar
         dba_layout.addStretch(1)
 
@@ -522,6 +1006,39 @@ class MainWindow(QMainWindow):
         self.classification_desc_label.setWordWrap(True)
         classification_layout.addWidget(self.classification_desc_label)
 
+        # Label con el estado de cumplimiento D.S. 38 del período en curso
+        self.compliance_label = QLabel("")
+        self.compliance_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.compliance_label.setStyleSheet("""
+            font-size: 18px;
+            font-weight: 500;
+            color: #666;
+        """)
+        self.compliance_label.setWordWrap(True)
+        classification_layout.addWidget(self.compliance_label)
+
+        # Label con la exposición del personal en el turno en curso
+        self.exposure_label = QLabel("")
+        self.exposure_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.exposure_label.setStyleSheet("""
+            font-size: 16px;
+            font-weight: 400;
+            color: #666;
+        """)
+        self.exposure_label.setWordWrap(True)
+        classification_layout.addWidget(self.exposure_label)
+
+        # Label con el ruido de fondo y los niveles corregidos
+        self.background_label = QLabel("")
+        self.background_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.background_label.setStyleSheet("""
+            font-size: 16px;
+            font-weight: 400;
+            color: #666;
+        """)
+        self.background_label.setWordWrap(True)
+        classification_layout.addWidget(self.background_label)
+
         # Agregar stretch abajo para centrar verticalmente
         classification_layout.addStretch(1)
 
@@ -531,11 +1048,69 @@ class MainWindow(QMainWindow):
         self.classification_group.setLayout(classification_layout)
         self.display_layout.addWidget(self.classification_group, 2)
 
+    def create_spectrogram_panel(self):
+        """
+        Crea el panel de espectrograma. Se configura en 'config_zonas.json':
+
+            "espectrograma": {"habilitado": true, "tamano_frame": 4096, "workers": 1}
+        """
+        spectrogram_config = self.config.get("espectrograma", {})
+        if not spectrogram_config.get("habilitado", True):
+            return
+
+        frame_size = int(spectrogram_config.get("tamano_frame", 4096))
+        spectrogram_group = QGroupBox("Espectrograma")
+        spectrogram_group.setStyleSheet(self.classification_group.styleSheet())
+        spectrogram_layout = QVBoxLayout()
+        spectrogram_layout.setContentsMargins(10, 30, 10, 10)
+
+        self.spectrogram_widget = SpectrogramWidget(
+            frame_size // 2 + 1, AudioWorker.SAMPLE_RATE / 2.0
+        )
+        self.spectrogram_widget.setMinimumHeight(200)
+        spectrogram_layout.addWidget(self.spectrogram_widget)
+
+        spectrogram_group.setLayout(spectrogram_layout)
+        self.main_layout.addWidget(spectrogram_group)
+
+    @pyqtSlot(object)
+    def update_spectrogram(self, frames):
+        """Agrega los frames nuevos del espectrograma."""
+        if self.spectrogram_widget:
+            self.spectrogram_widget.add_frames(frames)
+
     def on_local_type_changed(self, index):
         """Maneja el cambio de tipo de local."""
         if index >= 0:
             self.current_local_type = self.local_type_combo.itemData(index)
             print(f"Tipo de local seleccionado: {self.current_local_type['nombre']}")
+            self.apply_local_type_limits()
+
+    def toggle_background_capture(self):
+        """Inicia (o cancela) la medición del ruido de fondo."""
+        if self.replaying:
+            self.show_error_message("El fondo se mide con el micrófono, no durante una reproducción.")
+            return
+        if self.background_meter.capture is not None:
+            self.background_meter.cancel_capture()
+            self.background_button.setText("Medir Fondo")
+            return
+        self.background_meter.start_capture(
+            float(self.config.get("fondo", {}).get("duracion_s", 300))
+        )
+        self.background_button.setText("Cancelar Fondo")
+        self.background_label.setText("Midiendo ruido de fondo con la fuente apagada...")
+
+    def on_zone_changed(self, index):
+        """Maneja el cambio de zona D.S. 38."""
+        zone = self.zone_combo.itemData(index)
+        if zone is None or not self.compliance_evaluator:
+            return
+        try:
+            self.compliance_evaluator.set_zone(zone, zone_limits(self.config, zone))
+            print(f"Zona D.S. 38 seleccionada: {zone}")
+        except KeyError as e:
+            print(f"Error al cambiar de zona: {e}")
 
     def select_log_path(self):
         """Abre un diálogo para seleccionar la ruta del archivo de log."""
@@ -546,7 +1121,7 @@ class MainWindow(QMainWindow):
             self,
             "Seleccionar ubicación del registro histórico",
             default_filename,
-            "CSV Files (*.csv);;All Files (*)",
+            "CSV Files (*.csv);;SQLite (*.db *.sqlite);;All Files (*)",
         )
 
         if file_path:
@@ -557,7 +1132,20 @@ class MainWindow(QMainWindow):
             self.initialize_log_file()
 
     def initialize_log_file(self):
-        """Inicializa el archivo de log con encabezados."""
+        """Inicializa el archivo de log con encabezados (o la base SQLite)."""
+        if self.measurement_store:
+            self.measurement_store.close()
+            self.measurement_store = None
+
+        if self.log_file_path.lower().endswith((".db", ".sqlite")):
+            try:
+                self.measurement_store = MeasurementStore(self.log_file_path)
+                print("Base de datos SQLite inicializada correctamente")
+            except Exception as e:
+                print(f"Error al inicializar la base SQLite: {e}")
+                self.show_error_message(f"No se pudo abrir la base de datos: {e}")
+            return
+
         try:
             with open(self.log_file_path, "w", encoding="utf-8") as f:
                 f.write("timestamp,nivel_dba,clasificacion,tipo_local\n")
@@ -627,17 +1215,9 @@ class MainWindow(QMainWindow):
 
         print(f"Cambiando a dispositivo ID: {device_id}")
 
-        # Detener el worker actual
-        if self.worker:
-            self.worker.stop()
-
-        # Esperar a que el thread termine
-        if self.thread and self.thread.isRunning():
-            self.thread.quit()
-            if not self.thread.wait(2000):
-                print("Advertencia: El hilo no se detuvo a tiempo")
-                self.thread.terminate()
-                self.thread.wait()
+        # Detener el worker actual (en vivo o reproducción)
+        self.stop_worker_thread()
+        self.set_replay_mode(False)
 
         # Actualizar la etiqueta
         self.dba_label.setText("Cambiando micrófono...")
@@ -650,19 +1230,161 @@ class MainWindow(QMainWindow):
         # Crear nuevo worker con el dispositivo seleccionado
         self.setup_audio_thread(device_id=device_id)
 
+    def stop_worker_thread(self):
+        """Detiene el worker actual y espera a que su hilo termine."""
+        try:
+            self.profile_requested.disconnect()
+        except TypeError:
+            pass  # El worker actual no acepta capturas de perfil (reproducción)
+
+        if self.worker:
+            self.worker.stop()
+
+        if self.thread and self.thread.isRunning():
+            self.thread.quit()
+            if not self.thread.wait(2000):
+                print("Advertencia: El hilo no se detuvo a tiempo")
+                self.thread.terminate()
+                self.thread.wait()
+
+    def start_replay(self):
+        """Reemplaza la medición en vivo por la reproducción de una sesión grabada."""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Abrir sesión grabada",
+            "",
+            "Sesiones (*.csv *.db *.sqlite *.wav *.flac);;Todos los archivos (*)",
+        )
+        if not file_path:
+            return
+
+        print(f"Reproduciendo sesión: {file_path}")
+        self.stop_worker_thread()
+        self.set_replay_mode(True)
+
+        try:
+            self.thread = QThread()
+            self.worker = create_replay_worker(file_path)
+            self.worker.set_speed(self.replay_speed_combo.currentData())
+            self.worker.moveToThread(self.thread)
+
+            self.thread.started.connect(self.worker.run)
+            self.worker.new_measurement_dba.connect(self.update_dba_label)
+            self.worker.new_replay_position.connect(self.update_replay_position)
+            self.worker.error_signal.connect(self.show_audio_error)
+            # Los archivos de audio pasan por la cadena de medición completa
+            if hasattr(self.worker, "new_peak_metrics"):
+                self.worker.new_weighted_levels.connect(self.update_weighted_label)
+                self.worker.new_peak_metrics.connect(self.update_peak_label)
+                self.worker.new_loudness.connect(self.update_loudness_label)
+                self.worker.new_input_health.connect(self.update_input_health_label)
+
+            self.worker.finished.connect(self.thread.quit)
+            self.worker.finished.connect(self.worker.deleteLater)
+            self.thread.finished.connect(self.thread.deleteLater)
+
+            self.thread.start()
+        except Exception as e:
+            error_msg = f"Error al iniciar la reproducción: {e}"
+            print(error_msg)
+            self.show_error_message(error_msg)
+
+    def stop_replay(self):
+        """Termina la reproducción y vuelve a medir con el micrófono seleccionado."""
+        if not self.replaying:
+            return
+        print("Volviendo a la medición en vivo...")
+        self.stop_worker_thread()
+        self.set_replay_mode(False)
+        self.setup_audio_thread(device_id=self.device_combo.currentData())
+
+    def set_replay_mode(self, replaying):
+        """Habilita los controles de reproducción y suspende el registro mientras dura."""
+        self.replaying = replaying
+        self.replay_slider.setEnabled(replaying)
+        self.profile_button.setEnabled(not replaying)
+        self.live_button.setEnabled(replaying)
+        if not replaying:
+            self.replay_slider.setValue(0)
+            self.replay_position_label.setText("En vivo")
+
+    def on_replay_speed_changed(self, index):
+        """Aplica la velocidad elegida a la reproducción en curso."""
+        if self.replaying and self.worker:
+            self.worker.set_speed(self.replay_speed_combo.itemData(index))
+
+    def on_replay_slider_released(self):
+        """Busca la posición elegida en la sesión (vía el índice del worker)."""
+        if not self.replaying or not self.worker:
+            return
+        fraction = self.replay_slider.value() / self.replay_slider.maximum()
+        self.worker.seek(self.worker.start + fraction * (self.worker.end - self.worker.start))
+
+    @pyqtSlot(dict)
+    def update_replay_position(self, status):
+        """Muestra la posición de la reproducción."""
+        span = status["fin"] - status["inicio"]
+        elapsed = status["posicion"] - status["inicio"]
+        if span > 0 and not self.replay_slider.isSliderDown():
+            self.replay_slider.setValue(
+                int(round(elapsed / span * self.replay_slider.maximum()))
+            )
+
+        if status["inicio"] > 0:
+            text = local_datetime(status["posicion"]).strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            # Audio sin hora de inicio conocida: tiempo transcurrido
+            text = str(local_datetime(elapsed).time().replace(microsecond=0))
+        if status["terminado"]:
+            text += " (fin)"
+        self.replay_position_label.setText(text)
+
     def setup_audio_thread(self, device_id=None):
         """Crea el AudioWorker y lo mueve a un QThread."""
         try:
             # Crear el hilo
             self.thread = QThread()
 
-            # Crear el worker
-            self.worker = AudioWorker()
+            # Crear el worker (captura y DSP en otro proceso si está habilitado:
+            # "proceso_dsp": {"habilitado": true} en 'config_zonas.json')
+            if self.config.get("proceso_dsp", {}).get("habilitado", False):
+                self.worker = ProcessAudioWorker()
+            else:
+                self.worker = AudioWorker()
 
             # Establecer el dispositivo si se especificó
             if device_id is not None:
                 self.worker.set_device(device_id)
 
+            # Perfil del stream: "fijo", "adaptativo" o "impulso", por ejemplo
+            # "latencia": {"modo": "adaptativo", "bloque_min": 512, "bloque_max": 8192}
+            latency_config = self.config.get("latencia", {})
+            self.worker.set_latency_mode(
+                latency_config.get("modo", "fijo"),
+                int(latency_config.get("bloque_min", 256)),
+                int(latency_config.get("bloque_max", 8192)),
+            )
+
+            # Implementación de la ponderación A: "auto", "numba" o "numpy",
+            # por ejemplo "dsp": {"backend": "numpy"}
+            self.worker.set_dsp_backend(self.config.get("dsp", {}).get("backend", "auto"))
+
+            # Compartir los publicadores entre workers sucesivos
+            for publisher in self.publishers:
+                self.worker.add_publisher(publisher)
+            if self.event_recorder:
+                self.worker.add_audio_tap(self.event_recorder)
+            if self.audio_archiver:
+                self.worker.add_audio_tap(self.audio_archiver)
+
+            # Activar el espectrograma si el panel existe
+            if self.spectrogram_widget:
+                spectrogram_config = self.config.get("espectrograma", {})
+                self.worker.enable_spectrogram(
+                    int(spectrogram_config.get("tamano_frame", 4096)),
+                    int(spectrogram_config.get("workers", 1)),
+                )
+
             # Mover el worker al hilo
             self.worker.moveToThread(self.thread)
 
@@ -672,6 +1394,15 @@ class MainWindow(QMainWindow):
 
             # Cuando el worker emita señales, actualizar UI
             self.worker.new_measurement_dba.connect(self.update_dba_label)
+            self.worker.new_weighted_levels.connect(self.update_weighted_label)
+            self.worker.new_peak_metrics.connect(self.update_peak_label)
+            self.worker.new_loudness.connect(self.update_loudness_label)
+            self.worker.new_input_health.connect(self.update_input_health_label)
+            self.worker.new_spectrum_frames.connect(self.update_spectrogram)
+            self.worker.new_timeline_status.connect(self.update_timeline_status)
+            self.worker.new_stage_timings.connect(self.update_stage_timings)
+            self.worker.profile_finished.connect(self.on_profile_finished)
+            self.profile_requested.connect(self.worker.start_profile)
             self.worker.error_signal.connect(self.show_audio_error)
 
             # Limpieza automática cuando termine
@@ -694,6 +1425,54 @@ class MainWindow(QMainWindow):
                 padding: 20px;
             """)
 
+    def setup_profile_signal(self):
+        """
+        Permite pedir una captura de perfil sin acceso a la interfaz, con
+        'kill -USR1 <pid>' (solo POSIX). Python atiende la señal en el hilo
+        principal la próxima vez que corre código Python (a lo sumo un tick).
+        """
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.start_profile())
+
+    def start_profile(self):
+        """
+        Pide al worker una captura de perfil de su hilo (ver ThreadProfiler).
+        Se configura en 'config_zonas.json', por ejemplo:
+
+            "perfilado": {"modo": "muestreo", "duracion_s": 30, "directorio": "perfiles"}
+
+        'modo' es "muestreo" (bajo costo, para producción) o "cprofile".
+        """
+        if self.replaying or not self.profile_button.isEnabled():
+            print("Advertencia: No se puede perfilar ahora (reproducción o captura en curso)")
+            return
+
+        profile_config = self.config.get("perfilado", {})
+        base_path = os.path.join(
+            profile_config.get("directorio", "perfiles"),
+            datetime.now().strftime("perfil_%Y%m%d_%H%M%S"),
+        )
+        self.profile_button.setEnabled(False)
+        self.profile_button.setText("Perfilando...")
+        self.profile_requested.emit(
+            profile_config.get("modo", "muestreo"),
+            float(profile_config.get("duracion_s", 30)),
+            base_path,
+        )
+
+    @pyqtSlot(str)
+    def on_profile_finished(self, path):
+        """Habilita de nuevo la captura de perfil al terminar la anterior."""
+        self.profile_button.setText("Perfilar")
+        self.profile_button.setEnabled(not self.replaying)
+        if not path:
+            self.show_error_message("No se pudo capturar el perfil del worker (ver consola).")
+
+    @pyqtSlot(dict)
+    def update_stage_timings(self, timings):
+        """Muestra los percentiles por etapa del procesamiento en el tooltip de 'Perfilar'."""
+        self.profile_button.setToolTip(f"<pre>{format_stage_timings(timings)}</pre>")
+
     def get_classification(self, dba_value):
         """Determina la clasificación según el nivel dBA y el tipo de local."""
         if not self.current_local_type:
@@ -751,10 +1530,158 @@ class MainWindow(QMainWindow):
         if clasificacion:
             self.update_classification_display(clasificacion, descripcion)
 
-            # Registrar en log si está configurado
-            if self.log_file_path:
+            # Registrar en log si está configurado (no durante una reproducción)
+            if self.log_file_path and not self.replaying:
                 self.log_measurement(dba_value, clasificacion)
 
+        self.update_compliance_display()
+        self.update_exposure_display()
+        self.update_background_display()
+
+    def update_compliance_display(self):
+        """Muestra el Leq del período en curso frente al límite de la zona."""
+        if not self.compliance_evaluator or not self.compliance_evaluator.status:
+            return
+
+        status = self.compliance_evaluator.status
+        color = "#F44336" if status["excede"] else "#4CAF50"
+        estado = "EXCEDE" if status["excede"] else "Cumple"
+        leq = f"Leq {status['leq']:.1f}"
+        if status["fondo"] is not None:
+            if status["leq_corregido"] is None:
+                color, estado = "#666", "No válido (cerca del fondo)"
+                leq += " (corregido: no válido)"
+            else:
+                leq += f" (corregido {status['leq_corregido']:.1f})"
+        self.compliance_label.setText(
+            f"Zona {status['zona']} · {status['periodo'].capitalize()}: "
+            f"{leq} / {status['limite']} dB(A) · {estado}"
+        )
+        self.compliance_label.setStyleSheet(f"""
+            font-size: 18px;
+            font-weight: 600;
+            color: {color};
+        """)
+
+    def update_exposure_display(self):
+        """Muestra LEX,8h y la dosis de cada criterio del turno en curso."""
+        if not self.exposure_meter or not self.exposure_meter.status:
+            return
+
+        status = self.exposure_meter.status
+        if status["lex_8h"] is None:
+            return
+        parts = []
+        worst = 0.0
+        for name, dose in status["dosis"].items():
+            text = f"{name.upper()} {dose['porcentaje']:.0f}%"
+            if dose["horas_a_100"]:
+                text += f" (100% en {dose['horas_a_100']:.1f} h)"
+            parts.append(text)
+            worst = max(worst, dose["porcentaje"])
+        color = "#F44336" if worst >= 100.0 else "#FF9800" if worst >= 50.0 else "#666"
+        self.exposure_label.setText(
+            f"Turno {status['turno']} ({status['horas_medidas']:.1f} h): "
+            f"LEX,8h {status['lex_8h']:.1f} dB(A) · Dosis " + " · ".join(parts)
+        )
+        self.exposure_label.setStyleSheet(f"""
+            font-size: 16px;
+            font-weight: 500;
+            color: {color};
+        """)
+
+    def update_background_display(self):
+        """Muestra el avance de la captura de fondo o los niveles corregidos."""
+        if not self.background_meter or not self.background_meter.status:
+            return
+
+        status = self.background_meter.status
+        if status["midiendo"]:
+            self.background_label.setText(
+                f"Midiendo ruido de fondo: {100.0 * status['progreso']:.0f}%"
+            )
+            return
+        self.background_button.setText("Medir Fondo")
+        background = status["fondo"]
+        if background is None:
+            return
+
+        def fmt(value):
+            return "no válido" if value is None or value != value else f"{value:.1f}"
+
+        text = (
+            f"Fondo Leq {background['leq']:.1f} · L90 {background['l90']:.1f} dB(A) · "
+            f"Corregido: nivel {fmt(status['nivel_corregido'])}"
+        )
+        if status["leq_corregido"] is not None:
+            text += f" · Leq {fmt(status['leq_corregido'])}"
+        self.background_label.setText(text)
+
+    @pyqtSlot(dict)
+    def update_weighted_label(self, levels):
+        """Muestra LAeq, LCeq y LZeq del tick y la diferencia LCeq - LAeq, y los registra."""
+        self.weighted_label.setText(
+            f"LAeq {levels['laeq']:.1f} · "
+            f"LCeq {levels['lceq']:.1f} · "
+            f"LZeq {levels['lzeq']:.1f} dB · "
+            f"C-A {levels['lceq'] - levels['laeq']:.1f} dB"
+        )
+        if self.log_file_path and not self.replaying:
+            self.log_weighted_levels(levels)
+
+    @pyqtSlot(dict)
+    def update_peak_label(self, peaks):
+        """Muestra LCpeak, LAFmax, LASmax y true-peak del intervalo en curso."""
+        self.peak_label.setText(
+            f"LCpeak {peaks['lcpeak_intervalo']:.1f} dB · "
+            f"LAFmax {peaks['lafmax_intervalo']:.1f} dB · "
+            f"LASmax {peaks['lasmax_intervalo']:.1f} dB · "
+            f"True-peak {peaks['true_peak_intervalo']:.1f} dBTP"
+        )
+
+    @pyqtSlot(dict)
+    def update_loudness_label(self, loudness):
+        """Muestra la sonoridad momentánea, de corto plazo e integrada (LUFS)."""
+
+        def fmt(value):
+            return "--" if value is None else f"{value:.1f}"
+
+        self.loudness_label.setText(
+            f"M {fmt(loudness['momentary'])} · "
+            f"S {fmt(loudness['short_term'])} · "
+            f"I {fmt(loudness['integrated'])} LUFS"
+        )
+
+    @pyqtSlot(dict)
+    def update_input_health_label(self, health):
+        """Muestra las banderas activas de la entrada y el piso de ruido."""
+        names = {
+            "recorte": "RECORTE",
+            "dc": "OFFSET DC",
+            "ceros": "CEROS DIGITALES",
+            "congelado": "SEÑAL CONGELADA",
+        }
+        active = [label for flag, label in names.items() if health[flag]]
+        floor = health["piso_ruido_dbfs"]
+        floor_text = "--" if floor is None else f"{floor:.1f}"
+        self.input_health_label.setText(
+            f"Entrada: {' · '.join(active) if active else 'OK'} · "
+            f"piso de ruido {floor_text} dBFS"
+        )
+        self.input_health_label.setStyleSheet(f"""
+            font-size: 16px;
+            font-weight: {600 if active else 400};
+            color: {"#F44336" if active else "#666"};
+        """)
+
+    @pyqtSlot(dict)
+    def update_timeline_status(self, status):
+        """Guarda el tiempo del tick y registra los huecos de audio en el log."""
+        self.tick_timestamp = status["timestamp"]
+        if self.log_file_path:
+            for gap in status["huecos"]:
+                self.log_gap(gap)
+
     def update_classification_display(self, clasificacion, descripcion):
         """Actualiza el panel de clasificación."""
         self.classification_label.setText(clasificacion)
@@ -782,8 +1709,21 @@ class MainWindow(QMainWindow):
 
     def log_measurement(self, dba_value, clasificacion):
         """Registra una medición en el archivo de log."""
+        if self.measurement_store:
+            tipo_local = (
+                self.current_local_type["nombre"]
+                if self.current_local_type
+                else "No especificado"
+            )
+            self.measurement_store.add(
+                self.tick_timestamp or time.time(), dba_value, clasificacion, tipo_local
+            )
+            return
+
         try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = datetime.fromtimestamp(self.tick_timestamp or time.time()).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
             tipo_local = (
                 self.current_local_type["nombre"]
                 if self.current_local_type
@@ -795,6 +1735,56 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"Error al escribir en el log: {e}")
 
+    def log_weighted_levels(self, levels):
+        """
+        Registra LAeq, LCeq y LZeq del tick junto al log de mediciones.
+
+        En SQLite va a la tabla 'ponderaciones'; con CSV, a un archivo
+        '<log>_ponderaciones.csv' al lado del log.
+        """
+        timestamp = self.tick_timestamp or time.time()
+        if self.measurement_store:
+            self.measurement_store.add_weighted_levels(
+                timestamp, levels["laeq"], levels["lceq"], levels["lzeq"]
+            )
+            return
+
+        weighted_path = os.path.splitext(self.log_file_path)[0] + "_ponderaciones.csv"
+        try:
+            is_new = not os.path.exists(weighted_path)
+            with open(weighted_path, "a", encoding="utf-8") as f:
+                if is_new:
+                    f.write("timestamp,laeq,lceq,lzeq\n")
+                f.write(
+                    f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')},"
+                    f"{levels['laeq']:.1f},{levels['lceq']:.1f},{levels['lzeq']:.1f}\n"
+                )
+        except Exception as e:
+            print(f"Error al escribir niveles A/C/Z: {e}")
+
+    def log_gap(self, gap):
+        """
+        Registra un tramo sin audio junto al log de mediciones.
+
+        En SQLite va a la tabla 'huecos'; con CSV, a un archivo
+        '<log>_huecos.csv' al lado del log.
+        """
+        if self.measurement_store:
+            self.measurement_store.add_gap(gap["inicio"], gap["fin"], gap["motivo"])
+            return
+
+        gaps_path = os.path.splitext(self.log_file_path)[0] + "_huecos.csv"
+        try:
+            is_new = not os.path.exists(gaps_path)
+            with open(gaps_path, "a", encoding="utf-8") as f:
+                if is_new:
+                    f.write("inicio,fin,duracion_s,motivo\n")
+                start = datetime.fromtimestamp(gap["inicio"]).isoformat(timespec="milliseconds")
+                end = datetime.fromtimestamp(gap["fin"]).isoformat(timespec="milliseconds")
+                f.write(f"{start},{end},{gap['duracion_s']:.3f},{gap['motivo']}\n")
+        except Exception as e:
+            print(f"Error al escribir huecos de audio: {e}")
+
     @pyqtSlot(str)
     def show_audio_error(self, error_message):
         """Muestra un mensaje de error si el hilo de audio falla."""
@@ -836,5 +1826,11 @@ class MainWindow(QMainWindow):
                 self.thread.terminate()
                 self.thread.wait()
 
+        for publisher in self.publishers:
+            publisher.close()
+
+        if self.measurement_store:
+            self.measurement_store.close()
+
         print("Aplicación cerrada correctamente.")
         event.accept()
@@ -0,0 +1,245 @@
+import socket
+import struct
+import sys
+import time
+
+BUS_MAGIC = b"VUMB"
+BUS_VERSION = 1
+DEFAULT_GROUP = "239.255.42.99"
+DEFAULT_PORT = 50420
+DEFAULT_TTL = 1
+
+# Cabecera del frame: magic, versión, n_campos, n_registros, secuencia
+FRAME_HEADER = struct.Struct("<4sBBHI")
+
+# Campos publicados por registro (además del timestamp)
+FIELDS = ("nivel_dba",)
+
+# Tamaño máximo seguro de un datagrama UDP sin fragmentar en la red local
+MAX_DATAGRAM_BYTES = 1400
+
+
+def record_struct(n_fields):
+    """
+    Devuelve el struct de un registro: timestamp (float64) + n campos (float32).
+
+    :param n_fields: Número de campos float32 por registro
+    :return: struct.Struct del registro
+    """
+    return struct.Struct("<d" + "f" * n_fields)
+
+
+def encode_frame(sequence, records, n_fields=len(FIELDS)):
+    """
+    Codifica un lote de registros en un frame binario compacto.
+
+    :param sequence: Número de secuencia del frame (uint32, da la vuelta)
+    :param records: Lista de tuplas (timestamp, valor1, valor2, ...)
+    :param n_fields: Número de campos por registro (sin contar el timestamp)
+    :return: bytes del frame
+    """
+    rec = record_struct(n_fields)
+    header = FRAME_HEADER.pack(
+        BUS_MAGIC, BUS_VERSION, n_fields, len(records), sequence & 0xFFFFFFFF
+    )
+    return header + b"".join(rec.pack(*r) for r in records)
+
+
+def decode_frame(data):
+    """
+    Decodifica un frame binario.
+
+    :param data: bytes recibidos
+    :return: (secuencia, n_campos, lista de registros) o None si el frame no es válido
+    """
+    if len(data) < FRAME_HEADER.size:
+        return None
+
+    magic, version, n_fields, count, sequence = FRAME_HEADER.unpack_from(data)
+    if magic != BUS_MAGIC or version != BUS_VERSION:
+        return None
+
+    rec = record_struct(n_fields)
+    if len(data) < FRAME_HEADER.size + count * rec.size:
+        return None
+
+    records = [
+        rec.unpack_from(data, FRAME_HEADER.size + i * rec.size) for i in range(count)
+    ]
+    return sequence, n_fields, records
+
+
+class MeasurementPublisher:
+    """
+    Publica mediciones por UDP multicast en la máquina local (o la LAN).
+
+    Los registros de un tick se acumulan con publish() y se envían en un
+    solo datagrama con flush(). El socket es no bloqueante: si el kernel no
+    puede aceptar el datagrama se descarta y se cuenta, nunca se bloquea el
+    hilo de audio. Cada suscriptor tiene su propio buffer de recepción, así
+    que un consumidor lento pierde frames sin afectar al publicador ni a los
+    demás suscriptores.
+    """
+
+    def __init__(
+        self, group=DEFAULT_GROUP, port=DEFAULT_PORT, ttl=DEFAULT_TTL, fields=FIELDS
+    ):
+        self.address = (group, port)
+        self.fields = tuple(fields)
+        self._record = record_struct(len(self.fields))
+        self._max_records = (
+            MAX_DATAGRAM_BYTES - FRAME_HEADER.size
+        ) // self._record.size
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sock.setblocking(False)
+
+        self.sequence = 0
+        self.pending = []
+
+        # Estadísticas
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def publish(self, timestamp, *values):
+        """
+        Agrega un registro al lote del tick actual (no envía nada).
+
+        :param timestamp: Tiempo del registro (segundos epoch)
+        :param values: Un valor por cada campo de self.fields (los argumentos
+                       extra del flujo, como la duración del tick, se ignoran)
+        """
+        self.pending.append((timestamp, *values[: len(self.fields)]))
+
+    def flush(self):
+        """Envía los registros acumulados en uno o más datagramas."""
+        if not self.pending:
+            return
+
+        records = self.pending
+        self.pending = []
+
+        for start in range(0, len(records), self._max_records):
+            frame = encode_frame(
+                self.sequence,
+                records[start : start + self._max_records],
+                len(self.fields),
+            )
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+            try:
+                self.sock.sendto(frame, self.address)
+                self.frames_sent += 1
+            except (BlockingIOError, OSError):
+                # Nunca bloquear ni propagar: el frame simplemente se pierde
+                self.frames_dropped += 1
+
+    def close(self):
+        """Cierra el socket del publicador."""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class MeasurementSubscriber:
+    """
+    Suscriptor del bus de mediciones.
+
+    Puede haber cualquier cantidad de suscriptores en la misma máquina. Los
+    frames perdidos (por ejemplo, porque el consumidor no alcanzó a leer su
+    buffer) se detectan por saltos en el número de secuencia.
+    """
+
+    def __init__(self, group=DEFAULT_GROUP, port=DEFAULT_PORT, rcvbuf_bytes=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
+        if rcvbuf_bytes:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf_bytes)
+
+        self.sock.bind(("", port))
+        membership = struct.pack(
+            "4s4s", socket.inet_aton(group), socket.inet_aton("0.0.0.0")
+        )
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+
+        self.last_sequence = None
+        self.frames_received = 0
+        self.frames_lost = 0
+
+    def receive(self, timeout=None):
+        """
+        Espera un frame y devuelve sus registros.
+
+        :param timeout: Tiempo máximo de espera en segundos (None = sin límite)
+        :return: Lista de registros (timestamp, valores...) o [] si no llegó nada
+        """
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(65535)
+        except socket.timeout:
+            return []
+
+        decoded = decode_frame(data)
+        if decoded is None:
+            return []
+
+        sequence, _, records = decoded
+        if self.last_sequence is not None:
+            gap = (sequence - self.last_sequence - 1) & 0xFFFFFFFF
+            # Un salto enorme indica reinicio del publicador, no pérdida
+            if gap < 0x80000000:
+                self.frames_lost += gap
+        self.last_sequence = sequence
+        self.frames_received += 1
+
+        return records
+
+    def __iter__(self):
+        """Itera indefinidamente sobre los registros recibidos."""
+        while True:
+            for record in self.receive():
+                yield record
+
+    def close(self):
+        """Cierra el socket del suscriptor."""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def main():
+    """Suscriptor de consola: imprime cada medición recibida del bus."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Suscriptor del bus de mediciones")
+    parser.add_argument("--grupo", default=DEFAULT_GROUP)
+    parser.add_argument("--puerto", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    subscriber = MeasurementSubscriber(args.grupo, args.puerto)
+    print(f"Escuchando mediciones en {args.grupo}:{args.puerto} (Ctrl+C para salir)")
+    try:
+        for timestamp, *values in subscriber:
+            stamp = time.strftime("%H:%M:%S", time.localtime(timestamp))
+            text = ", ".join(f"{v:.1f}" for v in values)
+            print(f"{stamp}  {text}  (perdidos: {subscriber.frames_lost})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+        print(
+            f"Frames recibidos: {subscriber.frames_received}, perdidos: {subscriber.frames_lost}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
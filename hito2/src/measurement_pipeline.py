@@ -0,0 +1,130 @@
+import threading
+
+import numpy as np
+from src.input_health import InputHealthMonitor
+from src.loudness import LoudnessMeter
+from src.meter_engine import WEIGHTINGS, MeterEngine
+from src.peak_meter import PeakMeter
+
+
+class MeasurementPipeline:
+    """
+    Cálculo de las mediciones de un tick a partir del audio crudo.
+
+    Contiene el medidor (MeterEngine: una pasada de la etapa A fusionada que
+    da el nivel con ponderación temporal, los Leq A, C y Z y los máximos
+    Fast/Slow), las métricas de pico, la sonoridad y el estado de la señal
+    de entrada. No depende de Qt ni de sounddevice, así que el mismo cálculo
+    corre dentro del AudioWorker o en un proceso aparte (ver
+    src/dsp_process.py).
+    """
+
+    def __init__(
+        self,
+        sample_rate,
+        calibration_offset_db,
+        time_weighting,
+        silence_threshold_db,
+        peak_interval_s,
+        backend="auto",
+    ):
+        self.sample_rate = sample_rate
+
+        # Lock para acceso seguro al estado de los filtros
+        self.lock = threading.Lock()
+
+        # Nivel dBA con ponderación temporal, Leq A/C/Z y envolventes
+        # Fast/Slow en una pasada (numba o NumPy, ver src/fused_dsp.py); el
+        # resultado no depende de cómo se corte el audio en ticks (ver
+        # src/meter_engine.py)
+        self.meter = MeterEngine(
+            sample_rate,
+            calibration_offset_db,
+            time_weighting,
+            silence_threshold_db,
+            backend=backend,
+        )
+        self.a_weighting = self.meter.a_weighting
+
+        # Métricas de pico (LCpeak, LAFmax, LASmax, true-peak)
+        self.peak_meter = PeakMeter(sample_rate, calibration_offset_db, peak_interval_s)
+
+        # Sonoridad ITU-R BS.1770 (LUFS momentáneo, corto plazo, integrado)
+        self.loudness_meter = LoudnessMeter(sample_rate)
+
+        # Estado de la entrada cruda (recorte, DC, ceros, señal congelada)
+        self.health = InputHealthMonitor(sample_rate)
+
+    def reset(self):
+        """Reinicia el estado de filtros y ponderaciones."""
+        with self.lock:
+            self.meter.reset()
+        self.peak_meter.reset()
+        self.loudness_meter.reset()
+        self.health.reset()
+
+    def process(self, audio_chunk, timer=None):
+        """
+        Procesa el audio crudo de un tick.
+
+        :param audio_chunk: Audio crudo (sin ponderar)
+        :param timer: StageTimer opcional para los tiempos de cada etapa
+        :return: dict con "nivel_dba" (None si no hay valor que emitir),
+                 "ponderaciones" (LAeq, LCeq y LZeq del tick), "picos",
+                 "sonoridad" y "salud"
+        """
+        # Estado de la entrada sobre el audio crudo (el recorte en bajas
+        # frecuencias no se ve después de la ponderación A)
+        health = self.health.process(audio_chunk)
+        if timer is not None:
+            timer.lap("salud")
+
+        # Una pasada por el bloque: ponderación A con envolventes Fast/Slow,
+        # filtro C, nivel con ponderación temporal al final del tick y Leq
+        # A/C/Z del tick (con thread-safety)
+        with self.lock:
+            self.meter.feed(audio_chunk)
+        level = self.meter.level
+        leqs = self.meter.block_leq
+        if timer is not None:
+            timer.lap("nivel")
+
+        # Métricas de pico del tick (vectorizadas, una vez por tick); el
+        # pico C y los máximos Fast/Slow salen de la pasada del medidor
+        c_peak = float(np.sqrt(self.meter.block_peak_square[WEIGHTINGS.index("C")]))
+        peaks = self.peak_meter.process(
+            audio_chunk, self.meter.fast_max, self.meter.slow_max, c_peak
+        )
+        if timer is not None:
+            timer.lap("picos")
+
+        # Sonoridad BS.1770 (LUFS) sobre el audio crudo
+        loudness = self.loudness_meter.process(audio_chunk)
+        if timer is not None:
+            timer.lap("sonoridad")
+
+        return {
+            "nivel_dba": level,
+            "ponderaciones": {
+                "laeq": leqs["A"],
+                "lceq": leqs["C"],
+                "lzeq": leqs["Z"],
+            },
+            "picos": {k: float(v) for k, v in peaks.items()},
+            "sonoridad": loudness,
+            "salud": health,
+        }
+
+    @property
+    def time_weighting(self):
+        """Constante de tiempo de la ponderación temporal (s)."""
+        return self.meter.time_weighting
+
+    @time_weighting.setter
+    def time_weighting(self, seconds):
+        self.meter.time_weighting = seconds
+
+    def set_backend(self, backend):
+        """Cambia la implementación de la ponderación A ("auto", "numba" o "numpy")."""
+        with self.lock:
+            self.meter.set_backend(backend)
@@ -0,0 +1,370 @@
+import math
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mediciones (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    nivel_dba REAL NOT NULL,
+    clasificacion TEXT,
+    tipo_local TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mediciones_timestamp ON mediciones (timestamp);
+CREATE INDEX IF NOT EXISTS idx_mediciones_local_timestamp ON mediciones (tipo_local, timestamp);
+
+CREATE TABLE IF NOT EXISTS rollup_minuto (
+    tipo_local TEXT NOT NULL,
+    minuto INTEGER NOT NULL,
+    energia REAL NOT NULL,
+    lmax REAL NOT NULL,
+    lmin REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (tipo_local, minuto)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_minuto_minuto ON rollup_minuto (minuto);
+
+CREATE TABLE IF NOT EXISTS rollup_hora (
+    tipo_local TEXT NOT NULL,
+    hora INTEGER NOT NULL,
+    energia REAL NOT NULL,
+    lmax REAL NOT NULL,
+    lmin REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (tipo_local, hora)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_hora_hora ON rollup_hora (hora);
+
+CREATE TABLE IF NOT EXISTS huecos (
+    id INTEGER PRIMARY KEY,
+    inicio REAL NOT NULL,
+    fin REAL NOT NULL,
+    duracion_s REAL NOT NULL,
+    motivo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_huecos_inicio ON huecos (inicio);
+
+CREATE TABLE IF NOT EXISTS ponderaciones (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    laeq REAL NOT NULL,
+    lceq REAL NOT NULL,
+    lzeq REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ponderaciones_timestamp ON ponderaciones (timestamp);
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO {table} (tipo_local, {key}, energia, lmax, lmin, n)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (tipo_local, {key}) DO UPDATE SET
+    energia = energia + excluded.energia,
+    lmax = MAX(lmax, excluded.lmax),
+    lmin = MIN(lmin, excluded.lmin),
+    n = n + excluded.n
+"""
+
+
+def energy_to_leq(energy, n):
+    """
+    Convierte una suma de energías relativas (10^(L/10)) en Leq.
+
+    :param energy: Suma de 10^(L/10) de las muestras
+    :param n: Cantidad de muestras
+    :return: Leq en dBA (None si no hay muestras)
+    """
+    if not n or energy <= 0:
+        return None
+    return 10.0 * math.log10(energy / n)
+
+
+def aggregate_rows(rows, period_seconds):
+    """
+    Agrupa filas (timestamp, nivel, clasificación, tipo_local) por local y período.
+
+    :param rows: Lista de tuplas de medición
+    :param period_seconds: Largo del período (60 para minutos, 3600 para horas)
+    :return: Lista de tuplas (tipo_local, período, energía, lmax, lmin, n)
+    """
+    cells = {}
+    for timestamp, level, _, tipo_local in rows:
+        key = (tipo_local, int(timestamp // period_seconds))
+        energy = 10.0 ** (level / 10.0)
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [energy, level, level, 1]
+        else:
+            cell[0] += energy
+            if level > cell[1]:
+                cell[1] = level
+            if level < cell[2]:
+                cell[2] = level
+            cell[3] += 1
+    return [(k[0], k[1], *v) for k, v in cells.items()]
+
+
+class MeasurementStore:
+    """
+    Almacenamiento de mediciones en SQLite (alternativa al log CSV).
+
+    Las mediciones se encolan sin bloquear y un hilo escritor las inserta en
+    lotes, cada lote en una sola transacción. En la misma transacción se
+    actualizan las tablas de agregados por minuto y por hora (energía, Lmax,
+    Lmin y cantidad de muestras), de modo que las consultas por rango sobre
+    meses leen unas pocas filas agregadas en lugar de todas las mediciones.
+    """
+
+    BATCH_MAX_ROWS = 500
+    BATCH_MAX_SECONDS = 1.0
+    QUEUE_MAX_SIZE = 100000
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+        # Conexión de lectura (hilo de la UI); el escritor abre la suya
+        self.conn = self.connect()
+        self.conn.executescript(SCHEMA)
+
+        self.write_queue = queue.Queue(maxsize=self.QUEUE_MAX_SIZE)
+        # Huecos de audio (pocos): se escriben en la transacción del lote siguiente
+        self.gap_queue = queue.SimpleQueue()
+        # LAeq/LCeq/LZeq por tick: se escriben en la transacción del lote siguiente
+        self.weighted_queue = queue.Queue(maxsize=self.QUEUE_MAX_SIZE)
+        self.dropped_rows = 0
+        self.written_rows = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self._thread.start()
+
+    def connect(self):
+        """Abre una conexión con WAL y sincronización normal."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, timestamp, nivel_dba, clasificacion, tipo_local):
+        """
+        Encola una medición para escritura (no bloquea).
+
+        :param timestamp: Tiempo en segundos epoch
+        :param nivel_dba: Nivel en dBA
+        :param clasificacion: Clasificación (A, B, C)
+        :param tipo_local: Nombre del tipo de local
+        """
+        try:
+            self.write_queue.put_nowait((timestamp, nivel_dba, clasificacion, tipo_local))
+        except queue.Full:
+            self.dropped_rows += 1
+
+    def add_gap(self, start, end, reason):
+        """
+        Encola un tramo sin audio para escritura (no bloquea).
+
+        :param start: Inicio del hueco (segundos epoch)
+        :param end: Fin del hueco (segundos epoch)
+        :param reason: Motivo ("overflow", "descarte", ...)
+        """
+        self.gap_queue.put((start, end, max(end - start, 0.0), reason))
+
+    def add_weighted_levels(self, timestamp, laeq, lceq, lzeq):
+        """
+        Encola los niveles equivalentes A, C y Z de un tick (no bloquea).
+
+        :param timestamp: Tiempo en segundos epoch
+        :param laeq: Leq con ponderación A (dB)
+        :param lceq: Leq con ponderación C (dB)
+        :param lzeq: Leq sin ponderación (dB)
+        """
+        try:
+            self.weighted_queue.put_nowait((timestamp, laeq, lceq, lzeq))
+        except queue.Full:
+            self.dropped_rows += 1
+
+    def writer_loop(self):
+        """Hilo escritor: agrupa filas y las inserta por lotes."""
+        conn = self.connect()
+        try:
+            while not (
+                self._stop.is_set()
+                and self.write_queue.empty()
+                and self.gap_queue.empty()
+                and self.weighted_queue.empty()
+            ):
+                rows = self.collect_batch()
+                if rows or not (self.gap_queue.empty() and self.weighted_queue.empty()):
+                    try:
+                        self.write_batch(conn, rows)
+                        self.written_rows += len(rows)
+                    except sqlite3.Error as e:
+                        print(f"Error al escribir en SQLite: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    def collect_batch(self):
+        """Espera filas hasta completar un lote o cumplir el tiempo máximo."""
+        rows = []
+        deadline = time.monotonic() + self.BATCH_MAX_SECONDS
+        while len(rows) < self.BATCH_MAX_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(self.write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return rows
+
+    def write_batch(self, conn, rows):
+        """Inserta un lote y actualiza los agregados en una sola transacción."""
+        gaps = []
+        while not self.gap_queue.empty():
+            gaps.append(self.gap_queue.get_nowait())
+        weighted = []
+        while not self.weighted_queue.empty():
+            weighted.append(self.weighted_queue.get_nowait())
+        with conn:
+            if weighted:
+                conn.executemany(
+                    "INSERT INTO ponderaciones (timestamp, laeq, lceq, lzeq) VALUES (?, ?, ?, ?)",
+                    weighted,
+                )
+            if gaps:
+                conn.executemany(
+                    "INSERT INTO huecos (inicio, fin, duracion_s, motivo) VALUES (?, ?, ?, ?)",
+                    gaps,
+                )
+            conn.executemany(
+                "INSERT INTO mediciones (timestamp, nivel_dba, clasificacion, tipo_local) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                UPSERT_ROLLUP.format(table="rollup_minuto", key="minuto"),
+                aggregate_rows(rows, 60),
+            )
+            conn.executemany(
+                UPSERT_ROLLUP.format(table="rollup_hora", key="hora"),
+                aggregate_rows(rows, 3600),
+            )
+
+    def query_rollups(self, start, end, resolution="hora", tipo_local=None):
+        """
+        Devuelve los agregados de un rango de tiempo.
+
+        :param start: Inicio del rango (segundos epoch)
+        :param end: Fin del rango (segundos epoch, exclusivo)
+        :param resolution: "minuto" u "hora"
+        :param tipo_local: Filtrar por tipo de local (None = todos)
+        :return: Lista de dicts con inicio, tipo_local, leq, lmax, lmin y n
+        """
+        if resolution == "minuto":
+            table, key, period = "rollup_minuto", "minuto", 60
+        elif resolution == "hora":
+            table, key, period = "rollup_hora", "hora", 3600
+        else:
+            raise ValueError(f"Resolución desconocida: {resolution}")
+
+        sql = (
+            f"SELECT tipo_local, {key}, energia, lmax, lmin, n FROM {table} "
+            f"WHERE {key} >= ? AND {key} < ?"
+        )
+        params = [int(start // period), int(math.ceil(end / period))]
+        if tipo_local is not None:
+            sql += " AND tipo_local = ?"
+            params.append(tipo_local)
+        sql += f" ORDER BY {key}, tipo_local"
+
+        return [
+            {
+                "inicio": k * period,
+                "tipo_local": local,
+                "leq": energy_to_leq(energy, n),
+                "lmax": lmax,
+                "lmin": lmin,
+                "n": n,
+            }
+            for local, k, energy, lmax, lmin, n in self.conn.execute(sql, params)
+        ]
+
+    def summary(self, start, end, tipo_local=None):
+        """
+        Leq, Lmax, Lmin y cantidad de muestras de un rango (alineado a minutos).
+
+        Usa la tabla horaria para las horas completas y la de minutos solo
+        para los bordes, así el costo no depende del largo del rango.
+
+        :param start: Inicio del rango (segundos epoch)
+        :param end: Fin del rango (segundos epoch, exclusivo)
+        :param tipo_local: Filtrar por tipo de local (None = todos)
+        :return: dict con leq, lmax, lmin, n y huecos_s (segundos sin audio)
+        """
+        first_minute = int(start // 60)
+        end_minute = int(math.ceil(end / 60))
+        first_hour = -(-first_minute // 60)
+        end_hour = end_minute // 60
+
+        local_filter = ""
+        local_params = []
+        if tipo_local is not None:
+            local_filter = " AND tipo_local = ?"
+            local_params = [tipo_local]
+
+        parts = []
+        if first_hour < end_hour:
+            parts.append(
+                (
+                    "SELECT SUM(energia), MAX(lmax), MIN(lmin), SUM(n) FROM rollup_hora "
+                    "WHERE hora >= ? AND hora < ?" + local_filter,
+                    [first_hour, end_hour] + local_params,
+                )
+            )
+            edges = [(first_minute, first_hour * 60), (end_hour * 60, end_minute)]
+        else:
+            edges = [(first_minute, end_minute)]
+
+        for lo, hi in edges:
+            if lo < hi:
+                parts.append(
+                    (
+                        "SELECT SUM(energia), MAX(lmax), MIN(lmin), SUM(n) FROM rollup_minuto "
+                        "WHERE minuto >= ? AND minuto < ?" + local_filter,
+                        [lo, hi] + local_params,
+                    )
+                )
+
+        energy, lmax, lmin, n = 0.0, None, None, 0
+        for sql, params in parts:
+            e, mx, mn, count = self.conn.execute(sql, params).fetchone()
+            if not count:
+                continue
+            energy += e
+            n += count
+            lmax = mx if lmax is None else max(lmax, mx)
+            lmin = mn if lmin is None else min(lmin, mn)
+
+        gap_seconds = self.conn.execute(
+            "SELECT COALESCE(SUM(MIN(fin, ?) - MAX(inicio, ?)), 0.0) FROM huecos "
+            "WHERE inicio < ? AND fin > ?",
+            [end, start, end, start],
+        ).fetchone()[0]
+
+        return {
+            "leq": energy_to_leq(energy, n),
+            "lmax": lmax,
+            "lmin": lmin,
+            "n": n,
+            "huecos_s": gap_seconds,
+        }
+
+    def close(self):
+        """Detiene el hilo escritor tras vaciar la cola y cierra la conexión."""
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self.conn.close()
+        if self.dropped_rows:
+            print(f"SQLite: {self.dropped_rows} mediciones descartadas (cola llena)")
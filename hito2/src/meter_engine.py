@@ -0,0 +1,259 @@
+import json
+import os
+import sys
+
+import numpy as np
+from scipy.signal import lfilter, sosfilt
+from src.audio_utils import create_dbc_filter
+from src.fused_dsp import AWeightingStage
+
+# Nivel máximo informado (dB); el mínimo lo fija el umbral de silencio
+MAX_LEVEL_DB = 130.0
+
+# Ponderaciones frecuenciales calculadas juntas, en el orden de las filas
+# del estado (Z es la señal sin filtrar)
+WEIGHTINGS = ("A", "C", "Z")
+
+# Un intervalo del medidor: muestra final (exclusiva, contada desde el
+# inicio del flujo), nivel A con ponderación temporal al final del intervalo
+# y Leq A, C y Z del intervalo
+LEVEL_DTYPE = np.dtype(
+    [("muestra", "<i8"), ("nivel_dba", "<f8"), ("leq_dba", "<f8")]
+    + [("leq_dbc", "<f8"), ("leq_dbz", "<f8")]
+)
+
+
+class MeterEngine:
+    """
+    Medidor de nivel A, C y Z en streaming: feed(bloque) -> niveles.
+
+    No depende de Qt ni de sounddevice, así que se puede usar desde scripts
+    y servicios. Todo el estado avanza muestra a muestra: el filtro A con
+    las envolventes Fast/Slow (la etapa de src/fused_dsp.py, numba o NumPy,
+    en una sola pasada), el filtro C (sosfilt con zi), la ponderación
+    temporal exponencial sobre la señal A al cuadrado (lfilter con zi) y la
+    suma de energía del intervalo (suma secuencial). Las tres ponderaciones
+    comparten el bloque de entrada y se guardan como filas de un mismo
+    arreglo (ver WEIGHTINGS), así las sumas corren una sola vez sobre las
+    tres filas. La ponderación temporal se sigue solo para A (el nivel que
+    se muestra); C y Z entregan su Leq. Los niveles se entregan en una
+    grilla fija de interval_s contada en muestras, cortando cada bloque en
+    los bordes de la grilla con vistas, sin concatenar. Así el resultado es
+    idéntico bit a bit si la misma señal llega en un solo buffer o en
+    bloques de cualquier tamaño (con el mismo backend).
+
+    get_state()/set_state() (y save_state()/load_state() en JSON) guardan y
+    restauran el estado completo; retomar desde un estado guardado da los
+    mismos bits que no haberse detenido.
+    """
+
+    def __init__(
+        self,
+        sample_rate,
+        calibration_offset_db=105.0,
+        time_weighting=0.125,
+        silence_threshold_db=-60.0,
+        interval_s=0.1,
+        backend="auto",
+    ):
+        """
+        :param sample_rate: Frecuencia de muestreo (Hz)
+        :param calibration_offset_db: dB SPL de una señal de escala completa
+        :param time_weighting: Constante de tiempo en segundos (Fast 0.125, Slow 1.0)
+        :param silence_threshold_db: Bajo este nivel (dBFS) se informa silencio
+        :param interval_s: Resolución de la grilla de niveles
+        :param backend: Implementación de la etapa A ("auto", "numba" o "numpy")
+        """
+        self.sample_rate = sample_rate
+        self.calibration_offset_db = calibration_offset_db
+        self.time_weighting = time_weighting
+        self.silence_threshold_db = silence_threshold_db
+        self.interval_samples = max(int(round(interval_s * sample_rate)), 1)
+        # Fila A: filtro y envolventes Fast/Slow en una pasada; fila C: sosfilt;
+        # la fila Z no se filtra
+        self.a_weighting = AWeightingStage(sample_rate, backend)
+        self.sos_c = create_dbc_filter(sample_rate)
+        self.reset()
+
+    def reset(self):
+        """Vuelve al estado inicial (filtros reiniciados, posición 0)."""
+        self.reset_filter()
+        self.position = 0
+        self.interval_energy = np.zeros(len(WEIGHTINGS), dtype=np.float64)
+        self.last_valid_dba = None
+
+        # Energía media y máximo de la señal al cuadrado del último bloque,
+        # por ponderación (nivel equivalente del tick y LCpeak), y máximos de
+        # las envolventes A Fast/Slow del bloque (LAFmax/LASmax)
+        self.block_mean_square = np.zeros(len(WEIGHTINGS), dtype=np.float64)
+        self.block_peak_square = np.zeros(len(WEIGHTINGS), dtype=np.float64)
+        self.fast_max = 0.0
+        self.slow_max = 0.0
+
+    def reset_filter(self):
+        """Reinicia los filtros y la ponderación temporal (p. ej. tras valores inválidos)."""
+        self.a_weighting.reset()
+        self.zi_c = np.zeros((self.sos_c.shape[0], 2), dtype=np.float64)
+        self.envelope = np.zeros(1, dtype=np.float64)
+
+    def set_backend(self, backend):
+        """Cambia la implementación de la etapa A ("auto", "numba" o "numpy")."""
+        self.a_weighting.set_backend(backend)
+
+    @property
+    def alpha(self):
+        """Coeficiente por muestra de la ponderación temporal."""
+        return 1.0 - np.exp(-1.0 / (self.time_weighting * self.sample_rate))
+
+    @property
+    def level(self):
+        """Nivel con ponderación temporal en la última muestra recibida (dBA)."""
+        return self.to_dba(float(self.envelope[0]))
+
+    @property
+    def block_leq(self):
+        """Nivel equivalente del último bloque por ponderación (dict "A", "C", "Z")."""
+        return dict(zip(WEIGHTINGS, self.to_db(self.block_mean_square).tolist()))
+
+    def feed(self, block):
+        """
+        Procesa un bloque de cualquier tamaño.
+
+        :param block: Audio crudo (sin ponderar), 1D
+        :return: Array LEVEL_DTYPE con los intervalos de la grilla que se
+                 completaron en este bloque (puede estar vacío)
+        """
+        x = np.asarray(block)
+        if x.dtype not in (np.float32, np.float64):
+            x = x.astype(np.float64)
+        if x.ndim != 1:
+            raise ValueError("feed() espera un bloque 1D")
+        n = len(x)
+        if n == 0:
+            self.fast_max = self.slow_max = 0.0
+            return np.empty(0, dtype=LEVEL_DTYPE)
+
+        # Una fila por ponderación sobre el mismo bloque de entrada; la etapa
+        # A deja su señal al cuadrado en la fila 0 y los máximos Fast/Slow
+        squared = np.empty((len(WEIGHTINGS), n), dtype=np.float64)
+        _, self.fast_max, self.slow_max = self.a_weighting.process(x, squared[0])
+        squared[1], self.zi_c = sosfilt(self.sos_c, x, zi=self.zi_c)
+        squared[2] = x
+        np.multiply(squared[1:], squared[1:], out=squared[1:])
+        self.block_mean_square = squared.mean(axis=1)
+        self.block_peak_square = squared.max(axis=1)
+        alpha = self.alpha
+        envelope, self.envelope = lfilter(
+            [alpha], [1.0, alpha - 1.0], squared[0], zi=self.envelope
+        )
+
+        # Bordes de la grilla dentro del bloque (índice exclusivo de cada fin)
+        fill = self.position % self.interval_samples
+        ends = np.arange(self.interval_samples - fill, n + 1, self.interval_samples)
+        energies = np.empty((len(WEIGHTINGS), len(ends)), dtype=np.float64)
+
+        # Sumas secuenciales desde el inicio de cada intervalo: la primera
+        # parte sigue la suma guardada; los intervalos completos del medio
+        # se suman fila por fila; el resto queda como suma parcial
+        start = 0
+        if len(ends):
+            head = squared[:, : ends[0]]
+            head[:, 0] += self.interval_energy
+            energies[:, 0] = np.cumsum(head, axis=1)[:, -1]
+            start = int(ends[0])
+            full = (n - start) // self.interval_samples
+            if full:
+                body = squared[:, start : start + full * self.interval_samples]
+                energies[:, 1:] = np.cumsum(
+                    body.reshape(len(WEIGHTINGS), full, self.interval_samples), axis=2
+                )[:, :, -1]
+                start += full * self.interval_samples
+            self.interval_energy[:] = 0.0
+        if start < n:
+            tail = squared[:, start:]
+            tail[:, 0] += self.interval_energy
+            self.interval_energy = np.cumsum(tail, axis=1)[:, -1].copy()
+
+        levels = np.empty(len(ends), dtype=LEVEL_DTYPE)
+        levels["muestra"] = self.position + ends
+        leqs = self.to_db(energies / self.interval_samples)
+        for name, leq in zip(("leq_dba", "leq_dbc", "leq_dbz"), leqs):
+            levels[name] = leq
+        for i, end in enumerate(ends):
+            level = self.to_dba(float(envelope[end - 1]))
+            levels["nivel_dba"][i] = np.nan if level is None else level
+        self.position += n
+
+        if not np.isfinite(self.envelope[0]):
+            # Un valor inválido en la entrada contamina los estados
+            print("Valor inválido detectado, reiniciando filtro", file=sys.stderr)
+            self.reset_filter()
+            self.interval_energy[:] = 0.0
+        return levels
+
+    def to_db(self, mean_square):
+        """Energía media (lineal) a dB calibrados, con piso de silencio y techo."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            db = 10.0 * np.log10(mean_square)
+        silence = max(self.calibration_offset_db + self.silence_threshold_db, 0.0)
+        level = np.where(db < self.silence_threshold_db, silence, db + self.calibration_offset_db)
+        return np.minimum(level, MAX_LEVEL_DB)
+
+    def to_dba(self, mean_square):
+        """
+        Nivel informado para una energía con ponderación temporal: silencio
+        bajo el umbral y, si el valor no es válido, el último nivel válido.
+        """
+        if not np.isfinite(mean_square):
+            return self.last_valid_dba
+        level = float(self.to_db(mean_square))
+        if mean_square >= 10.0 ** (self.silence_threshold_db / 10.0):
+            self.last_valid_dba = level
+        return level
+
+    def get_state(self):
+        """Estado completo (tipos de JSON; los float se restauran exactos)."""
+        return {
+            "sample_rate": self.sample_rate,
+            "intervalo_muestras": self.interval_samples,
+            "posicion": self.position,
+            "ponderaciones": list(WEIGHTINGS),
+            "zi_a": self.a_weighting.zi.tolist(),
+            "envolventes_a": self.a_weighting.env.tolist(),
+            "zi_c": self.zi_c.tolist(),
+            "envolvente": float(self.envelope[0]),
+            "energia_intervalo": self.interval_energy.tolist(),
+            "ultimo_valido": self.last_valid_dba,
+        }
+
+    def set_state(self, state):
+        """Restaura un estado de get_state() (misma frecuencia y grilla)."""
+        if (
+            state["sample_rate"] != self.sample_rate
+            or state["intervalo_muestras"] != self.interval_samples
+        ):
+            raise ValueError("El estado corresponde a otra frecuencia de muestreo o grilla")
+        if state.get("ponderaciones") != list(WEIGHTINGS):
+            raise ValueError("El estado no tiene las ponderaciones A, C y Z (versión anterior)")
+        self.position = int(state["posicion"])
+        self.a_weighting.zi = np.ascontiguousarray(
+            np.array(state["zi_a"], dtype=np.float64).reshape(self.a_weighting.zi.shape)
+        )
+        self.a_weighting.env = np.array(state["envolventes_a"], dtype=np.float64)
+        self.zi_c = np.array(state["zi_c"], dtype=np.float64).reshape(self.zi_c.shape)
+        self.envelope = np.array([state["envolvente"]], dtype=np.float64)
+        self.interval_energy = np.array(state["energia_intervalo"], dtype=np.float64)
+        self.last_valid_dba = state["ultimo_valido"]
+
+    def save_state(self, path):
+        """Guarda el estado en un archivo JSON (reemplazo atómico)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.get_state(), f)
+        os.replace(tmp_path, path)
+
+    def load_state(self, path):
+        """Restaura el estado guardado con save_state()."""
+        with open(path, "r", encoding="utf-8") as f:
+            self.set_state(json.load(f))
+
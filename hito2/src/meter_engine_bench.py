@@ -0,0 +1,88 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from src.fused_dsp import numba
+from src.meter_engine import MeterEngine
+from src.synthetic_audio import SAMPLE_RATE, random_partition, synthetic_signal
+
+
+def check_partitions(seconds, trials, backend="numpy", verbose=True):
+    """
+    Compara la salida con la señal en un solo buffer contra particiones
+    aleatorias y contra una pausa con guardado y restauración del estado.
+
+    :return: True si todas coinciden bit a bit
+    """
+    signal = synthetic_signal(seconds)
+    reference = MeterEngine(SAMPLE_RATE, backend=backend).feed(signal)
+    rng = np.random.default_rng(3)
+    ok = True
+
+    for trial in range(trials):
+        engine = MeterEngine(SAMPLE_RATE, backend=backend)
+        cuts = random_partition(len(signal), rng, max_block=int(rng.choice([64, 5000, 60000])))
+        got = np.concatenate([engine.feed(signal[a:b]) for a, b in zip(cuts[:-1], cuts[1:])])
+        same = np.array_equal(got, reference)
+        ok &= same
+        if verbose:
+            print(
+                f"Partición {trial + 1}: {len(cuts) - 1} bloques, "
+                f"idéntica: {'sí' if same else 'NO'}"
+            )
+
+    # Detener a mitad de un intervalo y seguir en otro motor con el estado guardado
+    middle = len(signal) // 2 + 123
+    first = MeterEngine(SAMPLE_RATE, backend=backend)
+    head = first.feed(signal[:middle])
+    second = MeterEngine(SAMPLE_RATE, backend=backend)
+    second.set_state(json.loads(json.dumps(first.get_state())))
+    got = np.concatenate([head, second.feed(signal[middle:])])
+    same = np.array_equal(got, reference)
+    ok &= same
+    if verbose:
+        print(f"Estado guardado y restaurado: idéntica: {'sí' if same else 'NO'}")
+    return ok
+
+
+def benchmark(block_size, seconds, backend="numpy"):
+    """
+    Mide el costo de feed() por bloque.
+
+    :return: (microsegundos por bloque, veces tiempo real)
+    """
+    signal = synthetic_signal(seconds, seed=2)
+    n_blocks = len(signal) // block_size
+    engine = MeterEngine(SAMPLE_RATE, backend=backend)
+    start = time.perf_counter()
+    for i in range(n_blocks):
+        engine.feed(signal[i * block_size : (i + 1) * block_size])
+    elapsed = time.perf_counter() - start
+    return elapsed / n_blocks * 1e6, n_blocks * block_size / SAMPLE_RATE / elapsed
+
+
+def main():
+    """Invariancia ante la partición de los bloques y rendimiento de MeterEngine."""
+    parser = argparse.ArgumentParser(description="Verificación y benchmark de MeterEngine")
+    parser.add_argument("--segundos", type=float, default=20.0, help="Audio por prueba (s)")
+    parser.add_argument("--particiones", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = ["numpy"] if numba is None else ["numpy", "numba"]
+    for backend in backends:
+        print(f"Backend {backend}:")
+        if not check_partitions(args.segundos, args.particiones, backend):
+            print("ERROR: la salida depende de la partición de los bloques", file=sys.stderr)
+            sys.exit(1)
+
+    print(f"{'bloque':>8} {'backend':>8} {'µs/bloque':>10} {'x tiempo real':>14}")
+    for block_size in (64, 512, 4096, 44100):
+        for backend in backends:
+            per_block, realtime = benchmark(block_size, args.segundos, backend)
+            print(f"{block_size:>8} {backend:>8} {per_block:>10.1f} {realtime:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import sosfilt, sosfilt_zi
+from src.audio_utils import create_dbc_filter, create_true_peak_filter
+
+
+class PeakMeter:
+    """
+    Métricas de pico y de nivel máximo calculadas una vez por tick.
+
+    - LCpeak: pico de la señal con ponderación C (dB); si el filtro C ya
+      corrió sobre el tick (MeterEngine) se recibe su pico y no se filtra
+      de nuevo.
+    - LAFmax / LASmax: máximo del nivel A con ponderación temporal Fast (125 ms)
+      y Slow (1 s); las envolventes muestra a muestra las sigue la etapa de
+      ponderación A (ver src/fused_dsp.py) y aquí se reciben sus máximos.
+    - True-peak (dBTP): pico de la señal sobremuestreada 4x con un
+      interpolador polifásico; todas las fases se calculan con un único
+      producto matricial sobre una vista deslizante del bloque.
+
+    Además de los valores del tick se mantienen los máximos del intervalo en
+    curso (interval_seconds, contado en muestras procesadas).
+    """
+
+    OVERSAMPLING = 4
+
+    def __init__(self, sample_rate, calibration_offset_db, interval_seconds=60.0):
+        self.sample_rate = sample_rate
+        self.calibration_offset_db = calibration_offset_db
+        self.interval_samples = int(interval_seconds * sample_rate)
+
+        # Ponderación C para LCpeak
+        self.sos_c = create_dbc_filter(sample_rate)
+        self.zi_c = sosfilt_zi(self.sos_c) * 0.0
+
+        # Interpolador polifásico para true-peak, con historia entre bloques
+        self.tp_phases = create_true_peak_filter(self.OVERSAMPLING)
+        self.tp_history = np.zeros(self.tp_phases.shape[0] - 1, dtype=np.float64)
+
+        self.reset_interval()
+
+    def reset(self):
+        """Reinicia los estados de los filtros y el intervalo."""
+        self.zi_c = sosfilt_zi(self.sos_c) * 0.0
+        self.tp_history[:] = 0.0
+        self.reset_interval()
+
+    def reset_interval(self):
+        """Comienza un nuevo intervalo de máximos."""
+        self.interval_elapsed = 0
+        self.interval_max = {"lcpeak": None, "lafmax": None, "lasmax": None, "true_peak": None}
+
+    def to_db(self, linear_peak):
+        """Convierte un pico lineal (escala completa = 1) a dB calibrados."""
+        return 20.0 * np.log10(max(linear_peak, 1e-10)) + self.calibration_offset_db
+
+    def process(self, raw_chunk, fast_max, slow_max, c_peak=None):
+        """
+        Calcula las métricas del tick.
+
+        :param raw_chunk: Audio crudo del tick (sin ponderar)
+        :param fast_max: Máximo del tick de la envolvente A Fast (cuadrática, lineal)
+        :param slow_max: Máximo del tick de la envolvente A Slow (cuadrática, lineal)
+        :param c_peak: Pico lineal del tick con ponderación C ya calculado
+                       (None = filtrar aquí)
+        :return: dict con los valores del tick y los máximos del intervalo
+        """
+        # LCpeak
+        if c_peak is None:
+            c_weighted, self.zi_c = sosfilt(self.sos_c, raw_chunk, zi=self.zi_c)
+            c_peak = float(np.max(np.abs(c_weighted)))
+        lcpeak = self.to_db(c_peak)
+
+        # LAFmax / LASmax
+        levels = {
+            name: 10.0 * np.log10(max(float(envelope_max), 1e-20)) + self.calibration_offset_db
+            for name, envelope_max in (("fast", fast_max), ("slow", slow_max))
+        }
+
+        # True-peak: ventana deslizante (historia + bloque) x fases
+        extended = np.concatenate((self.tp_history, raw_chunk))
+        windows = sliding_window_view(extended, self.tp_phases.shape[0])
+        oversampled = windows @ self.tp_phases
+        true_peak = max(float(np.max(np.abs(oversampled))), float(np.max(np.abs(raw_chunk))))
+        self.tp_history = extended[-(self.tp_phases.shape[0] - 1) :]
+        true_peak_dbtp = 20.0 * np.log10(max(true_peak, 1e-10))
+
+        tick = {
+            "lcpeak": lcpeak,
+            "lafmax": levels["fast"],
+            "lasmax": levels["slow"],
+            "true_peak": true_peak_dbtp,
+        }
+
+        if self.interval_elapsed >= self.interval_samples:
+            self.reset_interval()
+        self.interval_elapsed += len(raw_chunk)
+        for key, value in tick.items():
+            current = self.interval_max[key]
+            if current is None or value > current:
+                self.interval_max[key] = value
+
+        return {
+            **tick,
+            **{f"{key}_intervalo": value for key, value in self.interval_max.items()},
+        }
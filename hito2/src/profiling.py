@@ -0,0 +1,235 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+PROFILER_MODES = ("muestreo", "cprofile")
+
+
+class StageTimer:
+    """
+    Tiempos por etapa de cada tick, con percentiles móviles.
+
+    Cada tick llama a start() y, al terminar cada etapa, a lap(etapa): un
+    perf_counter y una suma en una fila preasignada, sin crear objetos. Los
+    últimos HISTORY ticks quedan en un buffer circular (tick x etapa) y los
+    percentiles se calculan solo cuando se piden. Una etapa que no corre en
+    un tick cuenta 0 en ese tick; lap() con la misma etapa varias veces en un
+    tick acumula.
+    """
+
+    HISTORY = 1024
+
+    def __init__(self, stages, history=HISTORY):
+        """
+        :param stages: Nombres de las etapas, en el orden del tick
+        :param history: Ticks que entran en los percentiles
+        """
+        self.stages = tuple(stages)
+        self.index = {name: i for i, name in enumerate(self.stages)}
+        self.times = np.zeros((history, len(self.stages)), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """Descarta los ticks registrados."""
+        self.times[:] = 0.0
+        self.count = 0
+        self.row = self.times[0]
+        self.last = time.perf_counter()
+
+    def start(self):
+        """Comienza un tick (reutiliza la fila más antigua del buffer)."""
+        self.row = self.times[self.count % len(self.times)]
+        self.row[:] = 0.0
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        """Asigna a la etapa el tiempo transcurrido desde el lap anterior."""
+        now = time.perf_counter()
+        self.row[self.index[stage]] += now - self.last
+        self.last = now
+
+    def stop(self):
+        """Cierra el tick en curso; un tick sin stop() no entra en los percentiles."""
+        self.count += 1
+
+    def percentiles(self, q=(50, 95, 99)):
+        """
+        Percentiles de cada etapa y del total del tick.
+
+        :param q: Percentiles a calcular
+        :return: dict etapa -> {"p50": ms, ..., "max": ms}, con "total" al
+                 final; se omiten las etapas que no corrieron en la ventana
+        """
+        n = min(self.count, len(self.times))
+        if n == 0:
+            return {}
+        data = self.times[:n]
+        data = np.column_stack((data, data.sum(axis=1))) * 1000.0
+        values = np.percentile(data, q, axis=0)
+        maxima = data.max(axis=0)
+
+        result = {"ticks": n}
+        for i, name in enumerate(self.stages + ("total",)):
+            if maxima[i] <= 0.0:
+                continue
+            stats = {f"p{p:g}": float(values[j, i]) for j, p in enumerate(q)}
+            stats["max"] = float(maxima[i])
+            result[name] = stats
+        return result
+
+
+def format_stage_timings(timings):
+    """
+    Tabla de texto con los percentiles de StageTimer.percentiles().
+
+    :param timings: Resultado de StageTimer.percentiles()
+    :return: Texto con una línea por etapa (ms)
+    """
+    stages = {name: stats for name, stats in timings.items() if name != "ticks"}
+    if not stages:
+        return "Sin ticks registrados\n"
+    columns = list(next(iter(stages.values())))
+    lines = [
+        f"Tiempos por etapa (ms, últimos {timings['ticks']} ticks)",
+        f"{'etapa':<16}" + "".join(f"{column:>10}" for column in columns),
+    ]
+    for name, stats in stages.items():
+        lines.append(f"{name:<16}" + "".join(f"{stats[c]:>10.3f}" for c in columns))
+    return "\n".join(lines) + "\n"
+
+
+class ThreadProfiler:
+    """
+    Captura acotada en el tiempo del perfil de un hilo, sin reiniciar.
+
+    - "muestreo": un hilo aparte toma la pila del hilo perfilado cada
+      interval_s (sys._current_frames) y cuenta las pilas. El costo no
+      depende de lo que haga el hilo, así que sirve en producción. Las
+      muestras con el hilo esperando en el event loop de Qt (sin código
+      Python) se cuentan como "(inactivo)".
+    - "cprofile": cProfile determinista. Mide cada llamada (con más
+      sobrecarga). cProfile solo ve el estado de hilo donde se habilita, y
+      en un QThread cada llamada desde el event loop usa uno nuevo, así que
+      el trabajo a perfilar se ejecuta con call() (en "muestreo", call() solo
+      llama a la función).
+
+    finish() escribe '<base>.txt' (resumen legible, con la tabla de etapas
+    si se entrega) y '<base>.pilas' (pilas colapsadas, para flamegraph.pl o
+    speedscope) o '<base>.prof' (pstats, para snakeviz).
+    """
+
+    def __init__(self, mode, duration_s, base_path, interval_s=0.005):
+        """
+        :param mode: "muestreo" o "cprofile"
+        :param duration_s: Duración de la captura
+        :param base_path: Ruta de los archivos sin extensión
+        :param interval_s: Intervalo de muestreo (solo "muestreo")
+        """
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"Modo de perfilado desconocido: {mode}")
+        self.mode = mode
+        self.duration_s = float(duration_s)
+        self.base_path = base_path
+        self.interval_s = interval_s
+
+        self.deadline = None
+        self.profile = None
+        self.sampler = None
+        self.stop_event = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+
+    def start(self):
+        """Comienza la captura del hilo que llama."""
+        self.deadline = time.perf_counter() + self.duration_s
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+        else:
+            self.sampler = threading.Thread(
+                target=self.sample_loop,
+                args=(threading.get_ident(),),
+                name="perfilador",
+                daemon=True,
+            )
+            self.sampler.start()
+
+    def call(self, function):
+        """Ejecuta function dentro de la captura (con cProfile habilitado si corresponde)."""
+        if self.profile is not None:
+            return self.profile.runcall(function)
+        return function()
+
+    def sample_loop(self, thread_id):
+        """Toma muestras de la pila de thread_id hasta el final de la captura."""
+        while not self.stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack)) or "(inactivo)"] += 1
+            self.samples += 1
+            if time.perf_counter() >= self.deadline:
+                break
+
+    def finish(self, header=""):
+        """
+        Termina la captura y escribe los archivos.
+
+        :param header: Texto al inicio del resumen (p. ej. la tabla de etapas)
+        :return: Ruta del resumen '<base>.txt'
+        """
+        os.makedirs(os.path.dirname(self.base_path) or ".", exist_ok=True)
+        summary_path = self.base_path + ".txt"
+        if self.mode == "cprofile":
+            self.profile.dump_stats(self.base_path + ".prof")
+            report = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=report)
+            stats.sort_stats("cumulative").print_stats(40)
+            body = report.getvalue()
+        else:
+            self.stop_event.set()
+            self.sampler.join()
+            with open(self.base_path + ".pilas", "w", encoding="utf-8") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            body = self.sample_summary()
+
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(f"Perfil '{self.mode}' de {self.duration_s:g} s\n\n")
+            if header:
+                f.write(header + "\n")
+            f.write(body)
+        return summary_path
+
+    def sample_summary(self, top=30):
+        """Funciones con más muestras: propias (tope de la pila) e inclusivas."""
+        if self.samples == 0:
+            return "Sin muestras\n"
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            functions = stack.split(";")
+            own[functions[-1]] += count
+            for function in set(functions):
+                inclusive[function] += count
+
+        lines = [
+            f"{self.samples} muestras cada {self.interval_s * 1000:g} ms",
+            "",
+            f"{'propias %':>10} {'inclusivas %':>13}  función",
+        ]
+        for function, count in own.most_common(top):
+            lines.append(
+                f"{100.0 * count / self.samples:>10.1f} "
+                f"{100.0 * inclusive[function] / self.samples:>13.1f}  {function}"
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,336 @@
+import json
+import os
+import sys
+import wave
+from abc import ABCMeta, abstractmethod
+from datetime import datetime
+
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from src.audio_worker import AudioWorker
+from src.measurement_pipeline import MeasurementPipeline
+from src.session_report import load_csv_session, load_sqlite_session
+
+try:
+    import soundfile
+except ImportError:  # soundfile es opcional: sin él solo se reproducen archivos WAV
+    soundfile = None
+
+REPLAY_SPEEDS = (1, 2, 5, 10, 30, 60, 100)
+
+
+class ReplayWorkerMeta(type(QObject), ABCMeta):
+    """Metaclase de QObject que admite métodos abstractos (abc)."""
+
+
+class ReplayWorker(QObject, metaclass=ReplayWorkerMeta):
+    """
+    Fuente de mediciones grabadas para la misma vista que el AudioWorker.
+
+    Emite new_measurement_dba como el worker en vivo, a razón de un valor por
+    tick de UPDATE_INTERVAL_MS, avanzando speed veces ese tiempo de la sesión
+    por tick. seek() y set_speed() se pueden llamar desde la interfaz: solo
+    guardan el pedido, que se aplica en el tick siguiente dentro del hilo del
+    worker. Al llegar al final la reproducción queda en pausa (se puede
+    volver a buscar otra posición).
+
+    Es una clase abstracta: cada fuente implementa open(), seek_to() y
+    advance() (ver LogReplayWorker y AudioFileReplayWorker).
+    """
+
+    new_measurement_dba = pyqtSignal(float)
+    new_replay_position = pyqtSignal(dict)
+    error_signal = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    UPDATE_INTERVAL_MS = AudioWorker.UPDATE_INTERVAL_MS
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.speed = 1.0
+        self.paused = False
+        self.pending_seek = None
+
+        # Posición y límites en segundos locales (ver session_report.py)
+        self.start = 0.0
+        self.end = 0.0
+        self.position = 0.0
+
+        self.timer = None
+        self._running = False
+
+    def set_speed(self, speed):
+        """Cambia la velocidad de reproducción (1x a 100x)."""
+        self.speed = float(min(max(speed, REPLAY_SPEEDS[0]), REPLAY_SPEEDS[-1]))
+
+    def set_paused(self, paused):
+        """Pausa o reanuda la reproducción."""
+        self.paused = paused
+
+    def seek(self, position):
+        """Pide ir a una posición (segundos locales); se aplica en el tick siguiente."""
+        self.pending_seek = float(min(max(position, self.start), self.end))
+
+    def run(self):
+        """Abre la fuente y arranca el timer (en el hilo del worker)."""
+        try:
+            self.open()
+            self._running = True
+            self.timer = QTimer()
+            self.timer.timeout.connect(self.tick)
+            self.timer.start(self.UPDATE_INTERVAL_MS)
+            print(f"Reproducción iniciada: {self.path}")
+            self.emit_position()
+        except Exception as e:
+            error_msg = f"No se pudo abrir la sesión: {e}"
+            print(error_msg, file=sys.stderr)
+            self.error_signal.emit(error_msg)
+            self.finished.emit()
+
+    def tick(self):
+        """Aplica los pedidos pendientes y avanza un tick de reproducción."""
+        if not self._running:
+            return
+        try:
+            if self.pending_seek is not None:
+                position, self.pending_seek = self.pending_seek, None
+                self.seek_to(position)
+                self.emit_position()
+            if self.paused or self.position >= self.end:
+                return
+            step = self.speed * self.UPDATE_INTERVAL_MS / 1000.0
+            self.advance(min(step, self.end - self.position))
+            self.emit_position()
+        except Exception as e:
+            print(f"Error en la reproducción: {e}", file=sys.stderr)
+            import traceback
+
+            traceback.print_exc()
+
+    def emit_position(self):
+        """Informa la posición actual a la interfaz."""
+        self.new_replay_position.emit(
+            {
+                "posicion": self.position,
+                "inicio": self.start,
+                "fin": self.end,
+                "terminado": self.position >= self.end,
+            }
+        )
+
+    def stop(self):
+        """Detiene la reproducción y cierra la fuente."""
+        print("Deteniendo reproducción...")
+        self._running = False
+        if self.timer and self.timer.isActive():
+            self.timer.stop()
+        self.close()
+
+    @abstractmethod
+    def open(self):
+        """Abre la fuente y fija start, end y position."""
+
+    @abstractmethod
+    def seek_to(self, position):
+        """Mueve la fuente a una posición (segundos locales)."""
+
+    @abstractmethod
+    def advance(self, seconds):
+        """Avanza la fuente y emite las mediciones del tramo."""
+
+    def close(self):
+        """Libera la fuente."""
+
+
+class LogReplayWorker(ReplayWorker):
+    """
+    Reproducción de un log CSV o de una base SQLite.
+
+    La sesión se carga una vez en arrays (ver session_report.py); el índice
+    es el propio array ordenado de tiempos, así que buscar es un
+    searchsorted. Cada tick emite el Leq de las mediciones del tramo
+    avanzado (a 1x, la medición del tick), con la energía acumulada
+    precalculada: el costo por tick no depende de la velocidad.
+    """
+
+    def __init__(self, path, tipo_local=None):
+        super().__init__(path)
+        self.tipo_local = tipo_local
+        self.seconds = None
+        self.cum_energy = None
+        self.cum_duration = None
+        self.index = 0
+
+    def open(self):
+        if self.path.lower().endswith((".db", ".sqlite")):
+            session = load_sqlite_session(self.path, self.tipo_local)
+        else:
+            session = load_csv_session(self.path, self.tipo_local)
+        # El CSV tiene resolución de 1 s: las filas de un mismo segundo se
+        # ubican una tras otra según su duración (ver row_durations)
+        elapsed = np.concatenate(([0.0], np.cumsum(session.durations)[:-1]))
+        first_in_second = np.searchsorted(session.seconds, session.seconds)
+        self.seconds = session.seconds + elapsed - elapsed[first_in_second]
+        energy = session.durations * 10.0 ** (session.levels / 10.0)
+        self.cum_energy = np.concatenate(([0.0], np.cumsum(energy)))
+        self.cum_duration = np.concatenate(([0.0], np.cumsum(session.durations)))
+        self.start = float(self.seconds[0])
+        self.end = float(session.seconds[-1] + session.durations[-1])
+        self.position = self.start
+        self.index = 0
+
+    def seek_to(self, position):
+        self.position = position
+        self.index = int(np.searchsorted(self.seconds, position, side="left"))
+
+    def advance(self, seconds):
+        self.position += seconds
+        end_index = int(np.searchsorted(self.seconds, self.position, side="left"))
+        if end_index > self.index:
+            duration = self.cum_duration[end_index] - self.cum_duration[self.index]
+            energy = self.cum_energy[end_index] - self.cum_energy[self.index]
+            self.index = end_index
+            if duration > 0 and energy > 0:
+                self.new_measurement_dba.emit(float(10.0 * np.log10(energy / duration)))
+
+
+class AudioFileReplayWorker(ReplayWorker):
+    """
+    Reproducción de un archivo de audio (WAV, o FLAC con 'soundfile') pasado
+    por la misma cadena de medición que el audio en vivo.
+
+    El audio se procesa en tramos de UPDATE_INTERVAL_MS, como en vivo, y de
+    cada tick se emite la última medición; a 100x son 100 tramos por tick,
+    muy por debajo del tiempo real. Para buscar se salta directamente a la
+    muestra (seek del archivo) y se procesa PREROLL_S antes sin emitir, para
+    que los filtros y la ponderación temporal se asienten.
+    """
+
+    new_weighted_levels = pyqtSignal(dict)
+    new_peak_metrics = pyqtSignal(dict)
+    new_loudness = pyqtSignal(dict)
+    new_input_health = pyqtSignal(dict)
+
+    PREROLL_S = 2.0
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.reader = None
+        self.sample_rate = None
+        self.frames = 0
+        self.frame_position = 0
+        self.pipeline = None
+
+    def open(self):
+        if self.path.lower().endswith(".wav"):
+            self.reader = wave.open(self.path, "rb")
+            if self.reader.getsampwidth() != 2:
+                raise ValueError("Solo se reproducen WAV PCM de 16 bits sin 'soundfile'")
+            self.sample_rate = self.reader.getframerate()
+            self.frames = self.reader.getnframes()
+        elif soundfile is not None:
+            self.reader = soundfile.SoundFile(self.path)
+            self.sample_rate = self.reader.samplerate
+            self.frames = self.reader.frames
+        else:
+            raise ValueError("Se necesita 'soundfile' para reproducir archivos que no son WAV")
+
+        self.pipeline = MeasurementPipeline(
+            self.sample_rate,
+            AudioWorker.CALIBRATION_OFFSET_DB,
+            AudioWorker.TIME_WEIGHTING,
+            AudioWorker.SILENCE_THRESHOLD_DB,
+            AudioWorker.PEAK_INTERVAL_S,
+        )
+        self.chunk = int(self.sample_rate * self.UPDATE_INTERVAL_MS / 1000)
+        self.start = self.recorded_start()
+        self.end = self.start + self.frames / self.sample_rate
+        self.position = self.start
+        self.frame_position = 0
+
+    def recorded_start(self):
+        """
+        Hora de inicio del archivo (segundos locales), tomada de 'segmentos.jsonl'
+        del archivo continuo si existe; si no, 0 (la posición es el tiempo
+        transcurrido).
+        """
+        index_path = os.path.join(os.path.dirname(self.path), "segmentos.jsonl")
+        name = os.path.basename(self.path)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        segment = json.loads(line)
+                    except ValueError:
+                        continue
+                    if segment.get("archivo") == name:
+                        start = datetime.fromisoformat(segment["inicio"])
+                        return (start - datetime(1970, 1, 1)).total_seconds()
+        return 0.0
+
+    def read(self, frames):
+        """Lee frames muestras (canal 0) como float32."""
+        if isinstance(self.reader, wave.Wave_read):
+            raw = np.frombuffer(self.reader.readframes(frames), dtype="<i2")
+            channels = self.reader.getnchannels()
+            return raw[::channels].astype(np.float32) / 32768.0
+        data = self.reader.read(frames, dtype="float32", always_2d=True)
+        return data[:, 0]
+
+    def set_frame(self, frame):
+        """Posiciona el archivo en una muestra."""
+        if isinstance(self.reader, wave.Wave_read):
+            self.reader.setpos(frame)
+        else:
+            self.reader.seek(frame)
+        self.frame_position = frame
+
+    def seek_to(self, position):
+        target = int(round((position - self.start) * self.sample_rate))
+        target = min(max(target, 0), self.frames)
+        preroll = min(target, int(self.PREROLL_S * self.sample_rate))
+        self.set_frame(target - preroll)
+        self.pipeline.reset()
+        while preroll > 0:
+            audio = self.read(min(self.chunk, preroll))
+            if len(audio) == 0:
+                break
+            self.pipeline.process(audio)
+            preroll -= len(audio)
+        self.frame_position = target
+        self.position = self.start + target / self.sample_rate
+
+    def advance(self, seconds):
+        remaining = int(round(seconds * self.sample_rate))
+        result = None
+        while remaining > 0:
+            audio = self.read(min(self.chunk, remaining))
+            if len(audio) == 0:
+                self.position = self.end
+                break
+            result = self.pipeline.process(audio)
+            remaining -= len(audio)
+            self.frame_position += len(audio)
+        else:
+            self.position = self.start + self.frame_position / self.sample_rate
+
+        if result is not None:
+            self.new_weighted_levels.emit(result["ponderaciones"])
+            self.new_peak_metrics.emit(result["picos"])
+            self.new_loudness.emit(result["sonoridad"])
+            self.new_input_health.emit(result["salud"])
+            if result["nivel_dba"] is not None:
+                self.new_measurement_dba.emit(result["nivel_dba"])
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+def create_replay_worker(path):
+    """Crea el worker de reproducción adecuado para el archivo."""
+    if path.lower().endswith((".csv", ".db", ".sqlite")):
+        return LogReplayWorker(path)
+    return AudioFileReplayWorker(path)
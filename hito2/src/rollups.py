@@ -0,0 +1,445 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+RESOLUTIONS = ("minuto", "hora", "dia")
+
+# Histograma de niveles: bins de 0.1 dB entre 0 y 140 dB, ponderado por tiempo
+HIST_RESOLUTION_DB = 0.1
+HIST_MAX_DB = 140.0
+HIST_BINS = int(HIST_MAX_DB / HIST_RESOLUTION_DB)
+
+# Percentiles Ln reportados (nivel superado el n% del tiempo)
+LN_PERCENTS = (10, 50, 90)
+
+
+def interval_start(timestamp, resolution):
+    """
+    Inicio del intervalo (hora local) que contiene un timestamp.
+
+    :param timestamp: Tiempo en segundos epoch
+    :param resolution: "minuto", "hora" o "dia"
+    :return: Inicio del intervalo en segundos epoch
+    """
+    dt = datetime.fromtimestamp(timestamp)
+    if resolution == "minuto":
+        dt = dt.replace(second=0, microsecond=0)
+    elif resolution == "hora":
+        dt = dt.replace(minute=0, second=0, microsecond=0)
+    elif resolution == "dia":
+        dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError(f"Resolución desconocida: {resolution}")
+    return dt.timestamp()
+
+
+def interval_end(start, resolution):
+    """
+    Fin (exclusivo) del intervalo que comienza en start.
+
+    :param start: Inicio del intervalo en segundos epoch
+    :param resolution: "minuto", "hora" o "dia"
+    :return: Fin del intervalo en segundos epoch
+    """
+    if resolution == "minuto":
+        return start + 60.0
+    if resolution == "hora":
+        return start + 3600.0
+    # Los días se calculan en hora local para respetar cambios de horario
+    dt = datetime.fromtimestamp(start) + timedelta(days=1)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+class IntervalAggregate:
+    """
+    Agregado de un intervalo cerrado o en curso.
+
+    Guarda la suma de energía ponderada por tiempo (para el Leq), Lmax, Lmin,
+    el tiempo sobre el umbral y un histograma de niveles ponderado por tiempo
+    (para los Ln). Todos los campos son sumas, máximos o mínimos, así que dos
+    agregados del mismo intervalo (de distintos medidores o de antes y después
+    de un reinicio) se combinan con merge() sin volver a los datos crudos.
+    """
+
+    def __init__(self, resolution, start, end, threshold=None):
+        self.resolution = resolution
+        self.start = start
+        self.end = end
+        self.threshold = threshold
+
+        self.energy = 0.0
+        self.duration = 0.0
+        self.n = 0
+        self.lmax = None
+        self.lmin = None
+        self.exceedance = 0.0
+        self.gaps = 0.0
+        self.histogram = np.zeros(HIST_BINS, dtype=np.float64)
+
+    def add(self, level, dt):
+        """
+        Incorpora una medición.
+
+        :param level: Nivel en dBA
+        :param dt: Duración representada por la medición (segundos)
+        """
+        self.energy += dt * 10.0 ** (level / 10.0)
+        self.duration += dt
+        self.n += 1
+        if self.lmax is None or level > self.lmax:
+            self.lmax = level
+        if self.lmin is None or level < self.lmin:
+            self.lmin = level
+        if self.threshold is not None and level > self.threshold:
+            self.exceedance += dt
+
+        idx = int(level / HIST_RESOLUTION_DB)
+        if idx < 0:
+            idx = 0
+        elif idx >= HIST_BINS:
+            idx = HIST_BINS - 1
+        self.histogram[idx] += dt
+
+    def add_many(self, levels, dt):
+        """
+        Incorpora un lote de mediciones (versión vectorizada de add()).
+
+        :param levels: Array de niveles en dBA
+        :param dt: Array (o escalar) con la duración de cada medición (segundos)
+        """
+        if len(levels) == 0:
+            return
+        dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), levels.shape)
+
+        self.energy += float(np.dot(dt, 10.0 ** (levels / 10.0)))
+        self.duration += float(dt.sum())
+        self.n += len(levels)
+        batch_max = float(levels.max())
+        batch_min = float(levels.min())
+        self.lmax = batch_max if self.lmax is None else max(self.lmax, batch_max)
+        self.lmin = batch_min if self.lmin is None else min(self.lmin, batch_min)
+        if self.threshold is not None:
+            self.exceedance += float(dt[levels > self.threshold].sum())
+
+        idx = np.clip((levels / HIST_RESOLUTION_DB).astype(np.int64), 0, HIST_BINS - 1)
+        self.histogram += np.bincount(idx, weights=dt, minlength=HIST_BINS)
+
+    def merge(self, other):
+        """
+        Combina otro agregado en este (mismo intervalo o sub-intervalo).
+
+        Si los umbrales difieren, el tiempo de excedencia se recalcula desde el
+        histograma con el umbral de este agregado.
+
+        :param other: IntervalAggregate a combinar
+        """
+        self.gaps += other.gaps
+        if other.n == 0:
+            return
+
+        self.energy += other.energy
+        self.duration += other.duration
+        self.n += other.n
+        self.lmax = other.lmax if self.lmax is None else max(self.lmax, other.lmax)
+        self.lmin = other.lmin if self.lmin is None else min(self.lmin, other.lmin)
+        self.histogram += other.histogram
+
+        if other.threshold == self.threshold:
+            self.exceedance += other.exceedance
+        elif self.threshold is not None:
+            self.exceedance = self.time_above(self.threshold)
+
+    @property
+    def leq(self):
+        """Nivel equivalente del intervalo (promedio energético)."""
+        if self.duration <= 0 or self.energy <= 0:
+            return None
+        return 10.0 * np.log10(self.energy / self.duration)
+
+    @property
+    def coverage(self):
+        """Porcentaje del intervalo con audio medido."""
+        return 100.0 * min(self.duration / (self.end - self.start), 1.0)
+
+    def time_above(self, level):
+        """Tiempo (s) sobre un nivel, con la resolución del histograma."""
+        first_bin = int(np.floor(level / HIST_RESOLUTION_DB)) + 1
+        return float(self.histogram[max(first_bin, 0) :].sum())
+
+    def ln(self, percent):
+        """
+        Nivel superado durante el percent% del tiempo (L10, L50, L90...).
+
+        :param percent: Porcentaje de tiempo (0-100)
+        :return: Nivel en dBA (centro del bin) o None si no hay datos
+        """
+        total = self.histogram.sum()
+        if total <= 0:
+            return None
+        # Acumular desde los niveles altos hacia los bajos
+        from_top = np.cumsum(self.histogram[::-1])
+        idx = int(np.searchsorted(from_top, total * percent / 100.0))
+        bin_idx = HIST_BINS - 1 - min(idx, HIST_BINS - 1)
+        return round((bin_idx + 0.5) * HIST_RESOLUTION_DB, 2)
+
+    def to_dict(self):
+        """Serializa el agregado (histograma disperso) para JSON."""
+        nonzero = np.flatnonzero(self.histogram)
+        return {
+            "resolucion": self.resolution,
+            "inicio": datetime.fromtimestamp(self.start).isoformat(),
+            "inicio_epoch": self.start,
+            "fin_epoch": self.end,
+            "leq": None if self.leq is None else round(self.leq, 2),
+            "lmax": self.lmax,
+            "lmin": self.lmin,
+            **{f"l{p}": self.ln(p) for p in LN_PERCENTS},
+            "n": self.n,
+            "duracion_s": self.duration,
+            "umbral": self.threshold,
+            "excedencia_s": self.exceedance,
+            "huecos_s": self.gaps,
+            "cobertura": round(self.coverage, 2),
+            "energia": self.energy,
+            "histograma": {
+                str(int(i)): float(self.histogram[i]) for i in nonzero
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye un agregado serializado con to_dict()."""
+        agg = cls(
+            data["resolucion"], data["inicio_epoch"], data["fin_epoch"], data["umbral"]
+        )
+        agg.energy = data["energia"]
+        agg.duration = data["duracion_s"]
+        agg.n = data["n"]
+        agg.lmax = data["lmax"]
+        agg.lmin = data["lmin"]
+        agg.exceedance = data["excedencia_s"]
+        agg.gaps = data.get("huecos_s", 0.0)
+        for idx, seconds in data["histograma"].items():
+            agg.histogram[int(idx)] = seconds
+        return agg
+
+
+class RollupEngine:
+    """
+    Etapa de agregación incremental alimentada por el flujo de mediciones.
+
+    Tiene la interfaz publish()/flush()/close() de los publicadores del
+    AudioWorker. Por cada medición solo se actualiza el agregado del minuto en
+    curso; al cerrar un minuto se combina en la hora, y al cerrar una hora en
+    el día. Cada intervalo cerrado se agrega como una línea JSON al archivo de
+    salida. El estado de los intervalos abiertos se guarda en disco, de modo
+    que al reiniciar se continúa combinando en lugar de empezar de cero.
+    """
+
+    def __init__(self, output_path, threshold=None, sample_seconds=0.1, on_closed=None):
+        self.output_path = output_path
+        self.state_path = output_path + ".estado.json"
+        self.threshold = threshold
+        self.sample_seconds = sample_seconds
+        self.on_closed = on_closed
+
+        # Agregados abiertos por resolución
+        self.current = {}
+        self.current_end = float("-inf")
+        self.load_state()
+
+    def set_threshold(self, threshold):
+        """Cambia el umbral de excedencia (aplica a las mediciones siguientes)."""
+        self.threshold = threshold
+        for agg in self.current.values():
+            if agg.threshold != threshold:
+                agg.threshold = threshold
+                agg.exceedance = agg.time_above(threshold) if threshold is not None else 0.0
+
+    def publish(self, timestamp, dba, dt=None, *_):
+        """Recibe una medición del flujo (interfaz de publicador)."""
+        self.update(timestamp, dba, dt)
+
+    def record_gap(self, start, end, reason):
+        """
+        Registra un tramo sin audio: no aporta energía ni duración, solo se
+        suma a los huecos de los minutos que cubre (y por merge, de la hora y
+        el día), para que el Leq informe qué parte del intervalo cubre. El
+        tramo se corta en los bordes de minuto, cerrando los minutos que
+        quedan atrás.
+
+        :param start: Inicio del hueco (segundos epoch)
+        :param end: Fin del hueco (segundos epoch)
+        :param reason: Motivo ("overflow", "descarte", ...)
+        """
+        while start < end:
+            if start >= self.current_end:
+                self.roll(start)
+            piece_end = min(end, self.current_end)
+            self.current["minuto"].gaps += piece_end - start
+            start = piece_end
+
+    def flush(self):
+        """Nada que enviar: los intervalos se escriben al cerrarse."""
+
+    def update(self, timestamp, level, dt=None):
+        """
+        Incorpora una medición, cerrando los intervalos que hayan terminado.
+
+        :param timestamp: Tiempo de la medición (segundos epoch)
+        :param level: Nivel en dBA
+        :param dt: Duración representada (por defecto, sample_seconds)
+        """
+        if timestamp >= self.current_end:
+            self.roll(timestamp)
+        self.current["minuto"].add(level, self.sample_seconds if dt is None else dt)
+
+    def roll(self, timestamp):
+        """Cierra los intervalos terminados y abre los nuevos."""
+        closed = []
+        minute = self.current.get("minuto")
+        hour = self.current.get("hora")
+        day = self.current.get("dia")
+
+        if minute is not None and timestamp >= minute.end:
+            closed.append(minute)
+            if hour is not None and minute.start >= hour.start and minute.end <= hour.end:
+                hour.merge(minute)
+            self.current.pop("minuto")
+
+        if hour is not None and timestamp >= hour.end:
+            closed.append(hour)
+            if day is not None and hour.start >= day.start and hour.end <= day.end:
+                day.merge(hour)
+            self.current.pop("hora")
+
+        if day is not None and timestamp >= day.end:
+            closed.append(day)
+            self.current.pop("dia")
+
+        for resolution in RESOLUTIONS:
+            if resolution not in self.current:
+                start = interval_start(timestamp, resolution)
+                self.current[resolution] = IntervalAggregate(
+                    resolution, start, interval_end(start, resolution), self.threshold
+                )
+
+        self.current_end = self.current["minuto"].end
+        self.emit_closed(closed)
+        self.save_state()
+
+    def emit_closed(self, closed):
+        """Escribe los intervalos cerrados y avisa al callback."""
+        closed = [agg for agg in closed if agg.n > 0 or agg.gaps > 0]
+        if not closed:
+            return
+        try:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                for agg in closed:
+                    f.write(json.dumps(agg.to_dict(), ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"Error al escribir agregados: {e}", file=sys.stderr)
+
+        if self.on_closed is not None:
+            for agg in closed:
+                self.on_closed(agg)
+
+    def save_state(self):
+        """Guarda los intervalos abiertos para continuar tras un reinicio."""
+        state = {res: agg.to_dict() for res, agg in self.current.items()}
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"Error al guardar estado de agregados: {e}", file=sys.stderr)
+
+    def load_state(self):
+        """
+        Recupera los intervalos abiertos guardados. Los que ya terminaron se
+        cierran y escriben; los vigentes se siguen completando.
+        """
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Advertencia: No se pudo leer el estado de agregados: {e}")
+            return
+
+        self.current = {
+            res: IntervalAggregate.from_dict(data)
+            for res, data in state.items()
+            if res in RESOLUTIONS
+        }
+        if set(self.current) == set(RESOLUTIONS):
+            self.current_end = self.current["minuto"].end
+        else:
+            self.current = {}
+        self.roll(time.time())
+
+    def close(self):
+        """Guarda el estado de los intervalos abiertos."""
+        if self.current:
+            self.save_state()
+
+
+def load_aggregates(paths, resolution=None):
+    """
+    Lee agregados cerrados de uno o más archivos JSON lines y combina los que
+    corresponden al mismo intervalo (distintos medidores o reinicios).
+
+    :param paths: Lista de rutas de archivos de agregados
+    :param resolution: Filtrar por resolución (None = todas)
+    :return: Lista de IntervalAggregate ordenada por resolución e inicio
+    """
+    merged = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if resolution is not None and data["resolucion"] != resolution:
+                    continue
+                agg = IntervalAggregate.from_dict(data)
+                key = (agg.resolution, agg.start)
+                if key in merged:
+                    merged[key].merge(agg)
+                else:
+                    merged[key] = agg
+    return [merged[k] for k in sorted(merged)]
+
+
+def main():
+    """Combina e imprime agregados de uno o más medidores."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Combina agregados por intervalo")
+    parser.add_argument("archivos", nargs="+", help="Archivos rollups.jsonl")
+    parser.add_argument("--resolucion", choices=RESOLUTIONS, default="hora")
+    args = parser.parse_args()
+
+    def fmt(value):
+        # Los intervalos con solo huecos no tienen niveles: campo vacío
+        return "" if value is None else f"{value:.1f}"
+
+    print("inicio,leq,lmax,lmin,l10,l50,l90,duracion_s,excedencia_s")
+    for agg in load_aggregates(args.archivos, args.resolucion):
+        d = agg.to_dict()
+        print(
+            f"{d['inicio']},{'' if d['leq'] is None else d['leq']},"
+            f"{fmt(d['lmax'])},{fmt(d['lmin'])},"
+            f"{fmt(d['l10'])},{fmt(d['l50'])},{fmt(d['l90'])},"
+            f"{d['duracion_s']:.1f},{d['excedencia_s']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+import csv
+import html
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from src.compliance import (
+    DEFAULT_SCHEDULE,
+    PERIODS,
+    epoch_to_local_seconds,
+    parse_hhmm,
+    period_buckets,
+)
+from src.log_analytics import CSV_HEADER, parse_block, row_durations, venue_limits
+from src.rollups import HIST_BINS, HIST_RESOLUTION_DB, LN_PERCENTS
+
+# Tamaño del gráfico de historia temporal (px)
+CHART_WIDTH = 1000
+CHART_HEIGHT = 280
+CHART_MARGIN = 40
+
+
+class SessionData:
+    """
+    Serie completa de una sesión de medición, en arrays.
+
+    Los tiempos son segundos "locales" (hora local expresada como segundos
+    desde 1970, sin zona horaria), igual que en src/log_analytics.py.
+    """
+
+    def __init__(self, seconds, levels, classes, durations, venues, gaps):
+        """
+        :param seconds: Tiempo local de cada medición (float64)
+        :param levels: Nivel en dBA de cada medición
+        :param classes: Código (ord) de la clasificación de cada medición, 0 = sin dato
+        :param durations: Duración representada por cada medición (s)
+        :param venues: dict {tipo de local: segundos medidos}
+        :param gaps: Lista de (inicio local, fin local, motivo) de huecos de audio
+        """
+        self.seconds = seconds
+        self.levels = levels
+        self.classes = classes
+        self.durations = durations
+        self.venues = venues
+        self.gaps = gaps
+
+    @property
+    def venue(self):
+        """Tipo de local con más tiempo medido."""
+        if not self.venues:
+            return None
+        return max(self.venues, key=self.venues.get)
+
+
+def local_datetime(local_seconds):
+    """Convierte segundos locales a datetime (sin zona horaria)."""
+    return datetime(1970, 1, 1) + timedelta(seconds=float(local_seconds))
+
+
+def load_csv_session(path, tipo_local=None):
+    """
+    Lee un log CSV mapeado en memoria y lo convierte a columnas de una vez.
+
+    :param path: Ruta del log CSV
+    :param tipo_local: Filtrar por tipo de local (None = todos)
+    :return: SessionData
+    """
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    offset = 0
+    if bytes(data[: len(CSV_HEADER)]) == CSV_HEADER:
+        offset = int(np.argmax(data == 10)) + 1
+    parsed = parse_block(data[offset:]) if len(data) > offset else None
+    if parsed is None:
+        raise ValueError(f"El log no tiene mediciones válidas: {path}")
+    _, seconds, levels, classes, venue_codes, venue_names = parsed
+
+    # Cada segundo del log se reparte entre sus filas; los segundos sin filas
+    # (la aplicación detenida) no suman tiempo
+    durations = row_durations(seconds)
+
+    if tipo_local is not None:
+        if tipo_local not in venue_names:
+            raise ValueError(f"El log no tiene mediciones de '{tipo_local}'")
+        mask = venue_codes == venue_names.index(tipo_local)
+        seconds, levels, classes = seconds[mask], levels[mask], classes[mask]
+        durations, venue_codes = durations[mask], venue_codes[mask]
+    venue_seconds = np.bincount(venue_codes, weights=durations, minlength=len(venue_names))
+    venues = {
+        name: float(venue_seconds[code])
+        for code, name in enumerate(venue_names)
+        if venue_seconds[code] > 0
+    }
+
+    gaps = load_csv_gaps(os.path.splitext(path)[0] + "_huecos.csv")
+    return SessionData(
+        seconds.astype(np.float64), levels, classes, durations, venues, gaps
+    )
+
+
+def load_csv_gaps(path):
+    """Lee el archivo de huecos que acompaña al log CSV (si existe)."""
+    if not os.path.exists(path):
+        return []
+    epoch = datetime(1970, 1, 1)
+    gaps = []
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            start = (datetime.fromisoformat(row["inicio"]) - epoch).total_seconds()
+            end = (datetime.fromisoformat(row["fin"]) - epoch).total_seconds()
+            gaps.append((start, end, row["motivo"]))
+    return gaps
+
+
+def load_sqlite_session(db_path, tipo_local=None):
+    """
+    Lee una sesión de la base SQLite (ver measurement_store.py).
+
+    La consulta devuelve solo números (la clasificación como código con
+    unicode()), así que el resultado pasa a un array en una sola conversión.
+
+    :param db_path: Ruta de la base
+    :param tipo_local: Filtrar por tipo de local (None = todos)
+    :return: SessionData
+    """
+    local_filter, params = "", []
+    if tipo_local is not None:
+        local_filter, params = " WHERE tipo_local = ?", [tipo_local]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT timestamp, nivel_dba, COALESCE(unicode(clasificacion), 0) "
+            f"FROM mediciones{local_filter} ORDER BY timestamp",
+            params,
+        ).fetchall()
+        venue_rows = conn.execute(
+            f"SELECT tipo_local, COUNT(*) FROM mediciones{local_filter} GROUP BY tipo_local",
+            params,
+        ).fetchall()
+        try:
+            gap_rows = conn.execute(
+                "SELECT inicio, fin, motivo FROM huecos ORDER BY inicio"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            gap_rows = []
+    finally:
+        conn.close()
+
+    data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    if len(data) == 0:
+        raise ValueError(f"La base no tiene mediciones: {db_path}")
+    seconds = epoch_to_local_seconds(data[:, 0])
+
+    # Duración de cada fila: el paso hasta la siguiente, acotado para que
+    # las pausas largas no cuenten como medición
+    steps = np.diff(seconds)
+    typical = float(np.median(steps[steps > 0])) if np.any(steps > 0) else 0.1
+    durations = np.minimum(np.append(steps, typical), 2.0 * typical)
+
+    total_rows = sum(count for _, count in venue_rows) or 1
+    total_seconds = float(durations.sum())
+    venues = {
+        name: total_seconds * count / total_rows for name, count in venue_rows if name
+    }
+
+    gaps = []
+    if gap_rows:
+        gap_data = np.array([(start, end) for start, end, _ in gap_rows], dtype=np.float64)
+        local = epoch_to_local_seconds(gap_data.ravel()).reshape(-1, 2)
+        gaps = [
+            (float(start), float(end), row[2]) for (start, end), row in zip(local, gap_rows)
+        ]
+    return SessionData(
+        seconds, data[:, 1], data[:, 2].astype(np.int64), durations, venues, gaps
+    )
+
+
+def grouped_statistics(keys, levels, durations, n_keys):
+    """
+    Leq, Lmax, Lmin, Ln y duración por grupo, sin recorrer los grupos.
+
+    El histograma de niveles por grupo es un solo bincount sobre
+    (grupo, bin de 0.1 dB); los Ln salen de su suma acumulada.
+
+    :param keys: Grupo de cada medición (0 .. n_keys-1)
+    :param levels: Niveles en dBA
+    :param durations: Duración de cada medición (s)
+    :param n_keys: Cantidad de grupos
+    :return: dict de arrays (una posición por grupo; NaN si el grupo está vacío)
+    """
+    duration = np.bincount(keys, weights=durations, minlength=n_keys)
+    energy = np.bincount(keys, weights=durations * 10.0 ** (levels / 10.0), minlength=n_keys)
+    lmax = np.full(n_keys, -np.inf)
+    lmin = np.full(n_keys, np.inf)
+    np.maximum.at(lmax, keys, levels)
+    np.minimum.at(lmin, keys, levels)
+
+    bins = np.clip((levels / HIST_RESOLUTION_DB).astype(np.int64), 0, HIST_BINS - 1)
+    histogram = np.bincount(
+        keys * HIST_BINS + bins, weights=durations, minlength=n_keys * HIST_BINS
+    ).reshape(n_keys, HIST_BINS)
+    from_top = np.cumsum(histogram[:, ::-1], axis=1)
+
+    empty = duration <= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats = {
+            "duracion_s": duration,
+            "leq": np.where(empty, np.nan, 10.0 * np.log10(energy / duration)),
+            "lmax": np.where(empty, np.nan, lmax),
+            "lmin": np.where(empty, np.nan, lmin),
+        }
+    for percent in LN_PERCENTS:
+        idx = np.argmax(from_top >= (duration * percent / 100.0)[:, None], axis=1)
+        value = (HIST_BINS - 1 - idx + 0.5) * HIST_RESOLUTION_DB
+        stats[f"l{percent}"] = np.where(empty, np.nan, value)
+    return stats
+
+
+def find_exceedances(seconds, levels, durations, limit, merge_s=2.0, min_s=1.0):
+    """
+    Tramos sobre el límite (vectorizado).
+
+    Las mediciones consecutivas sobre el límite forman un tramo; tramos
+    separados por menos de merge_s se unen (el Leq y el Lmax del tramo
+    incluyen lo que quedó entre ellos), y se descartan los más cortos que
+    min_s.
+
+    :return: Lista de dicts con inicio, fin, duracion_s, lmax y leq
+    """
+    above = levels > limit
+    if not above.any():
+        return []
+    edges = np.diff(np.concatenate(([0], above.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # exclusivo
+
+    # Unir tramos cercanos: se conserva un inicio si lo separa del fin
+    # anterior al menos merge_s
+    if len(starts) > 1:
+        separation = seconds[starts[1:]] - (seconds[ends[:-1] - 1] + durations[ends[:-1] - 1])
+        keep = np.concatenate(([True], separation >= merge_s))
+        starts = starts[keep]
+        ends = np.append(ends[np.flatnonzero(keep)[1:] - 1], ends[-1])
+
+    # Estadísticos por tramo: sumas acumuladas y reduceat sobre [inicio, fin)
+    cum_duration = np.concatenate(([0.0], np.cumsum(durations)))
+    cum_energy = np.concatenate(([0.0], np.cumsum(durations * 10.0 ** (levels / 10.0))))
+    seg_duration = cum_duration[ends] - cum_duration[starts]
+    seg_energy = cum_energy[ends] - cum_energy[starts]
+    padded = np.append(levels, -np.inf)
+    seg_max = np.maximum.reduceat(padded, np.ravel(np.column_stack((starts, ends))))[::2]
+    spans = seconds[ends - 1] + durations[ends - 1] - seconds[starts]
+
+    events = []
+    for i in np.flatnonzero(spans >= min_s).tolist():
+        events.append(
+            {
+                "inicio": float(seconds[starts[i]]),
+                "fin": float(seconds[ends[i] - 1] + durations[ends[i] - 1]),
+                "duracion_s": float(spans[i]),
+                "lmax": float(seg_max[i]),
+                "leq": float(10.0 * np.log10(seg_energy[i] / seg_duration[i])),
+            }
+        )
+    return events
+
+
+def build_report(session, tipos_locales, limit=None, criterio="nivel_max", schedule=None):
+    """
+    Calcula todo el contenido del reporte.
+
+    :param session: SessionData
+    :param tipos_locales: Contenido de 'tipos_locales.json'
+    :param limit: Límite para la lista de excedencias (None = el del tipo de local)
+    :param criterio: "nivel_max" (clasificación base) o "limite_d" para el límite
+    :param schedule: dict con "inicio_diurno" y "inicio_nocturno" ("HH:MM")
+    :return: dict con las secciones del reporte
+    """
+    schedule = schedule or DEFAULT_SCHEDULE
+    seconds, levels, durations = session.seconds, session.levels, session.durations
+    venue = session.venue
+    profile = next(
+        (t for t in tipos_locales.get("tipos_locales", []) if t["nombre"] == venue), None
+    )
+    if limit is None and venue is not None:
+        limit = venue_limits(tipos_locales, criterio).get(venue)
+
+    # Total, por hora y por período D.S. 38
+    total = grouped_statistics(np.zeros(len(levels), dtype=np.int64), levels, durations, 1)
+    hours = np.floor(seconds / 3600.0).astype(np.int64)
+    first_hour = int(hours[0])
+    hourly = grouped_statistics(
+        hours - first_hour, levels, durations, int(hours[-1]) - first_hour + 1
+    )
+    period_day, is_night = period_buckets(
+        seconds,
+        parse_hhmm(schedule.get("inicio_diurno", DEFAULT_SCHEDULE["inicio_diurno"])),
+        parse_hhmm(schedule.get("inicio_nocturno", DEFAULT_SCHEDULE["inicio_nocturno"])),
+    )
+    period_keys = period_day * 2 + is_night
+    first_period = int(period_keys.min())
+    periods = grouped_statistics(
+        period_keys - first_period,
+        levels,
+        durations,
+        int(period_keys.max()) - first_period + 1,
+    )
+
+    # Tiempo por clasificación
+    class_seconds = np.bincount(session.classes, weights=durations, minlength=256)
+    measured = float(durations.sum())
+
+    gap_seconds = float(sum(end - start for start, end, _ in session.gaps))
+    span = float(seconds[-1] + durations[-1] - seconds[0])
+    return {
+        "inicio": float(seconds[0]),
+        "fin": float(seconds[0] + span),
+        "medido_s": measured,
+        "huecos_s": gap_seconds,
+        "huecos": session.gaps,
+        "tipo_local": venue,
+        "tipos_medidos": session.venues,
+        "perfil": profile,
+        "limite": limit,
+        "total": {k: float(v[0]) for k, v in total.items()},
+        "horas": [
+            {"inicio": (first_hour + i) * 3600.0, **{k: float(v[i]) for k, v in hourly.items()}}
+            for i in np.flatnonzero(hourly["duracion_s"] > 0).tolist()
+        ],
+        "periodos": [
+            {
+                "fecha": local_datetime(((first_period + i) // 2) * 86400.0).date().isoformat(),
+                "periodo": PERIODS[(first_period + i) % 2],
+                **{k: float(v[i]) for k, v in periods.items()},
+            }
+            for i in np.flatnonzero(periods["duracion_s"] > 0).tolist()
+        ],
+        "clasificaciones": {
+            chr(code): float(class_seconds[code])
+            for code in np.flatnonzero(class_seconds).tolist()
+            if code
+        },
+        "clasificaciones_info": tipos_locales.get("clasificaciones", {}),
+        "excedencias": []
+        if limit is None
+        else find_exceedances(seconds, levels, durations, limit),
+    }
+
+
+def time_history_svg(session, limit=None):
+    """
+    Gráfico de historia temporal como SVG.
+
+    Por cada columna de píxeles se dibuja la franja mínimo-máximo (con
+    reduceat sobre los cortes de cada columna) y encima el Leq por minuto.
+    Los huecos de audio se marcan en gris.
+    """
+    seconds, levels, durations = session.seconds, session.levels, session.durations
+    t0 = float(seconds[0])
+    span = max(float(seconds[-1] + durations[-1]) - t0, 1.0)
+    plot_w = CHART_WIDTH - 2 * CHART_MARGIN
+    plot_h = CHART_HEIGHT - 2 * CHART_MARGIN
+    lo = float(np.floor(min(levels.min(), limit if limit is not None else np.inf) / 10.0) * 10)
+    hi = float(np.ceil(max(levels.max(), limit if limit is not None else -np.inf) / 10.0) * 10)
+    hi = max(hi, lo + 10.0)
+
+    def x_of(t):
+        return CHART_MARGIN + (np.asarray(t) - t0) / span * plot_w
+
+    def y_of(level):
+        return CHART_MARGIN + (hi - np.asarray(level)) / (hi - lo) * plot_h
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{CHART_WIDTH}" '
+        f'height="{CHART_HEIGHT}" font-family="sans-serif" font-size="11">',
+        f'<rect x="{CHART_MARGIN}" y="{CHART_MARGIN}" width="{plot_w}" height="{plot_h}" '
+        'fill="#fafafa" stroke="#ccc"/>',
+    ]
+    for start, end, _ in session.gaps:
+        x0, x1 = x_of(start), x_of(end)
+        parts.append(
+            f'<rect x="{x0:.1f}" y="{CHART_MARGIN}" width="{max(x1 - x0, 1.0):.1f}" '
+            f'height="{plot_h}" fill="#ddd"/>'
+        )
+
+    # Franja mínimo-máximo por columna
+    columns = np.clip(((seconds - t0) / span * plot_w).astype(np.int64), 0, plot_w - 1)
+    col_starts = np.flatnonzero(np.concatenate(([True], np.diff(columns) != 0)))
+    col_max = np.maximum.reduceat(levels, col_starts)
+    col_min = np.minimum.reduceat(levels, col_starts)
+    xs = CHART_MARGIN + columns[col_starts] + 0.5
+    upper = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, y_of(col_max)))
+    lower = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs[::-1], y_of(col_min[::-1])))
+    parts.append(f'<polygon points="{upper} {lower}" fill="#90caf9" stroke="none"/>')
+
+    # Leq por minuto
+    minutes = np.floor((seconds - t0) / 60.0).astype(np.int64)
+    energy = np.bincount(minutes, weights=durations * 10.0 ** (levels / 10.0))
+    duration = np.bincount(minutes, weights=durations)
+    present = np.flatnonzero(duration > 0)
+    minute_leq = 10.0 * np.log10(energy[present] / duration[present])
+    points = " ".join(
+        f"{x:.1f},{y:.1f}"
+        for x, y in zip(x_of(t0 + (present + 0.5) * 60.0), y_of(minute_leq))
+    )
+    parts.append(f'<polyline points="{points}" fill="none" stroke="#1565c0" stroke-width="1.5"/>')
+
+    if limit is not None:
+        y = float(y_of(limit))
+        parts.append(
+            f'<line x1="{CHART_MARGIN}" x2="{CHART_MARGIN + plot_w}" y1="{y:.1f}" '
+            f'y2="{y:.1f}" stroke="#F44336" stroke-dasharray="6,4"/>'
+        )
+
+    # Ejes
+    for level in np.arange(lo, hi + 0.1, 10.0):
+        y = float(y_of(level))
+        parts.append(
+            f'<text x="{CHART_MARGIN - 6}" y="{y + 4:.1f}" text-anchor="end">{level:.0f}</text>'
+        )
+    step = 3600.0 if span > 3 * 3600 else 600.0 if span > 1800 else 60.0
+    first_tick = np.ceil(t0 / step) * step
+    for tick in np.arange(first_tick, t0 + span + 1e-9, step):
+        x = float(x_of(tick))
+        parts.append(
+            f'<text x="{x:.1f}" y="{CHART_HEIGHT - CHART_MARGIN + 16}" text-anchor="middle">'
+            f"{local_datetime(tick):%H:%M}</text>"
+        )
+    parts.append(
+        f'<text x="{CHART_MARGIN}" y="{CHART_MARGIN - 10}">dBA · franja: mín-máx, '
+        "línea: Leq por minuto</text></svg>"
+    )
+    return "\n".join(parts)
+
+
+def render_html(report, chart_svg):
+    """Arma el documento HTML (autocontenido, imprimible a PDF desde el navegador)."""
+
+    def fmt(value, digits=1):
+        if value is None or (isinstance(value, float) and not np.isfinite(value)):
+            return "--"
+        return f"{value:.{digits}f}"
+
+    def hms(seconds):
+        seconds = int(round(seconds))
+        return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def row(cells, tag="td"):
+        return "<tr>" + "".join(f"<{tag}>{html.escape(str(c))}</{tag}>" for c in cells) + "</tr>"
+
+    stat_header = ["Leq", "Lmax", "Lmin", *[f"L{p}" for p in LN_PERCENTS], "Duración"]
+
+    def stat_cells(stats):
+        return [
+            fmt(stats["leq"]),
+            fmt(stats["lmax"]),
+            fmt(stats["lmin"]),
+            *[fmt(stats[f"l{p}"]) for p in LN_PERCENTS],
+            hms(stats["duracion_s"]),
+        ]
+
+    start = local_datetime(report["inicio"])
+    end = local_datetime(report["fin"])
+    coverage = 100.0 * report["medido_s"] / max(report["medido_s"] + report["huecos_s"], 1e-9)
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="es"><head><meta charset="utf-8">',
+        f"<title>Reporte de sesión {start:%Y-%m-%d %H:%M}</title>",
+        "<style>body{font-family:sans-serif;margin:24px;color:#333}"
+        "table{border-collapse:collapse;margin:8px 0 20px}"
+        "td,th{border:1px solid #ddd;padding:4px 10px;text-align:right}"
+        "th{background:#f5f5f5}td:first-child,th:first-child{text-align:left}"
+        "h2{margin-top:28px;border-bottom:1px solid #eee}</style></head><body>",
+        "<h1>Reporte de Sesión de Medición</h1>",
+        f"<p>{start:%Y-%m-%d %H:%M:%S} — {end:%Y-%m-%d %H:%M:%S} · "
+        f"medido {hms(report['medido_s'])} · huecos de audio {hms(report['huecos_s'])} "
+        f"({len(report['huecos'])}) · cobertura {coverage:.1f}%</p>",
+        "<h2>Historia Temporal</h2>",
+        chart_svg,
+        "<h2>Resumen</h2><table>",
+        row(["", *stat_header], "th"),
+        row(["Sesión", *stat_cells(report["total"])]),
+        "</table>",
+        "<h2>Por Período (D.S. 38)</h2><table>",
+        row(["Fecha", "Período", *stat_header], "th"),
+    ]
+    out += [row([p["fecha"], p["periodo"], *stat_cells(p)]) for p in report["periodos"]]
+    out += ["</table>", "<h2>Por Hora</h2><table>", row(["Hora", *stat_header], "th")]
+    out += [
+        row([f"{local_datetime(h['inicio']):%Y-%m-%d %H:00}", *stat_cells(h)])
+        for h in report["horas"]
+    ]
+    out += ["</table>", "<h2>Tiempo por Clasificación</h2><table>"]
+    out.append(row(["Clasificación", "Descripción", "Tiempo", "%"], "th"))
+    for key, seconds in sorted(report["clasificaciones"].items()):
+        info = report["clasificaciones_info"].get(key, {})
+        out.append(
+            row(
+                [
+                    key,
+                    info.get("descripcion", ""),
+                    hms(seconds),
+                    fmt(100.0 * seconds / max(report["medido_s"], 1e-9)),
+                ]
+            )
+        )
+    out.append("</table>")
+
+    out.append("<h2>Tipo de Local</h2>")
+    profile = report["perfil"]
+    if profile is None:
+        out.append(f"<p>{html.escape(str(report['tipo_local'] or 'No especificado'))}</p>")
+    else:
+        out.append("<table>")
+        out.append(row(["Nombre", profile["nombre"]]))
+        out.append(row(["Superficie", f"{profile['superficie_m2']} m²"]))
+        out.append(
+            row(
+                [
+                    "Nivel de ruido típico",
+                    f"{profile['nivel_ruido_min']}-{profile['nivel_ruido_max']} dB(A)",
+                ]
+            )
+        )
+        out.append(row(["Límite D", f"{profile['limite_d']} dB"]))
+        out.append(row(["Clasificación base", profile["clasificacion_base"]]))
+        out.append("</table>")
+    others = [name for name in report["tipos_medidos"] if name != report["tipo_local"]]
+    if others:
+        out.append(f"<p>También hay mediciones de: {html.escape(', '.join(others))}</p>")
+
+    out.append("<h2>Excedencias</h2>")
+    if report["limite"] is None:
+        out.append("<p>Sin límite definido para el tipo de local.</p>")
+    elif not report["excedencias"]:
+        out.append(f"<p>Sin excedencias sobre {fmt(report['limite'])} dBA.</p>")
+    else:
+        total = sum(e["duracion_s"] for e in report["excedencias"])
+        out.append(
+            f"<p>{len(report['excedencias'])} excedencias sobre {fmt(report['limite'])} dBA, "
+            f"{hms(total)} en total.</p><table>"
+        )
+        out.append(row(["Inicio", "Fin", "Duración", "Lmax", "Leq"], "th"))
+        for e in report["excedencias"]:
+            out.append(
+                row(
+                    [
+                        f"{local_datetime(e['inicio']):%Y-%m-%d %H:%M:%S}",
+                        f"{local_datetime(e['fin']):%H:%M:%S}",
+                        hms(e["duracion_s"]),
+                        fmt(e["lmax"]),
+                        fmt(e["leq"]),
+                    ]
+                )
+            )
+        out.append("</table>")
+
+    out.append(f"<p><small>Generado el {datetime.now():%Y-%m-%d %H:%M:%S}</small></p>")
+    out.append("</body></html>")
+    return "\n".join(out)
+
+
+def main():
+    """Genera el reporte HTML de una sesión a partir del log CSV o de la base SQLite."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reporte de una sesión de medición")
+    parser.add_argument("log", help="Log CSV o base SQLite (.db, .sqlite)")
+    parser.add_argument("--salida", help="Archivo HTML (por defecto, junto al log)")
+    parser.add_argument("--tipos", default="tipos_locales.json", help="Archivo de tipos de local")
+    parser.add_argument("--config", default="config_zonas.json", help="Horarios diurno/nocturno")
+    parser.add_argument("--local", help="Filtrar por tipo de local")
+    parser.add_argument("--criterio", choices=("nivel_max", "limite_d"), default="nivel_max")
+    parser.add_argument("--limite", type=float, help="Límite para las excedencias (dBA)")
+    args = parser.parse_args()
+
+    try:
+        with open(args.tipos, "r", encoding="utf-8") as f:
+            tipos_locales = json.load(f)
+    except Exception as e:
+        print(f"Advertencia: No se pudo cargar '{args.tipos}': {e}", file=sys.stderr)
+        tipos_locales = {}
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
+            schedule = json.load(f).get("horarios")
+    except FileNotFoundError:
+        schedule = None
+
+    started = time.perf_counter()
+    if args.log.lower().endswith((".db", ".sqlite")):
+        session = load_sqlite_session(args.log, args.local)
+    else:
+        session = load_csv_session(args.log, args.local)
+    loaded = time.perf_counter()
+
+    report = build_report(session, tipos_locales, args.limite, args.criterio, schedule)
+    document = render_html(report, time_history_svg(session, report["limite"]))
+    output = args.salida or os.path.splitext(args.log)[0] + "_reporte.html"
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(document)
+    finished = time.perf_counter()
+
+    print(
+        f"Reporte escrito en {output}: {len(session.levels)} mediciones, "
+        f"lectura {loaded - started:.2f} s, cálculo {finished - loaded:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
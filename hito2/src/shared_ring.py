@@ -0,0 +1,122 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedRing:
+    """
+    Buffer circular en memoria compartida entre procesos.
+
+    Un único proceso escribe; cualquier cantidad de lectores (en el mismo u
+    otros procesos) lleva su propia posición. Las posiciones son absolutas
+    (elementos desde el inicio) y la de escritura se publica en la cabecera
+    después de copiar los datos, así que un lector sabe qué hay disponible y
+    si se quedó atrás más de lo que el buffer guarda.
+
+    La cabecera tiene además contadores libres (int64) que el escritor puede
+    usar para informar estadísticas (overflows, bloques, etc.).
+    """
+
+    HEADER_SLOTS = 8
+
+    def __init__(self, capacity, dtype, name=None):
+        """
+        Crea un buffer nuevo (name=None) o se conecta a uno existente.
+
+        :param capacity: Elementos que guarda el buffer
+        :param dtype: dtype de cada elemento (puede ser estructurado)
+        :param name: Nombre del bloque de memoria compartida existente
+        """
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        header_bytes = self.HEADER_SLOTS * 8
+        size = header_bytes + self.capacity * self.dtype.itemsize
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # Los procesos hijos comparten el resource_tracker del creador,
+            # así que conectarse no agrega un segundo dueño del bloque
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((self.HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray(
+            (self.capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=header_bytes
+        )
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        """Nombre del bloque de memoria compartida (para conectarse desde otro proceso)."""
+        return self.shm.name
+
+    @property
+    def position(self):
+        """Posición absoluta de escritura."""
+        return int(self.header[0])
+
+    def write(self, items):
+        """
+        Escribe elementos al final del buffer (solo el proceso escritor).
+
+        :param items: Array 1-D del dtype del buffer
+        """
+        n = len(items)
+        position = int(self.header[0])
+        if n >= self.capacity:
+            items = items[-self.capacity :]
+            position += n - self.capacity
+            n = self.capacity
+
+        idx = position % self.capacity
+        first = min(n, self.capacity - idx)
+        self.data[idx : idx + first] = items[:first]
+        if first < n:
+            self.data[: n - first] = items[first:]
+        self.header[0] = position + n
+
+    def read(self, position, max_items=None):
+        """
+        Copia todo lo escrito desde una posición.
+
+        :param position: Posición absoluta del lector
+        :param max_items: Máximo de elementos a leer (None = todos)
+        :return: (nueva posición, array copiado, elementos perdidos por rezago)
+        """
+        end = int(self.header[0])
+        if max_items is not None:
+            end = min(end, position + max_items)
+        lost = 0
+        oldest = end - self.capacity
+        if position < oldest:
+            lost = oldest - position
+            position = oldest
+        if end <= position:
+            return position, self.data[:0].copy(), lost
+
+        n = end - position
+        idx = position % self.capacity
+        first = min(n, self.capacity - idx)
+        items = np.empty(n, dtype=self.dtype)
+        items[:first] = self.data[idx : idx + first]
+        items[first:] = self.data[: n - first]
+
+        # Descartar lo que el escritor haya sobrescrito mientras se copiaba
+        oldest = int(self.header[0]) - self.capacity
+        if position < oldest:
+            lost += oldest - position
+            items = items[oldest - position :]
+        return end, items, lost
+
+    def close(self):
+        """Desconecta este proceso del bloque (y lo libera si es el creador)."""
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,387 @@
+import argparse
+import collections
+import contextlib
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from src.synthetic_audio import synthetic_signal
+
+try:
+    import psutil
+except ImportError:  # psutil es opcional: sin él el RSS se lee de /proc
+    psutil = None
+
+# Configuración por defecto de la prueba: todas las etapas que acumulan estado
+# por medición, salvo el archivo continuo (ocuparía GB por día simulado)
+DEFAULT_SOAK_CONFIG = {
+    "agregados": {"habilitado": True, "archivo": "rollups.jsonl"},
+    "eventos": {"habilitado": True, "directorio": "eventos"},
+    "exposicion": {"habilitado": True, "criterios": ["ds594", "osha"]},
+}
+
+# Crecimiento tolerado entre el primer y el último tercio de la prueba
+DEFAULT_TOLERANCES = {
+    "rss_mb": 16.0,
+    "tracemalloc_mb": 4.0,
+    "cpu_pct": 15.0,
+    "ocupacion": 100.0,
+}
+
+
+class SyntheticSignal:
+    """
+    Entrada sintética: un tramo de ruido con tono y ráfagas que se repite,
+    con un nivel que sigue el horario simulado (tranquilo de día, fuerte de
+    noche) y un bloque de ceros cada tanto, para que el estado de la entrada,
+    los eventos y los turnos de exposición también trabajen.
+    """
+
+    LOOP_S = 30.0
+    DROPOUT_EVERY_BLOCKS = 6000
+
+    def __init__(self, sample_rate, start_time):
+        self.sample_rate = sample_rate
+        self.start_time = start_time
+        self.loop = synthetic_signal(self.LOOP_S, sample_rate=sample_rate)
+        self.position = 0
+        self.blocks = 0
+
+    def next_block(self, frames):
+        """Próximo bloque (frames, 1) float32."""
+        index = (self.position + np.arange(frames)) % len(self.loop)
+        self.position += frames
+        self.blocks += 1
+        if self.blocks % self.DROPOUT_EVERY_BLOCKS == 0:
+            return np.zeros((frames, 1), dtype=np.float32)
+
+        simulated = self.start_time + self.position / self.sample_rate
+        hour = time.localtime(simulated).tm_hour
+        gain = 1.0 if hour >= 22 or hour < 5 else 0.1
+        return (gain * self.loop[index]).reshape(-1, 1)
+
+
+class SyntheticInputStream:
+    """
+    Reemplazo de sd.InputStream para la prueba: un hilo que entrega bloques
+    sintéticos al callback a speed veces el tiempo real.
+    """
+
+    def __init__(self, samplerate, blocksize, callback, signal, speed, **_):
+        self.sample_rate = samplerate
+        self.block_size = blocksize
+        self.callback = callback
+        self.signal = signal
+        self.speed = speed
+        self._running = False
+        self.thread = None
+
+    def start(self):
+        self._running = True
+        self.thread = threading.Thread(target=self.feed_loop, daemon=True)
+        self.thread.start()
+
+    def feed_loop(self):
+        """Entrega bloques con un plazo fijo por bloque (sin acumular deriva)."""
+        period = self.block_size / self.sample_rate / self.speed
+        deadline = time.perf_counter()
+        while self._running:
+            self.callback(self.signal.next_block(self.block_size), self.block_size, None, None)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -1.0:
+                # Sin CPU para la velocidad pedida: seguir desde ahora
+                deadline = time.perf_counter()
+
+    def stop(self):
+        self._running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+
+    def close(self):
+        pass
+
+
+def soak_worker_class(speed, signal):
+    """
+    AudioWorker acelerado: la entrada es sintética y el timer de procesamiento
+    corre speed veces más seguido, así que cada tick sigue procesando 100 ms
+    de audio y los tiempos de las mediciones (reloj de muestras) avanzan
+    speed veces más rápido que el reloj del sistema.
+    """
+    from src.audio_worker import AudioWorker
+
+    interval_ms = max(1, int(round(AudioWorker.UPDATE_INTERVAL_MS / speed)))
+    effective_speed = AudioWorker.UPDATE_INTERVAL_MS / interval_ms
+
+    class SoakAudioWorker(AudioWorker):
+        UPDATE_INTERVAL_MS = interval_ms
+
+        def run(self):
+            self.device_id = "sintetico"
+            super().run()
+
+        def open_stream(self):
+            self.stream = SyntheticInputStream(
+                self.SAMPLE_RATE, self.block_size, self.audio_callback, signal, effective_speed
+            )
+            self.stream.start()
+
+        def resync_timeline(self, wall_time, sample):
+            # El reloj de muestras adelanta a propósito al del sistema: solo se ancla
+            if self.timeline.anchor_time is None:
+                self.timeline.set_anchor(wall_time, sample)
+
+    return SoakAudioWorker, effective_speed
+
+
+def resident_mb():
+    """Memoria residente del proceso (MB)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    with open("/proc/self/statm", "r") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def container_sizes(owners):
+    """
+    Ocupación de colas, listas, deques y dicts de los objetos del motor.
+
+    :param owners: dict {nombre: objeto}
+    :return: dict {"objeto.atributo": elementos}
+    """
+    sizes = {}
+    for owner_name, owner in owners.items():
+        for name, value in list(vars(owner).items()):
+            if isinstance(value, (queue.Queue, queue.SimpleQueue)):
+                sizes[f"{owner_name}.{name}"] = value.qsize()
+            elif isinstance(value, (list, dict, collections.deque)):
+                sizes[f"{owner_name}.{name}"] = len(value)
+    return sizes
+
+
+def engine_objects(window):
+    """Objetos del motor cuya ocupación se sigue: ventana, worker, publicadores y taps."""
+    owners = {"MainWindow": window}
+    worker = window.worker
+    if worker is not None:
+        owners["AudioWorker"] = worker
+        for item in worker.publishers + worker.audio_taps:
+            owners.setdefault(type(item).__name__, item)
+    if window.measurement_store is not None:
+        owners["MeasurementStore"] = window.measurement_store
+    return owners
+
+
+class SoakSampler:
+    """Muestras periódicas de memoria, CPU y ocupaciones durante la prueba."""
+
+    def __init__(self, window, start_time, trace):
+        self.window = window
+        self.start_time = start_time
+        self.trace = trace
+        self.samples = []
+        self.baseline = None
+        self.last_wall = time.perf_counter()
+        self.last_cpu = time.process_time()
+
+    def sample(self):
+        """Toma una muestra (se llama desde el hilo de la interfaz)."""
+        now = time.perf_counter()
+        cpu = time.process_time()
+        worker = self.window.worker
+        simulated = (
+            worker.timeline.time_at(worker.timeline.next_sample)
+            if worker is not None and worker.timeline.anchor_time is not None
+            else self.start_time
+        )
+        sample = {
+            "horas_simuladas": (simulated - self.start_time) / 3600.0,
+            "rss_mb": resident_mb(),
+            "cpu_pct": 100.0 * (cpu - self.last_cpu) / max(now - self.last_wall, 1e-9),
+        }
+        if self.trace:
+            sample["tracemalloc_mb"] = tracemalloc.get_traced_memory()[0] / 1e6
+        for name, size in container_sizes(engine_objects(self.window)).items():
+            sample[f"ocupacion:{name}"] = size
+        self.last_wall, self.last_cpu = now, cpu
+        self.samples.append(sample)
+        return sample
+
+    def take_baseline(self):
+        """Guarda la instantánea de tracemalloc del fin del calentamiento."""
+        if self.trace:
+            self.baseline = tracemalloc.take_snapshot()
+
+    def top_growth(self, limit=10):
+        """Líneas con más memoria nueva desde el calentamiento (tracemalloc)."""
+        if not self.trace or self.baseline is None:
+            return []
+        # Sin las asignaciones de tracemalloc y de la propia prueba
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        )
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        return snapshot.compare_to(self.baseline.filter_traces(ignore), "lineno")[:limit]
+
+
+def detect_drift(samples, warmup_hours, tolerances):
+    """
+    Compara la mediana del último tercio (tras el calentamiento) con la del
+    primero para cada serie.
+
+    :return: Lista de (serie, valor inicial, valor final, crecimiento, tolerancia, falla)
+    """
+    samples = [s for s in samples if s["horas_simuladas"] >= warmup_hours]
+    if len(samples) < 6:
+        return []
+    third = len(samples) // 3
+    names = sorted({name for s in samples for name in s if name != "horas_simuladas"})
+    results = []
+    for name in names:
+        values = np.array([s.get(name, np.nan) for s in samples], dtype=np.float64)
+        first = float(np.nanmedian(values[:third]))
+        last = float(np.nanmedian(values[-third:]))
+        tolerance = tolerances[name.split(":")[0]]
+        growth = last - first
+        results.append((name, first, last, growth, tolerance, growth > tolerance))
+    return results
+
+
+def main():
+    """Prueba de larga duración del motor y la interfaz con entrada sintética."""
+    parser = argparse.ArgumentParser(
+        description="Prueba de larga duración (soak) con entrada sintética acelerada"
+    )
+    parser.add_argument("--horas", type=float, default=48.0, help="Horas simuladas")
+    parser.add_argument("--velocidad", type=float, default=50.0, help="Veces el tiempo real")
+    parser.add_argument("--intervalo", type=float, default=30.0, help="Segundos reales entre muestras")
+    parser.add_argument("--calentamiento", type=float, default=1.0, help="Horas simuladas descartadas")
+    parser.add_argument("--directorio", help="Directorio de trabajo (por defecto, uno temporal)")
+    parser.add_argument("--config", help="config_zonas.json a usar en lugar del de la prueba")
+    parser.add_argument("--log", default="soak.db", help="Registro histórico (.db o .csv)")
+    parser.add_argument("--sin-tracemalloc", action="store_true", help="No seguir asignaciones")
+    for name, value in DEFAULT_TOLERANCES.items():
+        parser.add_argument(
+            f"--tolerancia-{name.replace('_', '-')}", type=float, default=value,
+            help=f"Crecimiento máximo de {name} (por defecto {value})",
+        )
+    args = parser.parse_args()
+    tolerances = {name: getattr(args, f"tolerancia_{name}") for name in DEFAULT_TOLERANCES}
+
+    # Directorio de trabajo con la configuración de la prueba
+    source_dir = os.getcwd()
+    work_dir = args.directorio or tempfile.mkdtemp(prefix="soak_")
+    os.makedirs(work_dir, exist_ok=True)
+    if args.config:
+        shutil.copy(args.config, os.path.join(work_dir, "config_zonas.json"))
+    else:
+        with open(os.path.join(work_dir, "config_zonas.json"), "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_SOAK_CONFIG, f, ensure_ascii=False, indent=2)
+    if os.path.exists(os.path.join(source_dir, "tipos_locales.json")):
+        shutil.copy(os.path.join(source_dir, "tipos_locales.json"), work_dir)
+    os.chdir(work_dir)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    trace = not args.sin_tracemalloc
+    if trace:
+        tracemalloc.start(1)
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    from src import main_window
+    from src.audio_worker import AudioWorker
+
+    start_time = time.time()
+    signal = SyntheticSignal(AudioWorker.SAMPLE_RATE, start_time)
+    worker_class, speed = soak_worker_class(args.velocidad, signal)
+    main_window.AudioWorker = worker_class
+    wall_seconds = args.horas * 3600.0 / speed
+
+    report = sys.stderr
+    print(
+        f"Soak: {args.horas:.1f} h simuladas a {speed:.0f}x "
+        f"(~{wall_seconds / 60:.0f} min) en '{work_dir}'",
+        file=report,
+    )
+
+    # La salida del motor (mediciones, avisos) va a soak.log
+    app = QApplication([])
+    with open("soak.log", "w", encoding="utf-8") as engine_log, contextlib.redirect_stdout(
+        engine_log
+    ), contextlib.redirect_stderr(engine_log):
+        window = main_window.MainWindow()
+        window.show()
+        window.log_file_path = args.log
+        window.initialize_log_file()
+
+        sampler = SoakSampler(window, start_time, trace)
+        state = {"calentamiento": True}
+
+        def on_sample():
+            sample = sampler.sample()
+            if state["calentamiento"] and sample["horas_simuladas"] >= args.calentamiento:
+                state["calentamiento"] = False
+                sampler.take_baseline()
+            print(
+                f"  {sample['horas_simuladas']:6.2f} h · RSS {sample['rss_mb']:.1f} MB · "
+                f"CPU {sample['cpu_pct']:.0f}%",
+                file=report,
+            )
+            if sample["horas_simuladas"] >= args.horas:
+                window.close()
+                app.quit()
+
+        timer = QTimer()
+        timer.timeout.connect(on_sample)
+        timer.start(int(args.intervalo * 1000))
+        app.exec()
+
+    growth = sampler.top_growth()
+    if sampler.samples:
+        achieved = sampler.samples[-1]["horas_simuladas"] * 3600.0 / (time.time() - start_time)
+        print(f"Velocidad lograda: {achieved:.1f}x", file=report)
+    with open("soak_muestras.csv", "w", encoding="utf-8") as f:
+        names = sorted({name for s in sampler.samples for name in s})
+        f.write(",".join(names) + "\n")
+        for s in sampler.samples:
+            f.write(",".join(str(s.get(name, "")) for name in names) + "\n")
+
+    results = detect_drift(sampler.samples, args.calentamiento, tolerances)
+    if not results:
+        print("ERROR: muy pocas muestras tras el calentamiento", file=report)
+        sys.exit(1)
+
+    print(f"\n{'serie':<55} {'inicio':>10} {'fin':>10} {'crec.':>9} {'tol.':>7}", file=report)
+    failed = False
+    for name, first, last, delta, tolerance, fail in results:
+        failed |= fail
+        mark = "  DERIVA" if fail else ""
+        print(
+            f"{name:<55} {first:>10.1f} {last:>10.1f} {delta:>+9.1f} {tolerance:>7.1f}{mark}",
+            file=report,
+        )
+    if growth:
+        print("\nMayor crecimiento de memoria desde el calentamiento (tracemalloc):", file=report)
+        for stat in growth:
+            print(f"  {stat}", file=report)
+
+    if failed:
+        print("\nERROR: hay series con deriva ascendente", file=report)
+        sys.exit(1)
+    print("\nSin deriva.", file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+import pyqtgraph as pg
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class SpectrogramAnalyzer:
+    """
+    STFT incremental para el espectrograma en vivo.
+
+    El audio de cada tick se agrega a un buffer FIFO preasignado; todos los
+    frames completos (ventana de Hann con solapamiento) se obtienen como una
+    vista deslizante del FIFO, se ventanean en un buffer preasignado y se
+    transforman con una sola llamada a scipy.fft.rfft (opcionalmente con
+    varios hilos mediante 'workers').
+    """
+
+    def __init__(
+        self,
+        sample_rate,
+        calibration_offset_db,
+        frame_size=4096,
+        overlap=0.75,
+        workers=1,
+        max_chunk=65536,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop = max(1, int(frame_size * (1.0 - overlap)))
+        self.workers = workers
+        self.n_bins = frame_size // 2 + 1
+
+        self.window = np.hanning(frame_size).astype(np.float32)
+        # Escala para que un seno de amplitud 1 dé 0 dBFS RMS (+ calibración)
+        self.db_offset = (
+            calibration_offset_db
+            + 20.0 * np.log10(2.0 / self.window.sum())
+            - 20.0 * np.log10(np.sqrt(2.0))
+        )
+
+        self.fifo = np.zeros(frame_size + max_chunk, dtype=np.float32)
+        self.fill = 0
+        self.max_frames = (len(self.fifo) - frame_size) // self.hop + 1
+        self.windowed = np.empty((self.max_frames, frame_size), dtype=np.float32)
+        self.spectra = np.empty((self.max_frames, self.n_bins), dtype=np.float32)
+
+    def reset(self):
+        """Descarta el audio pendiente."""
+        self.fill = 0
+
+    def frequencies(self):
+        """Frecuencia (Hz) de cada bin."""
+        return np.fft.rfftfreq(self.frame_size, 1.0 / self.sample_rate)
+
+    def process(self, chunk):
+        """
+        Agrega audio y calcula los frames completos.
+
+        :param chunk: Audio crudo del tick
+        :return: Array (n_frames, n_bins) en dB (puede tener 0 filas)
+        """
+        n = len(chunk)
+        if self.fill + n > len(self.fifo):
+            # Bloque más grande que lo previsto: crecer una vez
+            grown = np.zeros(self.fill + n + self.frame_size, dtype=np.float32)
+            grown[: self.fill] = self.fifo[: self.fill]
+            self.fifo = grown
+            self.max_frames = (len(self.fifo) - self.frame_size) // self.hop + 1
+            self.windowed = np.empty((self.max_frames, self.frame_size), dtype=np.float32)
+            self.spectra = np.empty((self.max_frames, self.n_bins), dtype=np.float32)
+
+        self.fifo[self.fill : self.fill + n] = chunk
+        self.fill += n
+
+        if self.fill < self.frame_size:
+            return self.spectra[:0]
+
+        n_frames = (self.fill - self.frame_size) // self.hop + 1
+        frames = sliding_window_view(self.fifo[: self.fill], self.frame_size)[
+            :: self.hop
+        ][:n_frames]
+        windowed = self.windowed[:n_frames]
+        np.multiply(frames, self.window, out=windowed)
+
+        spectrum = scipy.fft.rfft(windowed, axis=1, workers=self.workers)
+        magnitude = self.spectra[:n_frames]
+        np.abs(spectrum, out=magnitude)
+        np.maximum(magnitude, 1e-10, out=magnitude)
+        np.log10(magnitude, out=magnitude)
+        magnitude *= 20.0
+        magnitude += self.db_offset
+
+        # Conservar lo que aún no forma un frame completo
+        consumed = n_frames * self.hop
+        remaining = self.fill - consumed
+        self.fifo[:remaining] = self.fifo[consumed : self.fill]
+        self.fill = remaining
+
+        return magnitude
+
+
+class SpectrogramWidget(pg.PlotWidget):
+    """
+    Panel de espectrograma con historia circular.
+
+    La imagen vive en un buffer de doble largo: cada frame se escribe en la
+    posición i y en i + historia, de modo que la ventana visible siempre es
+    una vista contigua del buffer (sin np.roll ni reconstruir la imagen). El
+    ImageItem se actualiza con esa vista y niveles fijos.
+    """
+
+    def __init__(self, n_bins, max_frequency, history_frames=400, levels=(20.0, 110.0)):
+        super().__init__()
+        self.history = history_frames
+        self.n_bins = n_bins
+        self.index = 0
+
+        self.buffer = np.full((2 * history_frames, n_bins), levels[0], dtype=np.float32)
+
+        self.image_item = pg.ImageItem(axisOrder="row-major")
+        self.image_item.setLookupTable(pg.colormap.get("inferno").getLookupTable())
+        self.image_item.setLevels(levels)
+        self.addItem(self.image_item)
+
+        # Eje x: frames (tiempo); eje y: frecuencia en Hz
+        self.image_item.setImage(self.visible(), autoLevels=False)
+        self.image_item.setRect(0, 0, history_frames, max_frequency)
+
+        self.setLabel("left", "Frecuencia", units="Hz")
+        self.setLabel("bottom", "Frames")
+        self.setMouseEnabled(x=False, y=True)
+        self.setYRange(0, min(max_frequency, 8000.0))
+        self.hideButtons()
+
+    def visible(self):
+        """Vista de los últimos 'history' frames, en orden cronológico (transpuesta)."""
+        return self.buffer[self.index : self.index + self.history].T
+
+    def add_frames(self, frames):
+        """
+        Agrega frames (n_frames, n_bins) en dB y actualiza la imagen.
+
+        :param frames: Array de espectros en dB
+        """
+        for row in frames[-self.history :]:
+            self.buffer[self.index] = row
+            self.buffer[self.index + self.history] = row
+            self.index = (self.index + 1) % self.history
+        self.image_item.updateImage(self.visible())
@@ -0,0 +1,25 @@
+import numpy as np
+
+SAMPLE_RATE = 44100
+
+
+def synthetic_signal(seconds, seed=0, sample_rate=SAMPLE_RATE):
+    """Ruido rosado aproximado + tono de 50 Hz + ráfagas, en float32."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    white = rng.standard_normal(n)
+    pink = np.cumsum(white) * 0.002
+    window = int(sample_rate / 10)
+    pink -= np.convolve(pink, np.ones(window) / window, mode="same")
+    t = np.arange(n) / sample_rate
+    signal = 0.1 * white + pink + 0.3 * np.sin(2 * np.pi * 50 * t)
+    bursts = (np.sin(2 * np.pi * 0.5 * t) > 0.9) * 0.5 * np.sin(2 * np.pi * 1000 * t)
+    return np.clip(signal + bursts, -1.0, 1.0).astype(np.float32)
+
+
+def random_partition(n, rng, max_block=9000):
+    """Cortes aleatorios de un largo n (bloques de 1 a max_block muestras)."""
+    cuts = [0]
+    while cuts[-1] < n:
+        cuts.append(min(n, cuts[-1] + int(rng.integers(1, max_block))))
+    return cuts
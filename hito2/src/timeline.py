@@ -0,0 +1,152 @@
+import time
+
+
+class SampleTimeline:
+    """
+    Línea de tiempo basada en el conteo de muestras del stream.
+
+    El callback de audio numera cada bloque con su posición (muestras desde
+    el inicio del stream, incluyendo lo perdido por overflow). Aquí se
+    comprueba que cada bloque empiece donde terminó el anterior: si no, el
+    tramo faltante se registra como hueco, con su motivo ("descarte" si el
+    bloque se perdió en la cola, "overflow" si lo perdió el dispositivo).
+
+    Los tiempos se derivan del reloj de muestras (ancla + posición / fs), así
+    que las mediciones quedan espaciadas según el audio realmente capturado
+    y no según cuándo corrió el timer de procesamiento.
+
+    El reloj del ADC no es exacto (~50 ppm son ~4 s por día), así que cada
+    RESYNC_INTERVAL_S de audio resync() compara con la hora del sistema y
+    corrige la tasa del reloj de muestras (a lo sumo MAX_SLEW) para absorber
+    la deriva sin saltos; solo un desfase mayor que STEP_LIMIT_S (hora del
+    sistema cambiada) se corrige de golpe.
+    """
+
+    RESYNC_INTERVAL_S = 600.0
+    MAX_SLEW = 500e-6
+    STEP_LIMIT_S = 2.0
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.reset()
+
+    def reset(self, start_sample=None):
+        """
+        Comienza una línea de tiempo nueva (nuevo stream).
+
+        :param start_sample: Posición esperada del primer bloque; con None se
+                             toma la del primer bloque recibido
+        """
+        self.anchor_time = None
+        self.anchor_sample = 0
+        self.rate = 1.0
+        self.origin = None
+        self.next_resync = None
+        self.next_sample = start_sample
+        self.covered_samples = 0
+        self.gap_samples = 0
+        self.gaps = 0
+
+    def set_anchor(self, wall_time, sample):
+        """
+        Fija la correspondencia entre reloj de muestras y hora.
+
+        :param wall_time: Hora (segundos epoch) de la muestra 'sample'
+        :param sample: Posición en muestras
+        """
+        self.anchor_time = wall_time
+        self.anchor_sample = sample
+        self.rate = 1.0
+        self.origin = (wall_time, sample)
+        self.next_resync = sample + int(self.RESYNC_INTERVAL_S * self.sample_rate)
+
+    def resync(self, wall_time, sample):
+        """
+        Corrige la deriva del reloj de muestras respecto de la hora del sistema.
+
+        Fija el ancla si aún no hay una. Después, cada RESYNC_INTERVAL_S de
+        audio, re-ancla en 'sample' (sin salto) con una tasa que sigue la
+        relación entre ambos relojes medida desde el ancla y absorbe el
+        desfase actual en el intervalo siguiente.
+
+        :param wall_time: Hora (segundos epoch) de la muestra 'sample'
+        :param sample: Posición en muestras
+        :return: dict de la corrección (desfase_s, ppm, salto) o None si no
+                 tocaba corregir
+        """
+        if self.anchor_time is None:
+            self.set_anchor(wall_time, sample)
+            return None
+        if sample < self.next_resync:
+            return None
+
+        offset = wall_time - self.time_at(sample)
+        if abs(offset) > self.STEP_LIMIT_S:
+            self.set_anchor(wall_time, sample)
+            return {"desfase_s": offset, "ppm": 0.0, "salto": True}
+
+        origin_time, origin_sample = self.origin
+        elapsed = (sample - origin_sample) / self.sample_rate
+        slew = (wall_time - origin_time) / elapsed - 1.0 + offset / self.RESYNC_INTERVAL_S
+        slew = min(max(slew, -self.MAX_SLEW), self.MAX_SLEW)
+        self.anchor_time = self.time_at(sample)
+        self.anchor_sample = sample
+        self.rate = 1.0 + slew
+        self.next_resync = sample + int(self.RESYNC_INTERVAL_S * self.sample_rate)
+        return {"desfase_s": offset, "ppm": slew * 1e6, "salto": False}
+
+    def time_at(self, sample):
+        """Hora (segundos epoch) de una posición en muestras."""
+        if self.anchor_time is None:
+            return time.time()
+        return self.anchor_time + (sample - self.anchor_sample) * self.rate / self.sample_rate
+
+    def add_block(self, start_sample, n_samples, reason, mark=False):
+        """
+        Registra un bloque recibido.
+
+        :param start_sample: Posición del primer sample del bloque
+        :param n_samples: Muestras del bloque
+        :param reason: Motivo a registrar si falta audio antes del bloque
+        :param mark: Registrar el hueco aunque su largo no se conozca (overflow
+                     sin tiempo ADC): queda con duración 0
+        :return: dict del hueco (inicio, fin, duracion_s, muestras, motivo) o None
+        """
+        gap = None
+        if self.next_sample is None:
+            self.next_sample = start_sample
+        if start_sample > self.next_sample or mark:
+            missing = max(start_sample - self.next_sample, 0)
+            self.gap_samples += missing
+            self.gaps += 1
+            gap = {
+                "inicio": self.time_at(self.next_sample),
+                "fin": self.time_at(start_sample),
+                "duracion_s": missing / self.sample_rate,
+                "muestras": int(missing),
+                "motivo": reason,
+            }
+        self.next_sample = start_sample + n_samples
+        self.covered_samples += n_samples
+        return gap
+
+    @property
+    def coverage(self):
+        """Porcentaje de la línea de tiempo con audio (desde el inicio del stream)."""
+        total = self.covered_samples + self.gap_samples
+        if total == 0:
+            return 100.0
+        return 100.0 * self.covered_samples / total
+
+
+def clock_correction_message(correction):
+    """Línea de consola para una corrección de SampleTimeline.resync()."""
+    if correction["salto"]:
+        return (
+            f"Reloj de muestras re-anclado: la hora del sistema saltó "
+            f"{correction['desfase_s']:+.3f} s"
+        )
+    return (
+        f"Reloj de muestras: desfase {correction['desfase_s'] * 1000:+.1f} ms respecto "
+        f"de la hora del sistema, tasa corregida {correction['ppm']:+.0f} ppm"
+    )
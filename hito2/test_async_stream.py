@@ -0,0 +1,100 @@
+"""Pruebas del flujo de mediciones para asyncio con un productor en otro hilo."""
+
+import asyncio
+
+from src.async_stream import AsyncMeasurementStream
+
+TICKS = 50
+PER_TICK = 4
+
+
+def produce(stream, ticks=TICKS, close=True):
+    """Hilo del worker: publish() de cada registro del tick y un flush() por tick."""
+    for tick in range(ticks):
+        for k in range(PER_TICK):
+            stream.publish(float(tick * PER_TICK + k), 60.0, 0.025)
+        stream.flush()
+    if close:
+        stream.close()
+
+
+async def drain(subscription):
+    return [timestamp async for timestamp, _, _ in subscription]
+
+
+def run_with_producer(consumers, **kwargs):
+    """Suscribe, corre el productor en un hilo y espera a los consumidores."""
+
+    async def scenario():
+        stream = AsyncMeasurementStream()
+        subscriptions, tasks = consumers(stream)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: produce(stream, **kwargs))
+        results = await asyncio.gather(*tasks)
+        return stream, subscriptions, results
+
+    return asyncio.run(scenario())
+
+
+def test_close_right_after_flush_delivers_every_batch():
+    def consumers(stream):
+        subscriptions = [stream.subscribe() for _ in range(3)]
+        return subscriptions, [asyncio.ensure_future(drain(s)) for s in subscriptions]
+
+    stream, subscriptions, results = run_with_producer(consumers)
+    expected = [float(i) for i in range(TICKS * PER_TICK)]
+    assert results == [expected] * 3
+    assert stream.batches_sent == TICKS
+    assert all(s.dropped == 0 for s in subscriptions)
+
+
+def test_slow_consumer_drops_oldest_and_counts_them():
+    maxsize = 30
+
+    def consumers(stream):
+        subscription = stream.subscribe(maxsize)
+
+        async def late_reader():
+            # No lee hasta que el flujo terminó: la cola se llena y rota
+            while not subscription.closed:
+                await asyncio.sleep(0.001)
+            return await drain(subscription)
+
+        return [subscription], [asyncio.ensure_future(late_reader())]
+
+    _, (subscription,), (received,) = run_with_producer(consumers)
+    total = TICKS * PER_TICK
+    assert subscription.received == total
+    assert subscription.dropped == total - maxsize
+    assert subscription.received == len(received) + subscription.dropped
+    assert received == [float(i) for i in range(total - maxsize, total)]
+
+
+def test_one_call_soon_threadsafe_per_loop_and_tick():
+    calls = []
+
+    def consumers(stream):
+        loop = asyncio.get_running_loop()
+        original = loop.call_soon_threadsafe
+
+        def counting(callback, *args):
+            calls.append(getattr(callback, "__name__", ""))
+            return original(callback, *args)
+
+        loop.call_soon_threadsafe = counting
+        subscriptions = [stream.subscribe() for _ in range(10)]
+        return subscriptions, [asyncio.ensure_future(drain(s)) for s in subscriptions]
+
+    _, subscriptions, results = run_with_producer(consumers)
+    # Un lote por tick para los 10 suscriptores, y el fin de cada uno al cerrar
+    # (las demás llamadas son del executor de la prueba)
+    assert calls.count("deliver") == TICKS
+    assert calls.count("end") == len(subscriptions)
+    assert all(len(r) == TICKS * PER_TICK for r in results)
+
+
+def test_publish_without_subscribers_keeps_nothing():
+    stream = AsyncMeasurementStream()
+    produce(stream, ticks=3, close=False)
+    assert stream.pending == []
+    assert stream.batches_sent == 0
@@ -0,0 +1,140 @@
+"""Pruebas del frame de subida al colector y de la cola del cliente."""
+
+import collections
+import socket
+import threading
+
+import numpy as np
+import pytest
+from src.collector import (
+    FRAME_LENGTH,
+    WIRE_DTYPE,
+    CollectorClient,
+    decode_uplink_payload,
+    encode_uplink_frame,
+)
+
+
+def split_frame(frame):
+    (length,) = FRAME_LENGTH.unpack_from(frame)
+    payload = frame[FRAME_LENGTH.size :]
+    assert length == len(payload)
+    return payload
+
+
+def test_uplink_frame_round_trip():
+    records = [(1_700_000_000.0 + 0.1 * k, 40.0 + k) for k in range(100)]
+    payload = split_frame(encode_uplink_frame("medidor-1", "Café Ñuñoa", records))
+
+    meter_id, venue, data, count = decode_uplink_payload(payload)
+    assert (meter_id, venue, count) == ("medidor-1", "Café Ñuñoa", 100)
+    decoded = np.frombuffer(data, dtype=WIRE_DTYPE)
+    assert np.array_equal(decoded, np.array(records, dtype=WIRE_DTYPE))
+
+
+def test_uplink_frame_truncates_long_names():
+    payload = split_frame(encode_uplink_frame("m" * 300, "", []))
+    meter_id, venue, data, count = decode_uplink_payload(payload)
+    assert (meter_id, venue, data, count) == ("m" * 255, "", b"", 0)
+
+
+def test_invalid_uplink_payloads_are_rejected():
+    payload = split_frame(encode_uplink_frame("m", "local", [(1.0, 50.0), (2.0, 60.0)]))
+    assert decode_uplink_payload(payload[:5]) is None
+    assert decode_uplink_payload(b"XXXX" + payload[4:]) is None
+    assert decode_uplink_payload(payload[:-1]) is None
+
+
+@pytest.fixture
+def client():
+    # El hilo de envío no llega a correr: los envíos se hacen desde la prueba
+    client = CollectorClient("127.0.0.1", batch_interval=3600.0, max_pending=5)
+    yield client
+    client.pending.clear()
+    client.close()
+
+
+def refuse(*_):
+    raise ConnectionRefusedError("colector no disponible")
+
+
+def test_full_queue_drops_and_counts_oldest(client):
+    for k in range(8):
+        client.publish(float(k), 50.0)
+    assert client.records_dropped == 3
+    assert [t for t, _ in client.pending] == [3.0, 4.0, 5.0, 6.0, 7.0]
+
+
+def test_failed_send_requeues_in_order(client, monkeypatch):
+    for k in range(4):
+        client.publish(float(k), 50.0)
+    monkeypatch.setattr(client, "connect", refuse)
+    with pytest.raises(OSError):
+        client.send_pending()
+    assert [t for t, _ in client.pending] == [0.0, 1.0, 2.0, 3.0]
+    assert client.records_dropped == 0
+
+
+def test_publishes_during_a_failed_send_drop_the_oldest_of_the_batch(client, monkeypatch):
+    for k in range(5):
+        client.publish(float(k), 50.0)
+
+    def publish_then_refuse():
+        # Mediciones que llegan mientras el lote está fuera de la cola
+        for k in range(5, 8):
+            client.publish(float(k), 50.0)
+        refuse()
+
+    monkeypatch.setattr(client, "connect", publish_then_refuse)
+    with pytest.raises(OSError):
+        client.send_pending()
+    assert [t for t, _ in client.pending] == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert client.records_dropped == 3
+
+
+def test_publish_during_requeue_is_counted(client, monkeypatch):
+    class RacingDeque(collections.deque):
+        def extendleft(self, records):
+            # El hilo de la interfaz publica justo cuando el lote vuelve a la cola
+            publisher = threading.Thread(target=client.publish, args=(99.0, 50.0))
+            publisher.start()
+            publisher.join(0.2)
+            super().extendleft(records)
+            threads.append(publisher)
+
+    threads = []
+    client.pending = RacingDeque(maxlen=5)
+    for k in range(5):
+        client.publish(float(k), 50.0)
+    monkeypatch.setattr(client, "connect", refuse)
+    with pytest.raises(OSError):
+        client.send_pending()
+    threads[0].join()
+
+    # Sin lock, el registro nuevo entraba primero y el reencolado lo sacaba sin contarlo
+    assert [t for t, _ in client.pending] == [1.0, 2.0, 3.0, 4.0, 99.0]
+    assert client.records_dropped == 1
+
+
+def test_sent_records_arrive_in_one_frame(client, monkeypatch):
+    ours, theirs = socket.socketpair()
+
+    def connect():
+        client.sock = ours
+
+    monkeypatch.setattr(client, "connect", connect)
+    for k in range(3):
+        client.publish(float(k), 60.0 + k)
+    client.send_pending()
+    assert (client.records_sent, client.reconnects, len(client.pending)) == (3, 1, 0)
+
+    theirs.settimeout(5.0)
+    header = theirs.recv(FRAME_LENGTH.size)
+    (length,) = FRAME_LENGTH.unpack(header)
+    payload = b""
+    while len(payload) < length:
+        payload += theirs.recv(length - len(payload))
+    _, _, data, count = decode_uplink_payload(payload)
+    assert count == 3
+    assert np.frombuffer(data, dtype=WIRE_DTYPE)["nivel_dba"].tolist() == [60.0, 61.0, 62.0]
+    theirs.close()
@@ -0,0 +1,124 @@
+"""Pruebas de la evaluación D.S. 38: períodos diurno/nocturno y corrección por fondo."""
+
+import time
+import types
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from src.compliance import ComplianceEvaluator, epoch_to_local_seconds, evaluate_periods
+
+TZ = "America/Santiago"
+LIMITS = {"diurno": 60, "nocturno": 45}
+DAY_DB, NIGHT_DB = 62.0, 44.0
+
+
+@pytest.fixture(autouse=True)
+def santiago(monkeypatch):
+    # Hora de Chile: el horario de invierno empieza el 2023-04-02 y el de
+    # verano el 2023-09-03, ambos durante la noche
+    monkeypatch.setenv("TZ", TZ)
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def local_epoch(*args):
+    return datetime(*args).timestamp()
+
+
+def minute_rows(start, hours):
+    """Una fila por minuto (paso fijo en epoch) con nivel de día o de noche."""
+    timestamps = start + 60.0 * np.arange(int(hours * 60))
+    local_hours = np.array([datetime.fromtimestamp(t).hour for t in timestamps])
+    night = (local_hours < 7) | (local_hours >= 21)
+    return timestamps, np.where(night, NIGHT_DB, DAY_DB)
+
+
+def periods(timestamps, levels, **kwargs):
+    return evaluate_periods(
+        epoch_to_local_seconds(timestamps), levels, LIMITS, row_seconds=60.0, **kwargs
+    )
+
+
+def summary(results):
+    return [(r["fecha"], r["periodo"], r["n"], r["leq"]) for r in results]
+
+
+def test_night_crosses_midnight_into_the_previous_day():
+    results = periods(*minute_rows(local_epoch(2023, 6, 10, 20, 0), 12))
+    assert summary(results) == [
+        ("2023-06-10", "diurno", 60, DAY_DB),
+        ("2023-06-10", "nocturno", 600, NIGHT_DB),
+        ("2023-06-11", "diurno", 60, DAY_DB),
+    ]
+    assert [r["cumple"] for r in results] == [False, True, False]
+    assert results[0]["minutos_sobre_limite"] == 60.0
+
+
+@pytest.mark.parametrize(
+    "night_start, night_hours",
+    [
+        ((2023, 4, 1, 21, 0), 11),  # la hora 23:00-00:00 se repite
+        ((2023, 9, 2, 21, 0), 9),  # se salta de 00:00 a 01:00
+    ],
+)
+def test_night_across_dst_change(night_start, night_hours):
+    start = local_epoch(*night_start) - 3600.0
+    end = local_epoch(*night_start) + (night_hours + 1) * 3600.0
+    results = periods(*minute_rows(start, (end - start) / 3600.0))
+    day = datetime(*night_start[:3])
+    assert summary(results) == [
+        (day.date().isoformat(), "diurno", 60, DAY_DB),
+        (day.date().isoformat(), "nocturno", night_hours * 60, NIGHT_DB),
+        ((day + timedelta(days=1)).date().isoformat(), "diurno", 60, DAY_DB),
+    ]
+
+
+def test_background_correction_decides_compliance():
+    timestamps, levels = minute_rows(local_epoch(2023, 6, 10, 10, 0), 1)
+    levels = np.full(len(levels), 61.0)
+    assert periods(timestamps, levels)[0]["cumple"] is False
+
+    # 61 dB sobre un fondo de 56 dB: corregido ~59.3 dB, bajo el límite de 60
+    corrected = periods(timestamps, levels, background_db=56.0)[0]
+    assert corrected["leq"] == 61.0
+    assert corrected["leq_corregido"] == pytest.approx(59.3)
+    assert corrected["cumple"] is True
+
+    # A menos de 3 dB del fondo el período no es válido
+    invalid = periods(timestamps, levels, background_db=59.0)[0]
+    assert invalid["leq_corregido"] is None
+    assert invalid["cumple"] is None
+
+
+def test_evaluator_corrects_with_the_current_background():
+    background = types.SimpleNamespace(background_db=None)
+    evaluator = ComplianceEvaluator(LIMITS, zone="II", background=background)
+    start = local_epoch(2023, 6, 10, 10, 0)
+    for k in range(10):
+        evaluator.update(start + 0.1 * k, 61.0)
+    assert evaluator.status["excede"] is True
+    assert evaluator.status["leq_corregido"] == pytest.approx(61.0)
+
+    background.background_db = 56.0
+    evaluator.update(start + 1.0, 61.0)
+    assert evaluator.status["fondo"] == 56.0
+    assert evaluator.status["leq_corregido"] == pytest.approx(59.35, abs=0.01)
+    assert evaluator.status["excede"] is False
+    assert evaluator.status["excede_instantaneo"] is False
+
+    background.background_db = 59.0
+    evaluator.update(start + 1.1, 61.0)
+    assert evaluator.status["leq_corregido"] is None
+    assert evaluator.status["excede"] is False
+
+
+def test_evaluator_switches_period_at_night_start():
+    evaluator = ComplianceEvaluator(LIMITS, zone="II", sample_seconds=0.1)
+    evaluator.update(local_epoch(2023, 6, 10, 20, 59, 59), 50.0)
+    assert (evaluator.status["periodo"], evaluator.status["excede"]) == ("diurno", False)
+    evaluator.update(local_epoch(2023, 6, 10, 21, 0, 0), 50.0)
+    assert (evaluator.status["periodo"], evaluator.status["excede"]) == ("nocturno", True)
+    assert evaluator.seconds == pytest.approx(0.1)
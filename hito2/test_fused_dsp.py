@@ -0,0 +1,78 @@
+"""Pruebas de la etapa de ponderación A fusionada (backends numba y NumPy)."""
+
+import numpy as np
+import pytest
+from scipy.signal import lfilter, sosfilt
+from src.fused_dsp import (
+    EMPTY_OUT,
+    AWeightingStage,
+    a_weighting_kernel,
+    fused_a_weighting_kernel,
+    numba,
+)
+from src.fused_dsp_bench import check_parity
+from src.synthetic_audio import SAMPLE_RATE, synthetic_signal
+
+PARITY_TOLERANCE = 1e-9
+
+KERNELS = [
+    pytest.param(a_weighting_kernel, id="python"),
+    pytest.param(
+        fused_a_weighting_kernel,
+        id="numba",
+        marks=pytest.mark.skipif(numba is None, reason="numba no está instalado"),
+    ),
+]
+
+
+@pytest.mark.skipif(numba is None, reason="numba no está instalado")
+def test_numba_matches_numpy_reference():
+    assert check_parity(5.0, PARITY_TOLERANCE, verbose=False) <= PARITY_TOLERANCE
+
+
+@pytest.mark.parametrize("kernel", KERNELS)
+def test_kernel_matches_sosfilt_chain(kernel):
+    # Python puro: corre siempre, aunque numba no esté instalado
+    signal = synthetic_signal(0.3)
+    reference = AWeightingStage(SAMPLE_RATE, "numpy")
+    zi = reference.zi.copy()
+    env = reference.env.copy()
+
+    for k, chunk in enumerate(np.array_split(signal, 5)):
+        expected_sq = np.empty(len(chunk))
+        expected = reference.process_numpy(chunk, expected_sq)
+        got_sq = np.empty(len(chunk))
+        out = got_sq if k % 2 == 0 else EMPTY_OUT
+        sum_sq, fast_max, slow_max = kernel(chunk, reference.sos, zi, env, reference.env_alpha, out)
+
+        got = (sum_sq / len(chunk), fast_max, slow_max)
+        assert got == pytest.approx(expected, rel=PARITY_TOLERANCE)
+        if k % 2 == 0:
+            assert np.allclose(got_sq, expected_sq, rtol=PARITY_TOLERANCE, atol=0.0)
+        assert np.allclose(zi, reference.zi, rtol=PARITY_TOLERANCE, atol=1e-15)
+        assert np.allclose(env, reference.env, rtol=PARITY_TOLERANCE, atol=0.0)
+
+
+def test_numpy_stage_matches_sosfilt_chain():
+    signal = synthetic_signal(2.0)
+    stage = AWeightingStage(SAMPLE_RATE, "numpy")
+    zi = stage.zi.copy()
+    squared = np.empty(len(signal))
+
+    mean_square, fast_max, slow_max = stage.process(signal, squared)
+
+    filtered, _ = sosfilt(stage.sos, signal, zi=zi)
+    expected = filtered * filtered
+    assert np.array_equal(squared, expected)
+    assert mean_square == pytest.approx(float(np.mean(expected)), rel=1e-12)
+    for alpha, envelope_max in zip(stage.env_alpha, (fast_max, slow_max)):
+        envelope = lfilter([alpha], [1.0, alpha - 1.0], expected)
+        assert envelope_max == pytest.approx(float(envelope.max()), rel=1e-12)
+
+
+def test_out_buffer_does_not_change_results():
+    signal = synthetic_signal(1.0)
+    with_out = AWeightingStage(SAMPLE_RATE)
+    without_out = AWeightingStage(SAMPLE_RATE, with_out.backend)
+    for chunk in np.array_split(signal, 7):
+        assert with_out.process(chunk, np.empty(len(chunk))) == without_out.process(chunk)
@@ -0,0 +1,77 @@
+"""Pruebas del análisis de logs CSV: el resultado no depende del tamaño de bloque."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from src.log_analytics import CSV_HEADER, analyze_file, parse_block, summarize
+
+VENUES = ("Bar Pequeño", "Discoteca")
+
+
+def write_log(path, seconds=400, seed=0):
+    """Log como el de la interfaz: ~10 filas por segundo con timestamp de 1 s."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 10, 16, 23, 59, 0)
+    lines = [CSV_HEADER.decode()]
+    for s in range(seconds):
+        stamp = (start + timedelta(seconds=s)).strftime("%Y-%m-%d %H:%M:%S")
+        venue = VENUES[(s // 90) % 2]
+        for _ in range(int(rng.integers(7, 12))):
+            level = rng.uniform(40.0, 100.0)
+            label = "A" if level < 70 else "B" if level < 85 else "C"
+            lines.append(f"{stamp},{level:.1f},{label},{venue}")
+        if s == 123:
+            lines.append(f"{stamp},--,A,{venue}")  # nivel no numérico: se descarta
+        if s == 200:
+            lines.append("línea cortada")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("\r\n".join(lines[:50]) + "\r\n" + "\n".join(lines[50:]) + "\n")
+
+
+def assert_same_totals(got, expected):
+    assert sorted(got) == sorted(expected)
+    for name in expected:
+        a, b = got[name].aggregate, expected[name].aggregate
+        assert (a.n, a.lmax, a.lmin, a.start, a.end) == (b.n, b.lmax, b.lmin, b.start, b.end)
+        assert a.duration == pytest.approx(b.duration, rel=1e-12)
+        assert a.energy == pytest.approx(b.energy, rel=1e-12)
+        assert np.allclose(a.histogram, b.histogram, rtol=1e-12, atol=1e-12)
+        assert np.allclose(got[name].class_seconds, expected[name].class_seconds)
+        got[name].compact_minutes()
+        expected[name].compact_minutes()
+        for x, y in zip(got[name].minutes[0], expected[name].minutes[0]):
+            assert np.allclose(x, y, rtol=1e-12)
+    assert summarize(got, {}) == summarize(expected, {})
+
+
+@pytest.mark.parametrize("chunk_bytes", [16, 64, 1000, 4096, 65536])
+def test_small_chunks_give_the_same_totals(tmp_path, chunk_bytes):
+    path = str(tmp_path / "log.csv")
+    write_log(path)
+    assert_same_totals(analyze_file(path, chunk_bytes), analyze_file(path))
+
+
+def test_each_second_is_split_among_its_rows(tmp_path):
+    path = str(tmp_path / "log.csv")
+    write_log(path)
+    totals = analyze_file(path, 1000)
+    # 400 segundos repartidos entre los dos locales (bloques de 90 s)
+    assert sum(v.aggregate.duration for v in totals.values()) == pytest.approx(400.0)
+    assert totals["Bar Pequeño"].aggregate.duration == pytest.approx(220.0)
+    assert totals["Discoteca"].aggregate.duration == pytest.approx(180.0)
+
+
+def test_parse_block_columns():
+    data = (
+        b"2025-10-16 18:00:00,65.3,B,Bar\r\n"
+        b"2025-10-16 18:00:00,x,B,Bar\n"
+        b"incompleta\n"
+        b"2025-10-16 18:00:01,70.0,,Bar Grande\n"
+    )
+    starts, seconds, levels, classes, venues, names = parse_block(data)
+    assert levels.tolist() == [65.3, 70.0]
+    assert (seconds[1] - seconds[0]) == 1
+    assert classes.tolist() == [ord("B"), 0]
+    assert [names[c] for c in venues] == ["Bar", "Bar Grande"]
+    assert data[starts[1] :].startswith(b"2025-10-16 18:00:01")
@@ -0,0 +1,17 @@
+"""Pruebas de MeterEngine: invariancia ante la partición y guardado del estado."""
+
+import pytest
+from src.fused_dsp import numba
+from src.meter_engine_bench import check_partitions
+
+BACKENDS = [
+    "numpy",
+    pytest.param(
+        "numba", marks=pytest.mark.skipif(numba is None, reason="numba no está instalado")
+    ),
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_partitions_and_saved_state_are_bit_identical(backend):
+    assert check_partitions(5.0, 3, backend, verbose=False)
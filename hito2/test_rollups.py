@@ -0,0 +1,107 @@
+"""Pruebas de los agregados por intervalo y de los huecos en RollupEngine."""
+
+import json
+
+import numpy as np
+import pytest
+from src.rollups import IntervalAggregate, RollupEngine, interval_start
+
+HOUR = interval_start(1_700_000_000, "hora")
+
+# 50 niveles, uno por segundo, en el centro de sus bins: 40.05, 41.05 ... 89.05
+LEVELS = np.arange(40, 90) + 0.05
+
+
+def aggregate(levels, threshold=None):
+    agg = IntervalAggregate("hora", HOUR, HOUR + 3600.0, threshold)
+    for level in levels:
+        agg.add(level, 1.0)
+    return agg
+
+
+def assert_same(merged, whole):
+    assert merged.energy == pytest.approx(whole.energy)
+    assert merged.leq == pytest.approx(whole.leq)
+    assert (merged.duration, merged.n) == (whole.duration, whole.n)
+    assert (merged.lmax, merged.lmin) == (whole.lmax, whole.lmin)
+    assert merged.exceedance == whole.exceedance
+    assert merged.gaps == whole.gaps
+    assert np.array_equal(merged.histogram, whole.histogram)
+
+
+def test_merge_equals_aggregating_all_data():
+    rng = np.random.default_rng(0)
+    levels = rng.uniform(30.0, 100.0, 500)
+    whole = aggregate(levels, threshold=70.0)
+    whole.gaps = 12.0
+
+    merged = aggregate(levels[:200], threshold=70.0)
+    merged.gaps = 5.0
+    second = aggregate(levels[200:], threshold=70.0)
+    second.gaps = 7.0
+    merged.merge(second)
+    assert_same(merged, whole)
+
+
+def test_merge_of_empty_aggregate_keeps_its_gaps():
+    merged = aggregate(LEVELS)
+    empty = aggregate([])
+    empty.gaps = 60.0
+    merged.merge(empty)
+    assert merged.gaps == 60.0
+    assert merged.n == len(LEVELS)
+
+    into_empty = aggregate([])
+    into_empty.merge(aggregate(LEVELS))
+    assert_same(into_empty, aggregate(LEVELS))
+
+
+def test_merge_with_other_threshold_recomputes_exceedance():
+    merged = aggregate(LEVELS[:25], threshold=70.5)
+    merged.merge(aggregate(LEVELS[25:], threshold=None))
+    assert merged.exceedance == merged.time_above(70.5) == 19.0
+
+
+def test_time_above_matches_exceedance():
+    agg = aggregate(LEVELS, threshold=70.5)
+    assert agg.exceedance == 19.0
+    assert agg.time_above(70.5) == 19.0
+    assert agg.time_above(0.0) == 50.0
+    assert agg.time_above(95.0) == 0.0
+
+
+def test_ln_levels_exceeded_part_of_the_time():
+    agg = aggregate(LEVELS)
+    assert agg.ln(10) == pytest.approx(85.05)
+    assert agg.ln(50) == pytest.approx(65.05)
+    assert agg.ln(90) == pytest.approx(45.05)
+    assert aggregate([]).ln(50) is None
+
+
+def closed_minutes(path):
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    return [row for row in rows if row["resolucion"] == "minuto"]
+
+
+def test_gap_is_split_at_minute_edges(tmp_path):
+    path = str(tmp_path / "rollups.jsonl")
+    engine = RollupEngine(path)
+    engine.update(HOUR + 10.0, 60.0)
+    # Reinicio del stream de 5 minutos desde la mitad del primer minuto
+    engine.record_gap(HOUR + 30.0, HOUR + 330.0, "reinicio")
+    engine.update(HOUR + 400.0, 60.0)
+
+    minutes = closed_minutes(path)
+    assert [row["inicio_epoch"] - HOUR for row in minutes] == [0, 60, 120, 180, 240, 300]
+    assert [row["huecos_s"] for row in minutes] == [30.0, 60.0, 60.0, 60.0, 60.0, 30.0]
+    assert [row["n"] for row in minutes] == [1, 0, 0, 0, 0, 0]
+    assert engine.current["hora"].gaps == 300.0
+
+
+def test_gap_inside_current_minute(tmp_path):
+    engine = RollupEngine(str(tmp_path / "rollups.jsonl"))
+    engine.update(HOUR + 10.0, 60.0)
+    engine.record_gap(HOUR + 20.0, HOUR + 20.5, "descarte")
+    engine.record_gap(HOUR + 21.0, HOUR + 21.0, "overflow")
+    assert engine.current["minuto"].gaps == 0.5
@@ -0,0 +1,110 @@
+"""Pruebas del reloj de muestras: huecos entre bloques y corrección de deriva."""
+
+import pytest
+from src.timeline import SampleTimeline
+
+FS = 1000
+T0 = 1_700_000_000.0
+
+
+def anchored_timeline():
+    timeline = SampleTimeline(FS)
+    timeline.reset(0)
+    timeline.set_anchor(T0, 0)
+    return timeline
+
+
+def test_contiguous_blocks_have_no_gaps():
+    timeline = anchored_timeline()
+    for start in range(0, 5000, 500):
+        assert timeline.add_block(start, 500, "descarte") is None
+    assert timeline.next_sample == 5000
+    assert timeline.gaps == 0
+    assert timeline.coverage == 100.0
+
+
+def test_queue_drop_is_a_gap_with_its_length():
+    # El bloque [500, 1000) se perdió en la cola: el siguiente llega adelantado
+    timeline = anchored_timeline()
+    timeline.add_block(0, 500, "descarte")
+    gap = timeline.add_block(1000, 500, "descarte")
+    assert gap == {
+        "inicio": T0 + 0.5,
+        "fin": T0 + 1.0,
+        "duracion_s": 0.5,
+        "muestras": 500,
+        "motivo": "descarte",
+    }
+    assert timeline.gap_samples == 500
+    assert timeline.coverage == pytest.approx(100.0 * 1000 / 1500)
+
+
+def test_overflow_with_adc_time_has_a_length():
+    # Con tiempo ADC el callback ya adelantó la posición en lo perdido
+    timeline = anchored_timeline()
+    timeline.add_block(0, 500, "overflow")
+    gap = timeline.add_block(800, 500, "overflow", mark=True)
+    assert gap["motivo"] == "overflow"
+    assert gap["muestras"] == 300
+    assert gap["duracion_s"] == pytest.approx(0.3)
+
+
+def test_overflow_without_adc_time_is_marked_with_zero_length():
+    timeline = anchored_timeline()
+    timeline.add_block(0, 500, "overflow")
+    gap = timeline.add_block(500, 500, "overflow", mark=True)
+    assert gap["muestras"] == 0
+    assert gap["duracion_s"] == 0.0
+    assert gap["inicio"] == gap["fin"] == T0 + 0.5
+    assert timeline.gaps == 1
+    assert timeline.coverage == 100.0
+
+
+def test_first_block_fixes_the_start_when_not_given():
+    timeline = SampleTimeline(FS)
+    timeline.reset()
+    assert timeline.add_block(12345, 100, "descarte") is None
+    assert timeline.next_sample == 12445
+
+
+@pytest.mark.parametrize("ppm", [50.0, -50.0, 300.0])
+def test_resync_absorbs_adc_drift_without_jumps(ppm):
+    timeline = SampleTimeline(FS)
+    timeline.reset(0)
+    tick = FS // 10
+    last = None
+    for k in range(10 * 86400):
+        sample = k * tick
+        wall = T0 + sample / (FS * (1.0 + ppm * 1e-6))
+        timeline.resync(wall, sample)
+        now = timeline.time_at(sample)
+        assert last is None or now > last
+        last = now
+    # Sin corrección serían ~4 s por día a 50 ppm
+    assert abs(now - wall) < 1e-3
+
+
+def test_resync_reports_the_correction():
+    timeline = SampleTimeline(FS)
+    timeline.reset(0)
+    assert timeline.resync(T0, 0) is None
+    interval = int(timeline.RESYNC_INTERVAL_S * FS)
+    assert timeline.resync(T0 + 1.0, interval - 1) is None
+
+    correction = timeline.resync(T0 + timeline.RESYNC_INTERVAL_S + 0.03, interval)
+    assert correction["salto"] is False
+    assert correction["desfase_s"] == pytest.approx(0.03)
+    # 50 ppm de deriva medida más 50 ppm para absorber el desfase en el intervalo siguiente
+    assert correction["ppm"] == pytest.approx(100.0)
+    # Re-anclar no mueve la hora de la muestra actual
+    assert timeline.time_at(interval) == pytest.approx(T0 + timeline.RESYNC_INTERVAL_S)
+
+
+def test_system_clock_step_reanchors():
+    timeline = SampleTimeline(FS)
+    timeline.reset(0)
+    timeline.resync(T0, 0)
+    interval = int(timeline.RESYNC_INTERVAL_S * FS)
+    correction = timeline.resync(T0 + timeline.RESYNC_INTERVAL_S + 3600.0, interval)
+    assert correction["salto"] is True
+    assert timeline.time_at(interval) == T0 + timeline.RESYNC_INTERVAL_S + 3600.0